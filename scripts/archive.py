@@ -0,0 +1,141 @@
+"""
+scripts/archive.py — Browse, replay and re-transcribe archived sessions.
+
+Run from the project root inside the activated venv:
+    python scripts/archive.py list
+    python scripts/archive.py show SESSION
+    python scripts/archive.py play SESSION [--segment N]
+    python scripts/archive.py export SESSION out.wav [--segment N]
+    python scripts/archive.py transcribe SESSION [--segment N] [--model large-v3]
+
+Sessions are recorded by the GUI when MYTRANSCRIBE_ARCHIVE is set (see
+src/session_archive.py); --dir reads another archive directory. SESSION may
+be a unique prefix of the id, and "last" picks the newest session. With
+--segment only that transcript segment is decoded from the archive; without
+it, the whole session. Re-transcription goes through the result cache, like
+batch_transcribe.py.
+"""
+
+import argparse
+import os
+import sys
+import time
+import wave
+from pathlib import Path
+
+# Windows cmd/PowerShell may default to cp1252; reconfigure to UTF-8 so
+# any Unicode in transcripts prints without crashing.
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from session_archive import SAMPLE_RATE, SessionArchive, archive_dir  # noqa: E402
+
+
+def _open(directory: str, spec: str) -> SessionArchive:
+    sessions = SessionArchive.sessions(directory)
+    matches = sessions[-1:] if spec == "last" else [s for s in sessions if s.startswith(spec)]
+    if len(matches) != 1:
+        sys.exit(f"{len(matches)} sessions match {spec!r} in {directory}")
+    return SessionArchive(directory, matches[0])
+
+
+def _audio(session: SessionArchive, segment: int | None):
+    """int16 samples of the whole session or of one segment."""
+    if segment is None:
+        return session.read()
+    start, end, _ = session.segments[segment]
+    return session.read(start, end)
+
+
+def _list(directory: str, args) -> None:
+    for session_id in SessionArchive.sessions(directory):
+        session = SessionArchive(directory, session_id)
+        size = os.path.getsize(os.path.join(directory, session_id + ".audio"))
+        print(f"{session_id}  {session.samples / SAMPLE_RATE:7.1f} s  "
+              f"{size / 1e3:8.1f} KB  {session.header.get('format', '?'):4}  "
+              f"{len(session.segments)} segments")
+
+
+def _show(directory: str, args) -> None:
+    session = _open(directory, args.session)
+    for i, (start, end, text) in enumerate(session.segments):
+        print(f"[{i:3}] {start / SAMPLE_RATE:8.2f}–{end / SAMPLE_RATE:8.2f}  {text}")
+
+
+def _export(directory: str, args) -> None:
+    samples = _audio(_open(directory, args.session), args.segment)
+    with wave.open(args.output, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(samples.tobytes())
+    print(f"{args.output}: {len(samples) / SAMPLE_RATE:.1f} s")
+
+
+def _play(directory: str, args) -> None:
+    import pyaudio
+    samples = _audio(_open(directory, args.session), args.segment)
+    audio_interface = pyaudio.PyAudio()
+    try:
+        stream = audio_interface.open(format=pyaudio.paInt16, channels=1,
+                                      rate=SAMPLE_RATE, output=True)
+        stream.write(samples.tobytes())
+        stream.stop_stream()
+        stream.close()
+    finally:
+        audio_interface.terminate()
+
+
+def _transcribe(directory: str, args) -> None:
+    from inference_scheduler import BACKGROUND
+    from result_cache import CachedBackend, ResultCache
+    from transcriber_v12 import SCHEDULER, TRANSCRIBE_OPTIONS, RealTimeTranscriber, load_backend
+
+    session = _open(directory, args.session)
+    audio = _audio(session, args.segment).astype("float32") / 32768.0
+    backend = load_backend(args.model)
+    cache = ResultCache.from_env()
+    if cache is not None:
+        backend = CachedBackend(backend, cache)
+    start = time.perf_counter()
+    with SCHEDULER.job(BACKGROUND) as gate:
+        result = backend.transcribe(audio, gate=gate, **TRANSCRIBE_OPTIONS)
+    text = RealTimeTranscriber.filter_hallucinated_phrases(result.get("text", "").strip())
+    print(text)
+    print(f"({len(audio) / SAMPLE_RATE:.1f} s of audio in {time.perf_counter() - start:.1f} s)",
+          file=sys.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dir", default=archive_dir(),
+                        help="archive directory (default: $MYTRANSCRIBE_ARCHIVE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list archived sessions").set_defaults(run=_list)
+    for name, run, help_text in (
+        ("show", _show, "list a session's transcript segments"),
+        ("play", _play, "play a session or segment"),
+        ("export", _export, "write a session or segment as WAV"),
+        ("transcribe", _transcribe, "re-transcribe a session or segment"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.set_defaults(run=run)
+        command.add_argument("session", help='session id, unique prefix, or "last"')
+        if name == "export":
+            command.add_argument("output")
+        if name != "show":
+            command.add_argument("--segment", type=int, help="segment number (see show)")
+        if name == "transcribe":
+            command.add_argument("--model",
+                                 default=os.environ.get("MYTRANSCRIBE_MODEL", "large-v3"))
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("no archive directory: set MYTRANSCRIBE_ARCHIVE or pass --dir")
+    args.run(args.dir, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+scripts/batch_transcribe.py — Transcribe audio files with the dictation pipeline.
+
+Run from the project root inside the activated venv:
+    python scripts/batch_transcribe.py [--model large-v3] [--out DIR] file ...
+
+Each file is transcribed with the same backend, prompt and hallucination
+filter as the GUI and written to <name>.txt next to it (or into --out).
+Results go through the content-addressed result cache (src/result_cache.py),
+so re-running over unchanged files only decodes and hashes the audio;
+--no-cache forces full inference.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Windows cmd/PowerShell may default to cp1252; reconfigure to UTF-8 so
+# any Unicode in transcripts prints without crashing.
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from inference_scheduler import BACKGROUND                          # noqa: E402
+from result_cache import CachedBackend, ResultCache                 # noqa: E402
+from transcriber_v12 import (                                       # noqa: E402
+    SCHEDULER, TRANSCRIBE_OPTIONS, RealTimeTranscriber, load_backend,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("files", nargs="+", help="audio files (any format ffmpeg reads)")
+    parser.add_argument("--model", default=os.environ.get("MYTRANSCRIBE_MODEL", "large-v3"))
+    parser.add_argument("--out", help="directory for the .txt files (default: next to each file)")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the result cache")
+    args = parser.parse_args()
+
+    backend = load_backend(args.model)
+    cache = None if args.no_cache else ResultCache.from_env()
+    if cache is not None:
+        backend = CachedBackend(backend, cache)
+
+    failed = 0
+    started = time.perf_counter()
+    for path in args.files:
+        start = time.perf_counter()
+        try:
+            with SCHEDULER.job(BACKGROUND) as gate:
+                result = backend.transcribe(path, gate=gate, **TRANSCRIBE_OPTIONS)
+        except Exception as exc:
+            print(f"FAILED {path}: {exc}", file=sys.stderr)
+            failed += 1
+            continue
+        text = RealTimeTranscriber.filter_hallucinated_phrases(result.get("text", "").strip())
+        target = Path(args.out or Path(path).parent) / (Path(path).stem + ".txt")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text + "\n", encoding="utf-8")
+        print(f"{path} -> {target} ({time.perf_counter() - start:.1f} s)")
+
+    summary = f"{len(args.files) - failed}/{len(args.files)} files in " \
+              f"{time.perf_counter() - started:.1f} s"
+    if cache is not None:
+        stats = cache.stats()
+        summary += f"; cache {stats['hits']} hits, {stats['misses']} misses"
+    print(summary)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+scripts/bench.py — Inference micro-benchmarks for MyTranscribe.
+
+Run from the project root inside the activated venv:
+    python scripts/bench.py [--model tiny.en] [--runs 5] [fixture.wav ...]
+
+Without WAV arguments the fixtures are synthetic (silence, a speech-band tone
+sweep and noise, 30 s each at 16 kHz), so the numbers are comparable across
+machines but say nothing about accuracy; pass real recordings for that.
+
+Benchmarks:
+  encoder      eager vs TorchScript-compiled encoder (src/compiled_encoder.py),
+               per 30 s window, plus end-to-end transcribe() per fixture
+  speculative  plain vs draft-assisted greedy decoding (--draft, default auto),
+               checking the transcripts are identical
+  bf16         fp32 vs bfloat16-autocast CPU encoder (src/cpu_features.py):
+               error, timing, and end-to-end transcripts per fixture
+  batch        two sources (multi_source.py): two encoder calls vs one
+               batched call, and all fixtures transcribed one after another
+               vs concurrently through one backend's EncoderBatcher
+  resample     native-rate capture resampler (src/resampler.py) per device
+               rate: CPU per second of audio, worst block, tone SNR, alias level
+"""
+
+import argparse
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Windows cmd/PowerShell may default to cp1252; reconfigure to UTF-8 so
+# any Unicode in transcripts prints without crashing.
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import numpy as np      # noqa: E402
+import torch            # noqa: E402
+import whisper          # noqa: E402
+
+import model_cache                      # noqa: E402
+from compiled_encoder import install_compiled_encoder   # noqa: E402
+from cpu_features import Bf16Encoder, native_bf16_features   # noqa: E402
+from decode_hooks import EncoderBatcher, load_draft_model, transcribe_streaming   # noqa: E402
+from resampler import StreamingResampler                # noqa: E402
+
+SAMPLE_RATE = 16000
+FIXTURE_SECONDS = 30
+DEVICE_RATES = [22050, 32000, 44100, 48000, 96000]
+CAPTURE_BLOCK = 1024    # audio_capture.CHUNK, at 16 kHz
+
+
+def synthetic_fixtures() -> dict:
+    """Deterministic 30 s fixtures; no files or network needed."""
+    rng = np.random.default_rng(0)
+    t = np.arange(FIXTURE_SECONDS * SAMPLE_RATE) / SAMPLE_RATE
+    sweep = 0.3 * np.sin(2 * np.pi * (200 + 100 * t) * t)
+    return {
+        "silence": np.zeros_like(t, dtype=np.float32),
+        "sweep": sweep.astype(np.float32),
+        "noise": (0.05 * rng.standard_normal(t.shape)).astype(np.float32),
+    }
+
+
+def load_fixtures(paths: list[str]) -> dict:
+    if not paths:
+        return synthetic_fixtures()
+    return {os.path.basename(p): whisper.load_audio(p) for p in paths}
+
+
+def _time(fn, runs: int) -> list[float]:
+    fn()   # warm-up (allocator, oneDNN primitive cache, CUDA kernels)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _row(label: str, samples: list[float]) -> str:
+    return (f"  {label:<28} median {statistics.median(samples) * 1000:8.1f} ms"
+            f"   min {min(samples) * 1000:8.1f} ms")
+
+
+def bench_encoder(args, fixtures: dict) -> None:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    fp16 = device == "cuda"
+    eager = model_cache.load_model(args.model, device=device)
+    compiled = model_cache.load_model(args.model, device=device)
+    with tempfile.TemporaryDirectory() if args.fresh else contextlib.nullcontext() as cache_dir:
+        start = time.perf_counter()
+        ok = install_compiled_encoder(compiled, cache_dir=cache_dir)
+        print(f"  compile/load: {time.perf_counter() - start:.2f} s "
+              f"({'compiled' if ok else 'FAILED, eager fallback'})")
+
+    dtype = torch.float16 if fp16 else torch.float32
+    mel = whisper.log_mel_spectrogram(
+        whisper.pad_or_trim(next(iter(fixtures.values()))), eager.dims.n_mels
+    ).unsqueeze(0).to(device=device, dtype=dtype)
+    with torch.no_grad():
+        diff = (eager.encoder(mel) - compiled.encoder(mel)).abs().max().item()
+        print(_row("encoder eager", _time(lambda: eager.encoder(mel), args.runs)))
+        print(_row("encoder compiled", _time(lambda: compiled.encoder(mel), args.runs)))
+    print(f"  max |eager - compiled| = {diff:.2e}")
+
+    for name, audio in fixtures.items():
+        results = {}
+        for label, model in (("eager", eager), ("compiled", compiled)):
+            def run():
+                results[label] = model.transcribe(
+                    audio, fp16=fp16, language="en", temperature=0.0,
+                    condition_on_previous_text=False,
+                )["text"].strip()
+            print(_row(f"transcribe {name} {label}", _time(run, args.runs)))
+        if results["eager"] != results["compiled"]:
+            print(f"  !! {name}: transcripts differ")
+
+
+def bench_speculative(args, fixtures: dict) -> None:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    fp16 = device == "cuda"
+    model = model_cache.load_model(args.model, device=device)
+    draft = load_draft_model(model, args.draft)
+    if draft is None:
+        print("  no compatible draft model; skipped")
+        return
+    options = dict(fp16=fp16, language="en", temperature=0.0,
+                   condition_on_previous_text=False, abort_hallucinations=True)
+    for name, audio in fixtures.items():
+        results = {}
+        for label, draft_model in (("plain", None), ("speculative", draft)):
+            def run():
+                results[label] = transcribe_streaming(
+                    model, audio, draft_model=draft_model, **options
+                )["text"].strip()
+            print(_row(f"{name} {label}", _time(run, args.runs)))
+        if results["plain"] != results["speculative"]:
+            print(f"  !! {name}: transcripts differ")
+
+
+def bench_bf16(args, fixtures: dict) -> None:
+    features = native_bf16_features()
+    print(f"  native bf16: {', '.join(features) or 'none (emulated, expect a slowdown)'}")
+    fp32 = model_cache.load_model(args.model, device="cpu")
+    bf16 = model_cache.load_model(args.model, device="cpu")
+    bf16.encoder = Bf16Encoder(bf16.encoder)
+
+    mel = whisper.log_mel_spectrogram(
+        whisper.pad_or_trim(next(iter(fixtures.values()))), fp32.dims.n_mels
+    ).unsqueeze(0)
+    with torch.no_grad():
+        ref, low = fp32.encoder(mel), bf16.encoder(mel)
+        print(_row("encoder fp32", _time(lambda: fp32.encoder(mel), args.runs)))
+        print(_row("encoder bf16", _time(lambda: bf16.encoder(mel), args.runs)))
+    cosine = torch.nn.functional.cosine_similarity(ref.flatten(), low.flatten(), dim=0)
+    print(f"  max |fp32 - bf16| = {(ref - low).abs().max().item():.2e}"
+          f"   cosine = {cosine.item():.6f}")
+
+    options = dict(fp16=False, language="en", temperature=0.0,
+                   condition_on_previous_text=False, abort_hallucinations=True)
+    for name, audio in fixtures.items():
+        results = {}
+        for label, model in (("fp32", fp32), ("bf16", bf16)):
+            def run():
+                results[label] = transcribe_streaming(model, audio, **options)["text"].strip()
+            print(_row(f"{name} {label}", _time(run, args.runs)))
+        if results["fp32"] != results["bf16"]:
+            print(f"  !! {name}: transcripts differ\n     fp32: {results['fp32']!r}"
+                  f"\n     bf16: {results['bf16']!r}")
+
+
+def bench_batch(args, fixtures: dict) -> None:
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    fp16 = device == "cuda"
+    model = model_cache.load_model(args.model, device=device)
+    dtype = torch.float16 if fp16 else torch.float32
+    mel = whisper.log_mel_spectrogram(
+        whisper.pad_or_trim(next(iter(fixtures.values()))), model.dims.n_mels
+    ).unsqueeze(0).to(device=device, dtype=dtype)
+    pair = torch.cat([mel, mel])
+    with torch.no_grad():
+        print(_row("encoder 2 x batch 1", _time(lambda: (model.encoder(mel), model.encoder(mel)),
+                                                args.runs)))
+        print(_row("encoder 1 x batch 2", _time(lambda: model.encoder(pair), args.runs)))
+
+    batcher = EncoderBatcher(model)
+    options = dict(fp16=fp16, language="en", temperature=0.0,
+                   condition_on_previous_text=False, abort_hallucinations=True)
+    lock = threading.Lock()   # decoder windows of one model never overlap
+    results = {}
+
+    def transcribe(label, name, audio):
+        results[label, name] = transcribe_streaming(
+            model, audio, batcher=batcher, gate=lambda: lock, **options
+        )["text"].strip()
+
+    def serial():
+        for name, audio in fixtures.items():
+            transcribe("serial", name, audio)
+
+    def concurrent():
+        threads = [threading.Thread(target=transcribe, args=("concurrent", name, audio))
+                   for name, audio in fixtures.items()]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    print(_row(f"{len(fixtures)} fixtures serial", _time(serial, args.runs)))
+    batcher.batches = batcher.windows = 0
+    print(_row(f"{len(fixtures)} fixtures concurrent", _time(concurrent, args.runs)))
+    print(f"  {batcher.windows} windows in {batcher.batches} encoder batches")
+    for name in fixtures:
+        if results["serial", name] != results["concurrent", name]:
+            print(f"  !! {name}: transcripts differ")
+
+
+def _resample_stream(rate: int, audio: np.ndarray) -> tuple[np.ndarray, float]:
+    """Feed `audio` through a fresh resampler in capture-sized blocks; (output, worst block s)."""
+    resampler = StreamingResampler(rate, SAMPLE_RATE)
+    block = CAPTURE_BLOCK * rate // SAMPLE_RATE
+    parts, worst = [], 0.0
+    for i in range(0, len(audio), block):
+        start = time.perf_counter()
+        parts.append(resampler.process(audio[i:i + block]))
+        worst = max(worst, time.perf_counter() - start)
+    return np.concatenate(parts), worst
+
+
+def bench_resample(args, fixtures: dict) -> None:
+    seconds = FIXTURE_SECONDS
+    rng = np.random.default_rng(0)
+    for rate in DEVICE_RATES:
+        resampler = StreamingResampler(rate, SAMPLE_RATE)
+        noise = rng.integers(-8000, 8000, seconds * rate).astype(np.int16)
+        cpu = []
+        for _ in range(args.runs):
+            start = time.process_time()
+            _, worst = _resample_stream(rate, noise)
+            cpu.append((time.process_time() - start) / seconds)
+
+        # 1 kHz tone vs the ideal 16 kHz tone (after the filter's group delay)
+        t = np.arange(seconds * rate) / rate
+        tone, _ = _resample_stream(rate, (10000 * np.sin(2 * np.pi * 1000 * t)).astype(np.int16))
+        ideal = 10000 * np.sin(2 * np.pi * 1000 * (np.arange(len(tone)) / SAMPLE_RATE
+                                                   - resampler.delay))
+        err = tone[SAMPLE_RATE:] - ideal[SAMPLE_RATE:]
+        snr = 10 * np.log10(np.mean(ideal[SAMPLE_RATE:] ** 2) / np.mean(err ** 2))
+        # A tone above the 8 kHz output Nyquist must not fold back into the band
+        high = min(12000, int(rate * 0.45))
+        alias, _ = _resample_stream(rate, (10000 * np.sin(2 * np.pi * high * t)).astype(np.int16))
+        alias_rms = np.sqrt(np.mean(alias[SAMPLE_RATE:].astype(np.float64) ** 2))
+        alias_db = 20 * np.log10(max(alias_rms, 1e-3) / (10000 / np.sqrt(2)))
+        ratio = f"{resampler.up}/{resampler.down}"
+        print(f"  {rate:>6} Hz  {ratio:>7}  {resampler.taps:>3} taps"
+              f"   CPU {statistics.median(cpu) * 1000:5.1f} ms/s"
+              f"   worst block {worst * 1000:5.2f} ms"
+              f"   1 kHz SNR {snr:5.1f} dB   {high:>5} Hz alias {alias_db:7.1f} dB")
+
+
+BENCHMARKS = {
+    "encoder": bench_encoder,
+    "speculative": bench_speculative,
+    "bf16": bench_bf16,
+    "batch": bench_batch,
+    "resample": bench_resample,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("fixtures", nargs="*", help="WAV files (default: synthetic)")
+    parser.add_argument("--model", default=os.environ.get("MYTRANSCRIBE_MODEL", "tiny.en"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--only", choices=sorted(BENCHMARKS), action="append",
+                        help="run only these benchmarks (repeatable)")
+    parser.add_argument("--draft", default="auto",
+                        help="draft model for the speculative benchmark")
+    parser.add_argument("--fresh", action="store_true",
+                        help="ignore on-disk compiled artifacts (measure cold compile)")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    print(f"torch {torch.__version__}, {torch.get_num_threads()} threads, "
+          f"model {args.model}, fixtures: {', '.join(fixtures)}")
+    for name in args.only or BENCHMARKS:
+        print(f"\n[{name}]")
+        BENCHMARKS[name](args, fixtures)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
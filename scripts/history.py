@@ -0,0 +1,101 @@
+"""
+scripts/history.py — Search the transcript history.
+
+Run from the project root inside the activated venv:
+    python scripts/history.py budget review --on tuesday
+    python scripts/history.py invoice --since 2026-09-01 --until 2026-10-01
+    python scripts/history.py --on yesterday            (everything that day)
+    python scripts/history.py --session 1760870543123456
+
+Words must all appear in a segment, each as a prefix ("invoic" finds
+"invoices"); --raw passes FTS5 query syntax (OR, NEAR, "phrases") through.
+Days are YYYY-MM-DD, today, yesterday, a weekday name (the most recent one,
+today included) or Nd for N days ago. Results are newest first; --session
+prints one whole session in order. See src/transcript_history.py.
+"""
+
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+
+# Windows cmd/PowerShell may default to cp1252; reconfigure to UTF-8 so
+# any Unicode in transcripts prints without crashing.
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from transcript_history import connect, default_history_path, search  # noqa: E402
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def parse_day(spec: str) -> datetime.date:
+    today = datetime.date.today()
+    spec = spec.strip().lower()
+    if spec == "today":
+        return today
+    if spec == "yesterday":
+        return today - datetime.timedelta(days=1)
+    for i, name in enumerate(WEEKDAYS):
+        if len(spec) >= 3 and name.startswith(spec):
+            return today - datetime.timedelta(days=(today.weekday() - i) % 7)
+    if spec.endswith("d") and spec[:-1].isdigit():
+        return today - datetime.timedelta(days=int(spec[:-1]))
+    try:
+        return datetime.date.fromisoformat(spec)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a day: {spec!r}") from None
+
+
+def _timestamp(day: datetime.date) -> float:
+    """Local midnight at the start of `day`."""
+    return time.mktime(day.timetuple())
+
+
+def _print(rows) -> None:
+    for row in rows:
+        when = time.strftime("%Y-%m-%d %a %H:%M", time.localtime(row["ts"]))
+        source = f"[{row['source']}] " if row["source"] else ""
+        print(f"{when}  {source}{row['text']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("words", nargs="*", help="words to find (all must match)")
+    parser.add_argument("--on", type=parse_day, help="only this day")
+    parser.add_argument("--since", type=parse_day, help="from this day on")
+    parser.add_argument("--until", type=parse_day, help="before this day")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--raw", action="store_true", help="words are an FTS5 query")
+    parser.add_argument("--session", type=int, help="print one session in full")
+    parser.add_argument("--db", default=default_history_path(),
+                        help="history database (default: $MYTRANSCRIBE_HISTORY)")
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("transcript history is disabled (MYTRANSCRIBE_HISTORY=0)")
+
+    db = connect(args.db)
+    start = time.perf_counter()
+    if args.session is not None:
+        rows = db.execute(
+            "SELECT ts, text FROM segments WHERE session_id = ? ORDER BY ts", (args.session,)
+        ).fetchall()
+        rows = [{"ts": ts, "text": text, "source": None} for ts, text in rows]
+    else:
+        since = args.since or args.on
+        until = args.until or (args.on + datetime.timedelta(days=1) if args.on else None)
+        rows = search(db, " ".join(args.words),
+                      since=_timestamp(since) if since else None,
+                      until=_timestamp(until) if until else None,
+                      limit=args.limit, raw=args.raw)
+    elapsed = time.perf_counter() - start
+    _print(rows)
+    print(f"({len(rows)} segments in {elapsed * 1000:.1f} ms)", file=sys.stderr)
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+"""
+scripts/soak.py — Soak test: many start/stop cycles and hours of accelerated audio.
+
+Run from the project root inside the activated venv:
+    python scripts/soak.py                         (2000 cycles, then 1 h of audio)
+    python scripts/soak.py --cycles 10000 --hours 8 --speed 200
+    python scripts/soak.py --mode handsfree --warm
+
+No microphone, speaker or Whisper model is used. PyAudio is replaced by a fake
+device whose streams deliver a looped speech-like signal --speed times faster
+than real time (input, at --device-rate so the resampler runs) or pull chime
+buffers (output); the model is a stub backend that reads each chunk's WAV
+file and returns a line of text. Everything else is the real pipeline:
+RealTimeTranscriber, InputCapture and its ring, temp WAV files, the scheduler,
+the activity gate, ChimePlayer and the transcript history (in a scratch
+directory, as is the temp dir).
+
+Phases:
+  cycles  --cycles sessions of --session seconds of audio each, driven like
+          the GUI: clear transcriptions, start chime, Start, wait, flush,
+          Stop, end chime. Without --warm each session opens a new stream.
+  long    one session of --hours of audio, cut into --chunk second chunks.
+
+Every --report-every cycles (or 10 min of audio) a row reports RSS, open file
+descriptors, Python threads, temp-dir entries and the size of the session's
+transcript. Baselines are taken after --warmup cycles; the run fails (exit 1)
+if the end of a phase exceeds its baseline by more than --max-rss-mb,
+--max-fds, --max-threads or --max-tmp. The long phase also fails if the
+capture sample clock drifts from the device's by more than one block, or if
+audio was zero-filled. The transcript itself grows with the session by
+design and is only reported.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+# Windows cmd/PowerShell may default to cp1252; reconfigure to UTF-8 so
+# any Unicode in transcripts prints without crashing.
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import numpy as np      # noqa: E402
+import pyaudio          # noqa: E402
+
+import transcriber_v12                          # noqa: E402
+from audio_capture import CHUNK, SAMPLE_RATE    # noqa: E402
+from sound_utils import ChimePlayer             # noqa: E402
+
+LOOP_SECONDS = 10       # length of the fake device's looped signal
+LONG_REPORT = 600       # seconds of audio between rows in the long phase
+
+
+def speech_loop(rate: int) -> np.ndarray:
+    """
+    LOOP_SECONDS of int16 audio: 1.5 s voiced bursts (140 Hz harmonics
+    shaped by two formants) separated by 1 s of low noise, so silence
+    checks, the activity gate and the resampler all see realistic input.
+    """
+    t = np.arange(LOOP_SECONDS * rate) / rate
+    voiced = sum(
+        np.sin(2 * np.pi * 140 * k * t)
+        * (np.exp(-((140 * k - 700) / 400) ** 2) + 0.5 * np.exp(-((140 * k - 1800) / 500) ** 2))
+        for k in range(1, 30)
+    )
+    envelope = (t % 2.5 < 1.5) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+    noise = np.random.default_rng(0).normal(0, 20, len(t))
+    return np.clip(voiced * envelope * 3000 + noise, -32768, 32767).astype(np.int16)
+
+
+class FakeStream:
+    """
+    A callback-mode stream driven by its own thread, like PortAudio's. Input
+    streams feed the loop signal with ADC timestamps on a virtual clock;
+    output streams pull buffers and drop them.
+    """
+
+    def __init__(self, device, rate, frames_per_buffer, callback, input):
+        self._device = device
+        self._rate = rate
+        self._frames = frames_per_buffer
+        self._callback = callback
+        self._input = input
+        self._active = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        period = self._frames / self._rate / self._device.speed
+        position = 0
+        next_due = time.perf_counter()
+        while self._active:
+            in_data = None
+            time_info = {}
+            if self._input:
+                loop = self._device.loop
+                index = (position + np.arange(self._frames)) % len(loop)
+                in_data = loop[index].tobytes()
+                adc = 1.0 + position / self._rate
+                time_info = {"input_buffer_adc_time": adc,
+                             "current_time": adc + self._frames / self._rate}
+            self._callback(in_data, self._frames, time_info, 0)
+            position += self._frames
+            if self._input:
+                self._device.frames_delivered += self._frames
+            next_due += period
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def is_active(self):
+        return self._active
+
+    def stop_stream(self):
+        self._active = False
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def close(self):
+        self.stop_stream()
+
+
+class FakeDevice:
+    """Stands in for pyaudio.PyAudio: one input device, any output."""
+
+    speed = 1.0
+    loop = None
+    frames_delivered = 0    # input frames at the device rate, all streams
+    rate = 48000
+
+    def get_sample_size(self, format):
+        return 2
+
+    def get_default_input_device_info(self):
+        return {"name": "soak fake input", "index": 0,
+                "defaultSampleRate": float(FakeDevice.rate), "maxInputChannels": 1}
+
+    def get_device_info_by_index(self, index):
+        return self.get_default_input_device_info()
+
+    def get_device_count(self):
+        return 1
+
+    def open(self, format=None, channels=1, rate=SAMPLE_RATE, input=False, output=False,
+             input_device_index=None, frames_per_buffer=CHUNK, stream_callback=None):
+        return FakeStream(FakeDevice, rate, frames_per_buffer, stream_callback, input)
+
+    def terminate(self):
+        pass
+
+
+class StubBackend:
+    """Backend interface without a model: text derived from the chunk's WAV."""
+
+    name = "stub"
+    model_id = "stub"
+
+    def __init__(self, speed: float, rtf: float) -> None:
+        self._speed = speed
+        self._rtf = rtf
+        self.chunks = 0
+        self.seconds = 0.0
+
+    def transcribe(self, audio, on_text=None, timer=None, gate=None, **options):
+        with wave.open(audio, "rb") as wf:
+            seconds = wf.getnframes() / wf.getframerate()
+        self.chunks += 1
+        self.seconds += seconds
+        text = f"chunk {self.chunks} with {seconds:.1f} seconds of audio"
+        if on_text is not None:
+            on_text(text[:len(text) // 2])
+        # Simulated decoding time, accelerated like the audio
+        time.sleep(seconds * self._rtf / self._speed)
+        return {"text": text, "segments": [{"start": 0.0, "end": seconds, "text": text}]}
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        return float("nan")
+
+
+def _open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        pass
+    try:
+        import psutil
+        process = psutil.Process()
+        return process.num_handles() if os.name == "nt" else process.num_fds()
+    except ImportError:
+        return -1
+
+
+class Probe:
+    """Samples process resources and checks them against a baseline."""
+
+    COLUMNS = ("rss_mb", "fds", "threads", "tmp", "text_kb")
+
+    def __init__(self, temp_dir: str, transcriber) -> None:
+        self._temp_dir = temp_dir
+        self._transcriber = transcriber
+        self.baseline = None
+        self.samples = []
+        # A chunk's temp WAV (and its open handles) exist for as long as
+        # process_audio_chunk runs; samples are taken holding this lock so
+        # the chunk in flight is never counted.
+        self._chunk_lock = threading.Lock()
+        process_audio_chunk = transcriber.process_audio_chunk
+
+        def guarded(*args, **kwargs):
+            with self._chunk_lock:
+                return process_audio_chunk(*args, **kwargs)
+
+        transcriber.process_audio_chunk = guarded
+
+    def sample(self, label: str) -> dict:
+        with self._chunk_lock:
+            row = {
+                "rss_mb": _rss_mb(),
+                "fds": _open_fds(),
+                "threads": threading.active_count(),
+                "tmp": len(os.listdir(self._temp_dir)),
+                "text_kb": sum(len(t) for t in self._transcriber.transcriptions) / 1024,
+            }
+        self.samples.append(row)
+        print(f"{label:>14}  " + "  ".join(f"{row[c]:>8.1f}" if isinstance(row[c], float)
+                                          else f"{row[c]:>8}" for c in self.COLUMNS),
+              flush=True)
+        return row
+
+    def set_baseline(self) -> None:
+        self.baseline = self.samples[-1]
+        self.samples = []
+
+    def check(self, phase: str, limits: dict) -> list[str]:
+        """Growth over the baseline, from the lowest of the last three samples."""
+        if self.baseline is None or not self.samples:
+            return []
+        tail = self.samples[-3:]
+        failures = []
+        for column, limit in limits.items():
+            growth = min(row[column] for row in tail) - self.baseline[column]
+            if growth > limit:
+                failures.append(f"{phase}: {column} grew by {growth:.1f} (limit {limit})")
+        return failures
+
+
+def _wait_for_audio(ring, samples: int) -> None:
+    """Poll the ring's clock (wait_until() belongs to the record thread)."""
+    target = ring.written + samples
+    while ring.written < target:
+        time.sleep(0.002)
+
+
+def run_cycles(transcriber, chimes, probe, args) -> None:
+    ring = transcriber.capture.ring
+    session = int(args.session * SAMPLE_RATE)
+    for cycle in range(1, args.cycles + 1):
+        transcriber.transcriptions = []     # as the GUI does at each Start
+        chimes.play_start()
+        transcriber.start_recording(mode=args.mode)
+        _wait_for_audio(ring, session)
+        transcriber.force_process_partial_frames()
+        transcriber.stop_recording()
+        chimes.play_end()
+        if cycle == args.warmup:
+            probe.sample(f"cycle {cycle}")
+            probe.set_baseline()
+        elif cycle % args.report_every == 0 or cycle == args.cycles:
+            probe.sample(f"cycle {cycle}")
+
+
+def run_long(transcriber, probe, args) -> list[str]:
+    ring = transcriber.capture.ring
+    stats = transcriber.capture.stats
+    transcriber.transcriptions = []
+    # The clocks are compared between two points where no input stream runs
+    # (a warm one included), so no block is counted on one side only.
+    transcriber.capture.close()
+    samples_before = stats.samples
+    frames_before = FakeDevice.frames_delivered
+    zero_filled_before = stats.zero_filled_samples
+    transcriber.start_recording(mode=args.mode)
+    probe.sample("0 min")
+    probe.set_baseline()
+    total = int(args.hours * 3600)
+    elapsed = 0
+    while elapsed < total:
+        step = min(LONG_REPORT, total - elapsed)
+        _wait_for_audio(ring, step * SAMPLE_RATE)
+        elapsed += step
+        probe.sample(f"{elapsed // 60} min")
+    transcriber.force_process_partial_frames()
+    transcriber.stop_recording()    # joins the record thread
+    transcriber.capture.close()     # joins the stream thread
+
+    failures = []
+    delivered = (FakeDevice.frames_delivered - frames_before) * SAMPLE_RATE / FakeDevice.rate
+    drift = (stats.samples - samples_before) - delivered
+    print(f"sample clock: {stats.samples - samples_before} samples captured for "
+          f"{delivered:.0f} delivered (drift {drift:+.0f})")
+    if abs(drift) > CHUNK:
+        failures.append(f"long: capture clock drifted {drift:+.0f} samples from the device")
+    zero_filled = stats.zero_filled_samples - zero_filled_before
+    if zero_filled:
+        failures.append(f"long: {zero_filled} samples zero-filled (capture gaps)")
+    if transcriber.capture.ring.overrun_samples:
+        failures.append(f"long: {transcriber.capture.ring.overrun_samples} ring-overrun samples")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cycles", type=int, default=2000, help="start/stop cycles (0 skips)")
+    parser.add_argument("--session", type=float, default=2.0, help="seconds of audio per cycle")
+    parser.add_argument("--hours", type=float, default=1.0, help="long-session audio (0 skips)")
+    parser.add_argument("--chunk", type=int, default=30, help="chunk duration in seconds")
+    parser.add_argument("--speed", type=float, default=100.0, help="audio speed-up factor")
+    parser.add_argument("--rtf", type=float, default=0.05,
+                        help="stub decoding time as a fraction of chunk duration")
+    parser.add_argument("--mode", choices=["normal", "long", "handsfree"], default="normal")
+    parser.add_argument("--warm", action="store_true",
+                        help="keep one input stream open, as MYTRANSCRIBE_WARM_MIC=1 does")
+    parser.add_argument("--device-rate", type=int, default=48000)
+    parser.add_argument("--warmup", type=int, default=20, help="cycles before the baseline")
+    parser.add_argument("--report-every", type=int, default=100)
+    parser.add_argument("--max-rss-mb", type=float, default=64.0)
+    parser.add_argument("--max-fds", type=int, default=4)
+    parser.add_argument("--max-threads", type=int, default=2)
+    parser.add_argument("--max-tmp", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's INFO logs")
+    args = parser.parse_args()
+    if args.cycles and args.warmup >= args.cycles:
+        parser.error("--warmup must be smaller than --cycles")
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    scratch = tempfile.mkdtemp(prefix="mytranscribe-soak-")
+    temp_dir = os.path.join(scratch, "tmp")
+    os.makedirs(temp_dir)
+    # Chunk WAVs land in the scratch temp dir, so its entry count is ours alone
+    tempfile.tempdir = temp_dir
+    os.environ["XDG_CACHE_HOME"] = os.path.join(scratch, "cache")
+    os.environ["MYTRANSCRIBE_HISTORY"] = os.path.join(scratch, "history.sqlite3")
+    os.environ.pop("MYTRANSCRIBE_ARCHIVE", None)
+
+    FakeDevice.speed = args.speed
+    FakeDevice.rate = args.device_rate
+    FakeDevice.loop = speech_loop(args.device_rate)
+    pyaudio.PyAudio = FakeDevice
+
+    backend = StubBackend(args.speed, args.rtf)
+    capture = None
+    if args.warm:
+        from audio_capture import InputCapture
+        capture = InputCapture()
+        capture.open()
+    transcriber = transcriber_v12.RealTimeTranscriber(
+        backend, capture=capture, chunk_duration=args.chunk,
+    )
+    chimes = ChimePlayer()
+    probe = Probe(temp_dir, transcriber)
+    limits = {"rss_mb": args.max_rss_mb, "fds": args.max_fds,
+              "threads": args.max_threads, "tmp": args.max_tmp}
+    print(f"{'':>14}  " + "  ".join(f"{c:>8}" for c in Probe.COLUMNS))
+
+    failures = []
+    started = time.perf_counter()
+    try:
+        if args.cycles:
+            run_cycles(transcriber, chimes, probe, args)
+            failures += probe.check("cycles", limits)
+        if args.hours:
+            failures += run_long(transcriber, probe, args)
+            failures += probe.check("long", limits)
+    finally:
+        chimes.cleanup()
+        transcriber.capture.terminate()
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{backend.chunks} chunks, {backend.seconds / 3600:.2f} h of audio transcribed "
+          f"in {time.perf_counter() - started:.0f} s")
+    if args.keep:
+        print(f"scratch directory kept: {scratch}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("PASS no growth beyond the limits")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+activity_gate.py — Cheap speech detection for hands-free (always-listening) mode.
+
+In hands-free mode the microphone stays open but Whisper only runs on
+utterances: RealTimeTranscriber's record thread feeds the live stream through
+an UtteranceGate every HANDS_FREE_POLL seconds and calls process_audio_chunk
+on each utterance the gate closes.
+
+ActivityDetector is an energy + spectral VAD on 30 ms frames. A frame counts
+as speech when it is
+  - MARGIN_DB above an adaptive noise floor (tracks the quietest recent
+    frames; rises at most NOISE_RISE_DB per second, so steady fans, hum and
+    room tone are absorbed) and above an absolute ABS_MIN_DB,
+  - mostly in the speech band (300-4000 Hz), and
+  - not noise-like: spectral flatness in that band below FLATNESS_MAX (white
+    or fan noise is flat, voiced speech is peaky).
+All frames of a block are analysed with one batched FFT, so a second of audio
+costs a few hundred microseconds.
+
+UtteranceGate turns frame decisions into utterances: ONSET_FRAMES speech
+frames in a row open one (starting PREROLL earlier, so the first syllable is
+kept), HANGOVER of non-speech closes it, and MAX_UTTERANCE cuts long
+monologues into Whisper-window-sized pieces. Clicks and short bumps never
+reach ONSET_FRAMES.
+
+WakePhrase optionally requires a spoken phrase ("hey transcribe ...") at the
+start of an utterance: Whisper runs on every utterance the gate passes, but
+only text following the phrase (and utterances within WAKE_WINDOW after it)
+is kept.
+"""
+
+import os
+import re
+import time
+
+import numpy as np
+
+HANDS_FREE_ENV = "MYTRANSCRIBE_HANDS_FREE"     # "1": Start begins hands-free listening
+WAKE_PHRASE_ENV = "MYTRANSCRIBE_WAKE_PHRASE"   # optional phrase utterances must start with
+
+SAMPLE_RATE = 16000
+FRAME = 480                     # 30 ms
+FFT_SIZE = 512
+SPEECH_BAND = (300, 4000)       # Hz
+MARGIN_DB = 10.0
+ABS_MIN_DB = -55.0              # dBFS; below this nothing is speech
+NOISE_RISE_DB = 1.0             # dB per second the noise floor may climb
+BAND_RATIO_MIN = 0.5
+FLATNESS_MAX = 0.35
+
+ONSET_FRAMES = 5                # 150 ms of speech opens an utterance
+PREROLL = 0.3                   # seconds kept before the onset
+HANGOVER = 0.8                  # seconds of non-speech that end an utterance
+TAIL = 0.2                      # seconds kept after the last speech frame
+MAX_UTTERANCE = 30              # seconds; one Whisper window
+
+WAKE_WINDOW = 10.0              # seconds after a wake phrase that need no phrase
+
+
+def start_mode() -> str:
+    """Recording mode for the GUI's normal Start: "handsfree" or "normal"."""
+    return "handsfree" if os.environ.get(HANDS_FREE_ENV, "0") == "1" else "normal"
+
+
+def wake_phrase():
+    """WakePhrase for $MYTRANSCRIBE_WAKE_PHRASE, or None when unset."""
+    phrase = os.environ.get(WAKE_PHRASE_ENV, "").strip()
+    return WakePhrase(phrase) if phrase else None
+
+
+class ActivityDetector:
+    """Streaming per-frame speech/non-speech decisions for 16 kHz int16 audio."""
+
+    def __init__(self) -> None:
+        self._rest = np.zeros(0, dtype=np.int16)
+        self._window = np.hanning(FRAME).astype(np.float32)
+        freqs = np.fft.rfftfreq(FFT_SIZE, 1 / SAMPLE_RATE)
+        self._band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+        self._rise = NOISE_RISE_DB * FRAME / SAMPLE_RATE
+        self.noise_floor = None   # dBFS
+        self.frames = 0
+        self.speech_frames = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Decisions for every frame completed by `samples` (leftovers carry over)."""
+        data = np.concatenate([self._rest, samples]) if len(self._rest) else samples
+        n = len(data) // FRAME
+        self._rest = data[n * FRAME:].copy()
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        frames = data[:n * FRAME].reshape(n, FRAME).astype(np.float32) / 32768.0
+        energy = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(frames * self._window, FFT_SIZE, axis=1)) ** 2 + 1e-12
+        band = power[:, self._band]
+        ratio = band.sum(axis=1) / power.sum(axis=1)
+        flatness = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+
+        floor = np.empty(n, dtype=np.float64)
+        level = energy[0] if self.noise_floor is None else self.noise_floor
+        for i, e in enumerate(energy):
+            level = min(level + self._rise, e)
+            floor[i] = level
+        self.noise_floor = level
+
+        speech = ((energy > floor + MARGIN_DB) & (energy > ABS_MIN_DB)
+                  & (ratio > BAND_RATIO_MIN) & (flatness < FLATNESS_MAX))
+        self.frames += n
+        self.speech_frames += int(speech.sum())
+        return speech
+
+
+class UtteranceGate:
+    """
+    Feeds contiguous audio to an ActivityDetector and returns finished
+    utterances as (start, end) sample indices on the caller's clock.
+    """
+
+    def __init__(self, detector: ActivityDetector | None = None) -> None:
+        self.detector = detector or ActivityDetector()
+        self._next = None         # sample index of the next frame's start
+        self._run = 0             # consecutive speech frames
+        self._start = None        # open utterance start, or None
+        self._last_speech = 0     # end of the last speech frame
+        self.utterances = 0
+
+    @property
+    def active(self) -> bool:
+        return self._start is not None
+
+    def feed(self, samples: np.ndarray, start: int) -> list[tuple[int, int]]:
+        """`samples` begin at index `start` (contiguous with the previous feed)."""
+        if self._next is None:
+            self._next = start
+        done = []
+        for speech in self.detector.process(samples):
+            frame_start = self._next
+            frame_end = frame_start + FRAME
+            self._next = frame_end
+            if speech:
+                self._run += 1
+                self._last_speech = frame_end
+                if self._start is None and self._run >= ONSET_FRAMES:
+                    onset = frame_end - self._run * FRAME
+                    self._start = max(onset - int(PREROLL * SAMPLE_RATE), 0)
+            else:
+                self._run = 0
+                if (self._start is not None
+                        and frame_end - self._last_speech >= HANGOVER * SAMPLE_RATE):
+                    done.append(self._close(self._last_speech + int(TAIL * SAMPLE_RATE)))
+            if self._start is not None and frame_end - self._start >= MAX_UTTERANCE * SAMPLE_RATE:
+                done.append(self._close(frame_end))
+                self._start = frame_end if self._run else None
+        return done
+
+    def flush(self, end: int) -> list[tuple[int, int]]:
+        """Close an open utterance at `end` (the session is stopping)."""
+        return [self._close(end)] if self._start is not None else []
+
+    def _close(self, end: int) -> tuple[int, int]:
+        span = (self._start, max(end, self._start))
+        self._start = None
+        self.utterances += 1
+        return span
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"[\w']+", text.lower())
+
+
+class WakePhrase:
+    """Keeps only text that follows a spoken wake phrase (or comes shortly after one)."""
+
+    def __init__(self, phrase: str, window: float = WAKE_WINDOW) -> None:
+        self.phrase = _words(phrase)
+        self.window = window
+        self._awake_until = 0.0
+
+    def accept(self, text: str) -> str:
+        """The part of `text` to keep ("" to drop it)."""
+        words = _words(text)
+        now = time.monotonic()
+        if words[:len(self.phrase)] == self.phrase:
+            self._awake_until = now + self.window
+            # Drop the phrase itself: skip past as many words in the original text
+            pattern = r"\W*" + r"\W+".join(re.escape(w) for w in self.phrase) + r"\W*"
+            return re.sub("^" + pattern, "", text, count=1, flags=re.IGNORECASE).strip()
+        if now < self._awake_until:
+            self._awake_until = now + self.window
+            return text
+        return ""
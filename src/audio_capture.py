@@ -0,0 +1,427 @@
+"""
+audio_capture.py — Microphone capture for RealTimeTranscriber.
+
+InputCapture owns a callback-mode PyAudio input stream: PortAudio's own thread
+hands each block to a short Python callback that copies it into an AudioRing,
+a preallocated int16 ring indexed by absolute sample number (the sample clock).
+There is no Python read loop; RealTimeTranscriber sleeps on the ring and drains
+it with its own cursor in batches, which gives it:
+  - pre-roll: a warm capture (opened once and kept open while the window is
+    alive) lets a session start a few hundred ms *before* the hotkey press, so
+    device-open latency and the start chime no longer clip the first syllable;
+  - slack: inference on the record thread (or GUI work holding the GIL) no
+    longer stalls the device read, so audio keeps landing in the ring instead
+    of overflowing PortAudio.
+
+The callback also keeps CaptureStats: overflow flags, gaps found by comparing
+the sample clock against PortAudio's ADC timestamps (or the wall clock when the
+host API provides none), ring overruns and per-block latency. Gaps can
+optionally be zero-filled so ring indices stay aligned with real time.
+
+The stream runs at the device's native rate (defaultSampleRate, typically
+44.1/48 kHz on USB headsets) and each block is converted to 16 kHz in the
+callback by resampler.StreamingResampler, so capture never depends on the
+driver's resampling or on the device accepting 16 kHz. The ring, the stats
+and everything downstream stay on the 16 kHz sample clock.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pyaudio
+
+from cpu_placement import place_capture_thread
+from resampler import StreamingResampler
+
+# Audio configuration (Whisper expects 16 kHz mono int16)
+CHUNK = 1024
+FORMAT = pyaudio.paInt16
+CHANNELS = 1
+SAMPLE_RATE = 16000
+# Ring capacity. Must cover the pre-roll plus the longest time the record
+# thread can spend inside process_audio_chunk() without reading.
+RING_DURATION = 120  # seconds (~3.8 MB of int16)
+
+# Dropped-audio accounting
+ZERO_FILL_GAPS = False      # default for InputCapture(zero_fill_gaps=...)
+GAP_TOLERANCE = 4 * CHUNK   # samples the clocks may disagree before it's a gap
+# Without ADC timestamps the wall clock also sees callback jitter (a GIL stall
+# delays callbacks, then PortAudio delivers the queued blocks in a burst), so a
+# deficit must persist this many blocks before it counts as lost audio.
+GAP_CONFIRM_BLOCKS = 8
+REANCHOR_INTERVAL = 30.0    # seconds; re-anchoring absorbs device clock drift
+LATENCY_HISTORY = 8192      # per-block latency samples kept (~9 min)
+
+# "native" (default): open the device at its default rate and resample here;
+# a number (e.g. 16000) requests that rate from the host API instead.
+CAPTURE_RATE_ENV = "MYTRANSCRIBE_CAPTURE_RATE"
+
+
+class AudioRing:
+    """
+    Preallocated int16 ring buffer addressed by absolute sample index.
+
+    One producer (the capture callback) writes; consumers read [start, end)
+    ranges using indices they track themselves. `written` is the total number
+    of samples ever written, i.e. the capture sample clock.
+
+    Wake-ups are coalesced for a single waiter: write() only notifies once the
+    index passed to wait_until() has been reached, so a consumer waiting for a
+    second of audio is woken once, not once per 64 ms block.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._written = 0
+        # Samples a consumer asked for after they had already been overwritten
+        self.overrun_samples = 0
+        self._wake_at = 0
+        self._wake_generation = 0
+        self._cond = threading.Condition()
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    @property
+    def oldest(self) -> int:
+        """Index of the oldest sample still held in the ring."""
+        return max(0, self._written - self._capacity)
+
+    def write(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self._capacity:
+            samples = samples[-self._capacity:]
+        m = len(samples)
+        start = (self._written + n - m) % self._capacity
+        first = min(m, self._capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        self._buf[:m - first] = samples[first:]
+        with self._cond:
+            self._written += n
+            if self._written >= self._wake_at:
+                self._cond.notify_all()
+
+    def read(self, start: int, end: int) -> bytes:
+        """Return samples [start, end) as int16 bytes (clamped to what is held)."""
+        oldest = self.oldest
+        if start < oldest:
+            logging.warning("Capture ring overrun: %d samples lost", oldest - start)
+            self.overrun_samples += oldest - start
+            start = oldest
+        end = min(end, self._written)
+        if end <= start:
+            return b""
+        i = start % self._capacity
+        j = i + (end - start)
+        if j <= self._capacity:
+            return self._buf[i:j].tobytes()
+        return self._buf[i:].tobytes() + self._buf[:j - self._capacity].tobytes()
+
+    def wait_until(self, index: int, timeout: float) -> bool:
+        """
+        Block until sample `index` has been written. Returns False on timeout
+        or when interrupted by wake_waiters().
+        """
+        with self._cond:
+            self._wake_at = index
+            generation = self._wake_generation
+            return self._cond.wait_for(
+                lambda: self._written >= index or self._wake_generation != generation,
+                timeout,
+            ) and self._written >= index
+
+    def wake_waiters(self) -> None:
+        """Release any wait_until() early (e.g. when the session is stopped)."""
+        with self._cond:
+            self._wake_generation += 1
+            self._cond.notify_all()
+
+
+class CaptureStats:
+    """
+    Capture health counters. Updated only on the PortAudio callback thread;
+    readers take a snapshot() and diff against it with summary().
+    """
+
+    COUNTERS = (
+        "blocks", "samples", "overflow_events", "underflow_events",
+        "gap_events", "missing_samples", "zero_filled_samples", "overrun_samples",
+    )
+
+    def __init__(self, ring: AudioRing) -> None:
+        self._ring = ring
+        self.blocks = 0
+        self.samples = 0              # samples delivered by the device
+        self.overflow_events = 0      # paInputOverflow: PortAudio dropped input
+        self.underflow_events = 0
+        self.gap_events = 0
+        self.missing_samples = 0      # size of gaps found on the sample clock
+        self.zero_filled_samples = 0
+        self.latencies_ms = deque(maxlen=LATENCY_HISTORY)
+        self.latency_count = 0
+        # Where the callback thread runs (cpu_placement); "" = not placed
+        self.placement = ""
+
+    @property
+    def overrun_samples(self) -> int:
+        return self._ring.overrun_samples
+
+    def record_latency(self, ms: float) -> None:
+        self.latencies_ms.append(ms)
+        self.latency_count += 1
+
+    def snapshot(self) -> dict:
+        snap = {name: getattr(self, name) for name in self.COUNTERS}
+        snap["latency_count"] = self.latency_count
+        return snap
+
+    def summary(self, since: dict | None = None) -> dict:
+        """Counters (minus `since`, if given) plus latency percentiles in ms."""
+        now = self.snapshot()
+        base = since or {}
+        result = {name: now[name] - base.get(name, 0) for name in self.COUNTERS}
+        n_new = min(now["latency_count"] - base.get("latency_count", 0),
+                    len(self.latencies_ms))
+        recent = list(self.latencies_ms)[len(self.latencies_ms) - n_new:]
+        if recent:
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+            result.update(latency_p50_ms=float(p50), latency_p95_ms=float(p95),
+                          latency_p99_ms=float(p99),
+                          latency_max_ms=float(max(recent)))
+        if self.placement:
+            result["placement"] = self.placement
+        return result
+
+
+def format_capture_summary(summary: dict) -> str:
+    """One-line, log-friendly rendering of CaptureStats.summary()."""
+    line = (
+        f"{summary['samples'] / SAMPLE_RATE:.1f}s captured, "
+        f"{summary['overflow_events']} overflows, "
+        f"{summary['gap_events']} gaps ({summary['missing_samples']} samples missing, "
+        f"{summary['zero_filled_samples']} zero-filled), "
+        f"{summary['overrun_samples']} ring-overrun samples"
+    )
+    if "latency_p50_ms" in summary:
+        line += (
+            f", block latency p50/p95/p99/max = {summary['latency_p50_ms']:.1f}/"
+            f"{summary['latency_p95_ms']:.1f}/{summary['latency_p99_ms']:.1f}/"
+            f"{summary['latency_max_ms']:.1f} ms"
+        )
+    if "placement" in summary:
+        line += f", capture thread on {summary['placement']}"
+    return line
+
+
+def capture_rate(device_info: dict) -> int:
+    """Rate to open the input at: $MYTRANSCRIBE_CAPTURE_RATE or the device's native rate."""
+    configured = os.environ.get(CAPTURE_RATE_ENV, "native")
+    if configured != "native":
+        try:
+            return int(configured)
+        except ValueError:
+            logging.warning("Ignoring invalid %s=%r", CAPTURE_RATE_ENV, configured)
+    return int(device_info.get("defaultSampleRate") or SAMPLE_RATE)
+
+
+def find_input_device(audio_interface, spec: str) -> int:
+    """
+    Index of the input device named by `spec`: a PyAudio device index, or a
+    case-insensitive substring of the device name (e.g. "monitor" for a
+    PulseAudio/PipeWire loopback source). Raises ValueError if none matches.
+    """
+    if spec.strip().isdigit():
+        return int(spec)
+    wanted = spec.strip().lower()
+    for index in range(audio_interface.get_device_count()):
+        info = audio_interface.get_device_info_by_index(index)
+        if info.get("maxInputChannels", 0) > 0 and wanted in info.get("name", "").lower():
+            return index
+    raise ValueError(f"No input device matching {spec!r}")
+
+
+class InputCapture:
+    """
+    Callback-mode PyAudio input stream feeding an AudioRing.
+
+    open() is idempotent, so a warm capture opened by the GUI at startup and a
+    cold one opened per session by RealTimeTranscriber share the same code path.
+
+    on_block, if set, is called with each raw block on the PortAudio thread
+    (RealTimeTranscriber uses it for the audio level indicator). It must be
+    cheap and must not block.
+
+    zero_fill_gaps=True writes silence into the ring for audio the device
+    clock says is missing, so sample indices keep matching wall-clock time.
+    """
+
+    def __init__(self, audio_interface=None, zero_fill_gaps: bool = ZERO_FILL_GAPS,
+                 device_index: int | None = None) -> None:
+        self._owns_interface = audio_interface is None
+        self.audio_interface = audio_interface or pyaudio.PyAudio()
+        self.device_index = device_index   # None = the host's default input
+        self.ring = AudioRing(RING_DURATION * SAMPLE_RATE)
+        self.stats = CaptureStats(self.ring)
+        self.zero_fill_gaps = zero_fill_gaps
+        self.stream = None
+        self.on_block = None
+        # Rate the device is opened at; blocks are resampled to SAMPLE_RATE
+        # by self.resampler when it differs.
+        self.device_rate = SAMPLE_RATE
+        self.resampler = None
+        # The callback thread places itself (cpu_placement) on its first block
+        self._placed = False
+        # (clock, samples) reference point for gap detection; see _account()
+        self._anchor = None
+        self._late_blocks = 0
+
+    def metrics(self) -> dict:
+        """Lifetime capture health: CaptureStats.summary() with no baseline."""
+        return {**self.stats.summary(), "device_rate": self.device_rate}
+
+    @property
+    def is_open(self) -> bool:
+        return self.stream is not None
+
+    def open(self) -> None:
+        if self.stream is not None:
+            return
+        # Log which input device PyAudio will use (helps diagnose wrong-device capture)
+        device_info = {}
+        try:
+            if self.device_index is None:
+                device_info = self.audio_interface.get_default_input_device_info()
+            else:
+                device_info = self.audio_interface.get_device_info_by_index(self.device_index)
+            logging.info(
+                "Opening input stream on device [%s] index=%s rate=%s channels=%s",
+                device_info.get("name"),
+                device_info.get("index"),
+                device_info.get("defaultSampleRate"),
+                device_info.get("maxInputChannels"),
+            )
+        except Exception as exc:
+            logging.warning("Could not query input device: %s", exc)
+
+        self._placed = False
+        rate = capture_rate(device_info)
+        try:
+            self._open_stream(rate)
+        except Exception as exc:
+            if rate == SAMPLE_RATE:
+                raise
+            logging.warning("Opening the input at %d Hz failed (%s); trying %d Hz",
+                            rate, exc, SAMPLE_RATE)
+            self._open_stream(SAMPLE_RATE)
+        self._anchor = None
+        self._late_blocks = 0
+
+    def _open_stream(self, rate: int) -> None:
+        resampler = StreamingResampler(rate, SAMPLE_RATE) if rate != SAMPLE_RATE else None
+        self.stream = self.audio_interface.open(
+            format=FORMAT,
+            channels=CHANNELS,
+            rate=rate,
+            input=True,
+            input_device_index=self.device_index,
+            # Same block duration as CHUNK at 16 kHz
+            frames_per_buffer=CHUNK * rate // SAMPLE_RATE,
+            stream_callback=self._on_audio,
+        )
+        self.device_rate = rate
+        self.resampler = resampler
+        if resampler is not None:
+            logging.info("Capturing at %d Hz, resampling to %d Hz (%d taps/phase)",
+                         rate, SAMPLE_RATE, resampler.taps)
+
+    def close(self) -> None:
+        if self.stream is None:
+            return
+        self.stream.stop_stream()
+        self.stream.close()
+        self.stream = None
+
+    def terminate(self) -> None:
+        """Close the stream and release PyAudio if this capture created it."""
+        self.close()
+        if self._owns_interface and self.audio_interface is not None:
+            self.audio_interface.terminate()
+            self.audio_interface = None
+
+    def _account(self, frame_count, time_info, status_flags) -> None:
+        """Update CaptureStats for one block; zero-fill a detected gap first."""
+        stats = self.stats
+        stats.blocks += 1
+        if status_flags & pyaudio.paInputOverflow:
+            stats.overflow_events += 1
+        if status_flags & pyaudio.paInputUnderflow:
+            stats.underflow_events += 1
+
+        time_info = time_info or {}
+        adc = time_info.get("input_buffer_adc_time", 0.0)
+        current = time_info.get("current_time", 0.0)
+        timestamped = adc > 0 and current > 0
+        if timestamped:
+            clock = adc
+            stats.record_latency((current - adc) * 1000)
+        else:
+            # No ADC timestamps on this host API: the block's first sample was
+            # captured roughly one block before the callback ran.
+            clock = time.monotonic() - frame_count / SAMPLE_RATE
+
+        if self._anchor is None:
+            self._anchor = (clock, stats.samples)
+        anchor_clock, anchor_samples = self._anchor
+        deficit = (clock - anchor_clock) * SAMPLE_RATE - (stats.samples - anchor_samples)
+        if not timestamped:
+            stats.record_latency(max(0.0, deficit) * 1000 / SAMPLE_RATE)
+
+        if deficit > GAP_TOLERANCE:
+            self._late_blocks += 1
+            if timestamped or self._late_blocks >= GAP_CONFIRM_BLOCKS:
+                missing = int(deficit)
+                stats.gap_events += 1
+                stats.missing_samples += missing
+                if self.zero_fill_gaps:
+                    self.ring.write(np.zeros(missing, dtype=np.int16))
+                    stats.zero_filled_samples += missing
+                logging.warning(
+                    "Capture gap: ~%d ms of audio missing%s",
+                    missing * 1000 // SAMPLE_RATE,
+                    " (zero-filled)" if self.zero_fill_gaps else "",
+                )
+                self._anchor = (clock, stats.samples)
+                self._late_blocks = 0
+        else:
+            self._late_blocks = 0
+            if clock - anchor_clock > REANCHOR_INTERVAL:
+                self._anchor = (clock, stats.samples)
+        stats.samples += frame_count
+
+    def _on_audio(self, in_data, frame_count, time_info, status_flags):
+        """PortAudio callback (PortAudio thread): copy the block into the ring."""
+        try:
+            if not self._placed:
+                self._placed = True
+                self.stats.placement = place_capture_thread()
+            samples = np.frombuffer(in_data, dtype=np.int16)
+            resampler = self.resampler
+            if resampler is not None:
+                samples = resampler.process(samples)
+            self._account(len(samples), time_info, status_flags)
+            self.ring.write(samples)
+            on_block = self.on_block
+            if on_block is not None:
+                on_block(in_data)
+        except Exception:
+            # An exception escaping here would abort the stream
+            logging.error("Error in audio capture callback", exc_info=True)
+        return (None, pyaudio.paContinue)
@@ -0,0 +1,123 @@
+"""
+compiled_encoder.py — TorchScript-compiled Whisper encoder for MyTranscribe.
+
+Every window transcribe() decodes is padded to exactly 30 s, so the encoder
+always sees one input shape: (1, n_mels, 3000). install_compiled_encoder()
+traces the encoder for that shape and swaps model.encoder for a wrapper that
+runs the traced graph when the input matches and the eager module otherwise.
+
+Traced graphs are saved under ~/.cache/mytranscribe/compiled, keyed by a
+fingerprint of the model's dims and weights, the torch version, device and
+dtype, so later startups load the graph instead of re-tracing. Any failure —
+tracing, loading, or a runtime error in the graph — falls back to eager.
+
+The decoder step is left eager: its self-attention KV cache is grown through
+forward hooks that a fixed-shape trace cannot capture.
+
+Opt-in with MYTRANSCRIBE_COMPILE=1.
+"""
+
+import hashlib
+import logging
+import os
+import warnings
+
+import torch
+from torch import nn
+
+logger = logging.getLogger("compiled_encoder")
+
+COMPILE_ENV = "MYTRANSCRIBE_COMPILE"   # "1" enables the compiled encoder
+N_FRAMES = 3000                        # whisper.audio.N_FRAMES (30 s window)
+
+
+def default_cache_dir() -> str:
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "mytranscribe", "compiled")
+
+
+def compile_enabled() -> bool:
+    return os.environ.get(COMPILE_ENV, "0") == "1"
+
+
+def model_fingerprint(model) -> str:
+    """Identify a checkpoint by its dims and a few small encoder tensors."""
+    digest = hashlib.sha256(repr(model.dims).encode())
+    encoder = model.encoder
+    while not hasattr(encoder, "conv1"):
+        # Unwrap CompiledEncoder (.eager) / cpu_features.Bf16Encoder (.encoder)
+        encoder = encoder.eager if isinstance(encoder, CompiledEncoder) else encoder.encoder
+    for tensor in (encoder.conv1.weight, encoder.conv1.bias, encoder.ln_post.weight):
+        digest.update(tensor.detach().float().cpu().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class CompiledEncoder(nn.Module):
+    """Runs the traced encoder for its traced shape/dtype, eager otherwise."""
+
+    def __init__(self, eager: nn.Module, traced, shape: tuple, dtype: torch.dtype) -> None:
+        super().__init__()
+        self.eager = eager
+        self.traced = traced
+        self.shape = shape
+        self.dtype = dtype
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.traced is not None and tuple(x.shape) == self.shape and x.dtype == self.dtype:
+            try:
+                return self.traced(x)
+            except Exception:
+                logger.error("Compiled encoder failed; using eager from now on", exc_info=True)
+                self.traced = None
+        return self.eager(x)
+
+
+def install_compiled_encoder(model, cache_dir: str | None = None) -> bool:
+    """
+    Replace model.encoder with a CompiledEncoder. Returns False (and leaves the
+    model untouched) if the encoder could not be compiled.
+    """
+    if isinstance(model.encoder, CompiledEncoder):
+        return True
+    param = next(model.encoder.parameters())
+    device = param.device
+    # decode() casts the mel to fp16 only on CUDA (fp16=False on CPU).
+    dtype = torch.float16 if device.type == "cuda" else torch.float32
+    shape = (1, model.dims.n_mels, N_FRAMES)
+
+    cache_dir = cache_dir or default_cache_dir()
+    dtype_name = str(dtype).replace("torch.", "")
+    name = (f"encoder-{model_fingerprint(model)}-torch{torch.__version__}"
+            f"-{device.type}-{dtype_name}.pt")
+    path = os.path.join(cache_dir, name)
+
+    traced = None
+    if os.path.isfile(path):
+        try:
+            traced = torch.jit.load(path, map_location=device)
+            logger.info("Loaded compiled encoder from %s", path)
+        except Exception as exc:
+            logger.warning("Ignoring unreadable compiled encoder %s (%s)", path, exc)
+
+    if traced is None:
+        try:
+            example = torch.zeros(shape, dtype=dtype, device=device)
+            with torch.no_grad(), warnings.catch_warnings():
+                # The shape assert in AudioEncoder.forward is expected to be
+                # baked in; the wrapper only routes matching shapes here.
+                warnings.simplefilter("ignore", torch.jit.TracerWarning)
+                traced = torch.jit.trace(model.encoder.eval(), example, check_trace=False)
+            logger.info("Traced Whisper encoder for %s %s", shape, dtype_name)
+        except Exception as exc:
+            logger.warning("Encoder compilation failed (%s); staying eager", exc)
+            return False
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            torch.jit.save(traced, tmp)
+            os.replace(tmp, path)
+        except Exception as exc:
+            logger.warning("Could not cache compiled encoder (%s)", exc)
+
+    model.encoder = CompiledEncoder(model.encoder, traced, shape, dtype)
+    return True
@@ -0,0 +1,97 @@
+"""
+cpu_features.py — CPU capability detection for MyTranscribe.
+
+Used at model load to decide whether the CPU Whisper encoder can run under
+bfloat16 autocast. Native bf16 needs AVX512-BF16 or AMX (Intel Cooper Lake /
+Sapphire Rapids and later, AMD Zen 4 and later); on other CPUs oneDNN emulates
+bf16 and is slower than fp32, so those machines stay on fp32.
+
+Only the encoder is switched: its 1500-frame matmuls are compute-bound and
+gain from bf16, while each decoder step is a handful of matrix-vector products
+where autocast's per-call weight casts cost more than they save. Weights stay
+fp32 and the encoder output is cast back to fp32, so decoding is unchanged
+apart from bf16 rounding in the audio features (scripts/bench.py --only bf16
+reports the error and whether transcripts differ).
+"""
+
+import logging
+import os
+import sys
+
+import torch
+from torch import nn
+
+logger = logging.getLogger("cpu_features")
+
+BF16_ENV = "MYTRANSCRIBE_BF16"   # "auto" (default), "1" force on, "0" off
+BF16_FLAGS = ("avx512_bf16", "amx_bf16")
+
+
+def _proc_cpuinfo_flags() -> set[str]:
+    """x86 feature flags from /proc/cpuinfo (Linux only; empty elsewhere)."""
+    try:
+        with open("/proc/cpuinfo", encoding="ascii", errors="replace") as fh:
+            for line in fh:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def native_bf16_features() -> list[str]:
+    """Names of the native bf16 features this CPU has (empty if none)."""
+    probes = getattr(torch._C, "_cpu", None)
+    if probes is not None and hasattr(probes, "_is_avx512_bf16_supported"):
+        # torch's cpuinfo-based probes work on every OS
+        found = []
+        if probes._is_avx512_bf16_supported():
+            found.append("avx512_bf16")
+        if getattr(probes, "_is_amx_tile_supported", lambda: False)():
+            found.append("amx")
+        return found
+    if sys.platform.startswith("linux"):
+        return sorted(_proc_cpuinfo_flags().intersection(BF16_FLAGS))
+    return []
+
+
+def use_cpu_bf16() -> bool:
+    """Whether CPU inference should run under bf16 autocast ($MYTRANSCRIBE_BF16)."""
+    mode = os.environ.get(BF16_ENV, "auto")
+    if mode == "0":
+        return False
+    if mode == "1":
+        logger.info("CPU bf16 autocast forced on by %s", BF16_ENV)
+        return True
+    try:
+        features = native_bf16_features()
+    except Exception as exc:
+        logger.warning("CPU feature detection failed (%s); using fp32", exc)
+        return False
+    if features:
+        logger.info("CPU supports native bf16 (%s); using bf16 autocast", ", ".join(features))
+        return True
+    logger.info("No native CPU bf16 support; using fp32")
+    return False
+
+
+class Bf16Encoder(nn.Module):
+    """Runs the wrapped encoder under CPU bf16 autocast; returns fp32 features."""
+
+    def __init__(self, encoder: nn.Module) -> None:
+        super().__init__()
+        self.encoder = encoder
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return self.encoder(x).float()
+
+
+def install_bf16_encoder(model) -> bool:
+    """Wrap model.encoder in a Bf16Encoder if this CPU model should use bf16."""
+    if isinstance(model.encoder, Bf16Encoder):
+        return True
+    if next(model.encoder.parameters()).is_cuda or not use_cpu_bf16():
+        return False
+    model.encoder = Bf16Encoder(model.encoder)
+    return True
@@ -0,0 +1,128 @@
+"""
+cpu_placement.py — Keep audio capture off the cores inference runs on (Linux).
+
+Under full torch load every intra-op worker is runnable, and on a 4-core
+laptop the PortAudio callback thread (which copies each block into the
+capture ring) waits its turn behind them: block latency spikes and the
+device overflows. With MYTRANSCRIBE_CAPTURE_CPU set:
+
+  - apply_placement(), called once at startup before torch builds its thread
+    pool, restricts every existing thread of the process to the other cores
+    and caps torch's intra-op threads to match; threads created later inherit
+    that mask;
+  - place_capture_thread(), called by InputCapture from its first callback of
+    each stream, moves that PortAudio thread alone onto the reserved core and,
+    with MYTRANSCRIBE_CAPTURE_RT=1, raises it to SCHED_FIFO (or, without the
+    rtprio limit/CAP_SYS_NICE for that, to a negative nice value if allowed).
+
+Only the callback thread is moved: the record thread drains the ring but also
+runs inference, whose calling thread is torch's worker 0. The placement chosen
+is reported in the capture summary next to the block latency and overflow
+counts it is meant to improve. Elsewhere (and on machines with fewer than
+two usable cores) both calls do nothing.
+"""
+
+import logging
+import os
+import sys
+import threading
+
+logger = logging.getLogger("cpu_placement")
+
+CAPTURE_CPU_ENV = "MYTRANSCRIBE_CAPTURE_CPU"    # "auto" (last core), a core number, or "off"
+CAPTURE_RT_ENV = "MYTRANSCRIBE_CAPTURE_RT"      # "1" raises the capture thread's priority
+RT_PRIORITY = 10        # SCHED_FIFO priority (1-99); above SCHED_OTHER, below audio servers
+FALLBACK_NICE = -10
+
+_reserved = None        # core kept for capture once apply_placement() succeeded
+_lock = threading.Lock()
+
+
+def _supported() -> bool:
+    return sys.platform.startswith("linux") and hasattr(os, "sched_setaffinity")
+
+
+def reserved_cpu() -> int | None:
+    """The core to reserve for capture per $MYTRANSCRIBE_CAPTURE_CPU, or None."""
+    configured = os.environ.get(CAPTURE_CPU_ENV, "").strip().lower()
+    if configured in ("", "off") or not _supported():
+        return None
+    allowed = os.sched_getaffinity(0)
+    if len(allowed) < 2:
+        logger.warning("%s ignored: only %d usable core", CAPTURE_CPU_ENV, len(allowed))
+        return None
+    if configured == "auto":
+        return max(allowed)
+    try:
+        cpu = int(configured)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", CAPTURE_CPU_ENV, configured)
+        return None
+    if cpu not in allowed:
+        logger.warning("%s=%d is not one of this process's cores %s",
+                       CAPTURE_CPU_ENV, cpu, sorted(allowed))
+        return None
+    return cpu
+
+
+def apply_placement() -> int | None:
+    """
+    Reserve a core for capture and confine the rest of the process (torch
+    included) to the others. Idempotent; returns the reserved core or None.
+    """
+    global _reserved
+    with _lock:
+        if _reserved is not None:
+            return _reserved
+        cpu = reserved_cpu()
+        if cpu is None:
+            return None
+        others = os.sched_getaffinity(0) - {cpu}
+        for tid in os.listdir("/proc/self/task"):
+            try:
+                os.sched_setaffinity(int(tid), others)
+            except OSError:
+                pass            # thread exited meanwhile
+        import torch
+        if torch.get_num_threads() > len(others):
+            torch.set_num_threads(len(others))
+        _reserved = cpu
+        logger.info("Capture reserved CPU %d; inference on CPUs %s with %d torch threads",
+                    cpu, sorted(others), torch.get_num_threads())
+        return cpu
+
+
+def place_capture_thread() -> str:
+    """
+    Move the calling (capture callback) thread onto the reserved core and
+    raise its priority if configured. Returns a description for the capture
+    summary, "" when placement is off.
+    """
+    cpu = _reserved
+    if cpu is None:
+        return ""
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError as exc:
+        logger.warning("Could not pin the capture thread to CPU %d: %s", cpu, exc)
+        return ""
+    placement = f"CPU {cpu}"
+    if os.environ.get(CAPTURE_RT_ENV, "0") == "1":
+        placement += ", " + _raise_priority()
+    logger.info("Capture thread %d on %s", threading.get_native_id(), placement)
+    return placement
+
+
+def _raise_priority() -> str:
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(RT_PRIORITY))
+        return f"SCHED_FIFO {RT_PRIORITY}"
+    except OSError:
+        pass
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), FALLBACK_NICE)
+        return f"nice {FALLBACK_NICE}"
+    except OSError:
+        logger.warning("No permission to raise the capture thread's priority "
+                       "(needs an rtprio limit or CAP_SYS_NICE)")
+        return "default priority"
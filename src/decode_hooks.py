@@ -0,0 +1,626 @@
+"""
+decode_hooks.py — Instrumented Whisper decoding for MyTranscribe.
+
+openai-whisper's transcribe() only returns once every 30-second window has been
+fully decoded, so on CPU the GUI shows nothing for several seconds per window.
+This module routes transcribe()'s per-window decode() calls through a
+DecodingTask subclass that reports the text of the current window as the greedy
+decoder produces it.
+
+The same loop also abandons a window early when the decoder is clearly
+hallucinating — a repeating n-gram, a runaway compression ratio, or a
+<|nospeech|> probability high enough that nothing useful will follow — instead
+of burning CPU up to the sample_len token limit and filtering afterwards.
+
+With a draft model (load_draft_model), greedy windows are decoded
+speculatively: tiny/tiny.en proposes a few tokens, the target model scores them
+in one forward pass and keeps the longest prefix matching its own greedy
+choices, so the text is unchanged but fewer sequential target passes run.
+
+With an EncoderBatcher, windows that concurrent transcribe() calls on the same
+model have ready at the same time (e.g. a microphone and a loopback session
+cut on the same sample clock) are encoded in one batched encoder pass; each
+window's features are also reused across transcribe()'s temperature fallbacks.
+
+Passing a timer (transcriber_v12.StageTimer) records "features" (audio load
+and log-Mel, up to the first decode), "encoder" and "decoder" spans per window.
+
+The shared Whisper model is never mutated: transcribe_streaming() hands
+whisper.transcribe() a thin delegating proxy whose decode() builds the hooked
+task, so concurrent callers (and the plain model.transcribe path) are unaffected.
+"""
+
+import contextlib
+import threading
+import time
+from dataclasses import replace
+from typing import Callable, Optional
+
+import logging
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+import whisper
+from whisper.decoding import DecodingOptions, DecodingTask, GreedyDecoder
+from whisper.utils import compression_ratio
+
+# Called with the text decoded so far for the whole transcribe() call.
+TextCallback = Callable[[str], None]
+
+# Early-abort thresholds (greedy decoding only).
+# A loop is a trailing run of text tokens with period <= REPEAT_MAX_PERIOD that
+# repeats at least REPEAT_MIN_COUNT times and spans REPEAT_MIN_TOKENS tokens, so
+# "no, no, no" survives but "!!!!!!!!!!!!" and "Thank you. Thank you. ..." don't.
+REPEAT_MAX_PERIOD = 16
+REPEAT_MIN_COUNT = 3
+REPEAT_MIN_TOKENS = 12
+# Same threshold transcribe() uses to reject a finished window, checked every
+# COMPRESSION_CHECK_EVERY tokens once COMPRESSION_MIN_TOKENS have been decoded.
+COMPRESSION_RATIO_ABORT = 2.4
+COMPRESSION_MIN_TOKENS = 32
+COMPRESSION_CHECK_EVERY = 8
+# Stricter than transcribe()'s no_speech_threshold (0.6), which is only
+# applied together with a low average log-probability after the full decode.
+NO_SPEECH_ABORT = 0.8
+# Speculative decoding: draft tokens proposed per target forward pass.
+DRAFT_TOKENS = 4
+# Cross-session encoder batching (EncoderBatcher): how long a window waits for
+# windows of other in-flight transcribe() calls, and the largest batch.
+BATCH_WAIT = 0.2
+MAX_BATCH = 8
+
+
+class StreamingDecodingTask(DecodingTask):
+    """
+    DecodingTask whose main loop reports partial text after every sampled token
+    and can abandon a window that is degenerating into a hallucination.
+
+    Only single-sequence greedy decoding is streamed or guarded (the
+    configuration used by RealTimeTranscriber); beam search and best-of-n run
+    exactly as upstream does, because there is no single "current" hypothesis.
+    """
+
+    def __init__(self, model, options: DecodingOptions,
+                 on_text: Optional[TextCallback] = None,
+                 abort_hallucinations: bool = False,
+                 timer=None, draft_model=None, audio_features=None) -> None:
+        super().__init__(model, options)
+        self._timer = timer
+        # Precomputed encoder output for the window (EncoderBatcher), if any
+        self._audio_features = audio_features
+        self._draft_model = draft_model
+        self._draft_cache: dict = {}
+        self._draft_hooks: list = []
+        self._draft_fed: list[int] = []
+        self._draft_kv_modules = (
+            [b.attn.key for b in draft_model.decoder.blocks]
+            + [b.attn.value for b in draft_model.decoder.blocks]
+            if draft_model is not None else []
+        )
+        self.draft_proposed = 0
+        self.draft_accepted = 0
+        self._on_text = on_text
+        self._abort_hallucinations = abort_hallucinations
+        self._text_tokens: list[int] = []
+        # Column in the tokens tensor of each entry in _text_tokens.
+        self._text_positions: list[int] = []
+        self._stream_text = ""
+        self.abort_reason: Optional[str] = None
+
+    def _publish_text(self) -> None:
+        """Send the window text to on_text if it changed since the last call."""
+        if self._on_text is None:
+            return
+        text = self.tokenizer.decode(self._text_tokens)
+        # A multi-byte character split across BPE tokens decodes to U+FFFD
+        # until its final byte arrives — wait rather than flash garbage.
+        if text.endswith("\ufffd") or text == self._stream_text:
+            return
+        self._stream_text = text
+        self._on_text(text.strip())
+
+    def _repetition_start(self) -> Optional[int]:
+        """Index into _text_tokens where a trailing repetition loop begins."""
+        toks = self._text_tokens
+        for period in range(1, REPEAT_MAX_PERIOD + 1):
+            count = max(REPEAT_MIN_COUNT, -(-REPEAT_MIN_TOKENS // period))
+            span = period * count
+            if len(toks) < span:
+                continue
+            tail = toks[-span:]
+            if tail[period:] == tail[:-period]:
+                # Keep one copy of the repeated unit; it may really have been said.
+                return len(toks) - span + period
+        return None
+
+    def _check_abort(self, step: int, no_speech_prob: float) -> Optional[int]:
+        """
+        Return the number of tokens to keep if the window should be abandoned
+        (sample_begin drops everything sampled), else None.
+        """
+        if step == 0 and no_speech_prob > NO_SPEECH_ABORT:
+            self.abort_reason = f"no_speech_prob={no_speech_prob:.2f}"
+            return self.sample_begin
+        if not self._text_tokens:
+            return None
+
+        loop_start = self._repetition_start()
+        if loop_start is not None:
+            self.abort_reason = "repetition loop"
+            return self._text_positions[loop_start]
+
+        n_text = len(self._text_tokens)
+        if n_text >= COMPRESSION_MIN_TOKENS and n_text % COMPRESSION_CHECK_EVERY == 0:
+            ratio = compression_ratio(self.tokenizer.decode(self._text_tokens))
+            if ratio > COMPRESSION_RATIO_ABORT:
+                self.abort_reason = f"compression_ratio={ratio:.2f}"
+                return self.sample_begin
+        return None
+
+    def _get_audio_features(self, mel: torch.Tensor):
+        # The draft model (if any) encodes the same window itself.
+        self._mel = mel
+        if self._audio_features is not None:
+            return super()._get_audio_features(self._audio_features)
+        if self._timer is None:
+            return super()._get_audio_features(mel)
+        with self._timer.span("encoder"):
+            return super()._get_audio_features(mel)
+
+    def _main_loop(self, audio_features: torch.Tensor, tokens: torch.Tensor):
+        if self._timer is None:
+            return self._decode_loop(audio_features, tokens)
+        start = time.perf_counter()
+        result = self._decode_loop(audio_features, tokens)
+        self._timer.record("decoder", time.perf_counter() - start,
+                           tokens=result[0].shape[-1] - self.sample_begin,
+                           **({"drafted": self.draft_proposed,
+                               "accepted": self.draft_accepted}
+                              if self._draft_model is not None else {}))
+        return result
+
+    def _track(self, step: int, tokens: torch.Tensor, no_speech_prob: float,
+               sum_logprobs: torch.Tensor):
+        """Streaming/early-abort hook after each sampled token; returns (tokens, aborted)."""
+        token = int(tokens[0, -1])
+        # Timestamp and special tokens sort after <|endoftext|>.
+        if token < self.tokenizer.eot:
+            self._text_tokens.append(token)
+            self._text_positions.append(tokens.shape[-1] - 1)
+
+        keep = None
+        if self._abort_hallucinations:
+            keep = self._check_abort(step, no_speech_prob)
+        if keep is not None:
+            tokens = tokens[:, :keep]
+            n_kept = sum(1 for pos in self._text_positions if pos < keep)
+            del self._text_tokens[n_kept:], self._text_positions[n_kept:]
+            # The discarded tokens must not drag avg_logprob below
+            # transcribe()'s logprob_threshold and trigger a
+            # temperature-fallback re-decode of the same garbage.
+            sum_logprobs.zero_()
+            self._publish_text()
+            logging.info(
+                "Decoder abandoned window after %d tokens (%s); kept %d",
+                step + 1, self.abort_reason, n_kept,
+            )
+            return tokens, True
+        self._publish_text()
+        return tokens, False
+
+    def _step(self, step: int, tokens: torch.Tensor, logits: torch.Tensor,
+              sum_logprobs: torch.Tensor, no_speech_probs: list, tracking: bool):
+        """Filter logits for the next position, sample one token; returns (tokens, stop)."""
+        for logit_filter in self.logit_filters:
+            logit_filter.apply(logits, tokens)
+
+        tokens, completed = self.decoder.update(tokens, logits, sum_logprobs)
+
+        if tracking:
+            tokens, aborted = self._track(step, tokens, no_speech_probs[0], sum_logprobs)
+            if aborted:
+                return tokens, True
+        stop = completed or tokens.shape[-1] > self.n_ctx or step + 1 >= self.sample_len
+        return tokens, bool(stop)
+
+    def _decode_loop(self, audio_features: torch.Tensor, tokens: torch.Tensor):
+        # Mirrors whisper.decoding.DecodingTask._main_loop (openai-whisper
+        # 20240930) with streaming and early-abort hooks after each update.
+        n_batch = tokens.shape[0]
+        sum_logprobs = torch.zeros(n_batch, device=audio_features.device)
+        no_speech_probs = [np.nan] * n_batch
+        tracking = n_batch == 1 and (self._on_text is not None
+                                     or self._abort_hallucinations)
+        speculative = (self._draft_model is not None and n_batch == 1
+                       and isinstance(self.decoder, GreedyDecoder)
+                       and self.decoder.temperature == 0)
+
+        try:
+            if speculative:
+                tokens = self._speculative_loop(audio_features, tokens, sum_logprobs,
+                                                no_speech_probs, tracking)
+            else:
+                for i in range(self.sample_len):
+                    logits = self.inference.logits(tokens, audio_features)
+
+                    if i == 0 and self.tokenizer.no_speech is not None:
+                        probs_at_sot = logits[:, self.sot_index].float().softmax(dim=-1)
+                        no_speech_probs = probs_at_sot[:, self.tokenizer.no_speech].tolist()
+
+                    # now we need to consider the logits at the last token only
+                    tokens, stop = self._step(i, tokens, logits[:, -1], sum_logprobs,
+                                              no_speech_probs, tracking)
+                    if stop:
+                        break
+        finally:
+            self.inference.cleanup_caching()
+            for hook in self._draft_hooks:
+                hook.remove()
+            self._draft_cache, self._draft_hooks = {}, []
+
+        return tokens, sum_logprobs, no_speech_probs
+
+    # ── Speculative (draft-assisted) greedy decoding ──────────────────────────
+    def _speculative_loop(self, audio_features, tokens, sum_logprobs,
+                          no_speech_probs, tracking):
+        """
+        Greedy decoding where the draft model proposes up to DRAFT_TOKENS
+        tokens and the target scores all of them in one forward pass. Every
+        token is still chosen by _step() from the target's own logits, so the
+        output is the plain greedy output; drafts only decide how many target
+        positions are computed per forward pass.
+        """
+        model = self.inference.model
+        cache = self.inference.kv_cache
+        if not cache:
+            cache, self.inference.hooks = model.install_kv_cache_hooks()
+            self.inference.kv_cache = cache
+        draft = self._draft_model
+        self._draft_cache, self._draft_hooks = draft.install_kv_cache_hooks()
+        draft_features = draft.embed_audio(self._mel)
+        self._draft_fed = []
+
+        pending = None   # target logits for the position after `tokens`
+        step = 0
+        while True:
+            if pending is None:
+                n_cached = _cache_length(cache, model)
+                logits = _decoder_forward(model, cache, tokens[:, n_cached:], audio_features)
+                if step == 0 and self.tokenizer.no_speech is not None:
+                    probs_at_sot = logits[:, self.sot_index].float().softmax(dim=-1)
+                    no_speech_probs[:] = probs_at_sot[:, self.tokenizer.no_speech].tolist()
+                pending = logits[:, -1]
+
+            tokens, stop = self._step(step, tokens, pending, sum_logprobs,
+                                      no_speech_probs, tracking)
+            step += 1
+            if stop:
+                return tokens
+
+            # The feed [last token, d1..dk] occupies positions up to len + k - 1.
+            budget = min(DRAFT_TOKENS, self.sample_len - step, self.n_ctx - tokens.shape[-1])
+            drafts = self._propose(tokens, draft_features, budget) if budget > 0 else []
+            if not drafts:
+                pending = None
+                continue
+
+            feed = torch.cat([tokens[:, -1:], tokens.new_tensor([drafts])], dim=-1)
+            logits = _decoder_forward(model, cache, feed, audio_features)
+            self.draft_proposed += len(drafts)
+            pending = logits[:, -1]
+            for j, drafted in enumerate(drafts):
+                tokens, stop = self._step(step, tokens, logits[:, j], sum_logprobs,
+                                          no_speech_probs, tracking)
+                step += 1
+                if stop:
+                    return tokens
+                if int(tokens[0, -1]) != drafted:
+                    # Target disagreed: keep its token, drop cache entries
+                    # computed for the rejected drafts.
+                    _truncate_cache(cache, self.inference.kv_modules, tokens.shape[-1] - 1)
+                    pending = None
+                    break
+                self.draft_accepted += 1
+
+    def _propose(self, tokens: torch.Tensor, draft_features: torch.Tensor, k: int) -> list:
+        """Up to k greedy draft tokens continuing `tokens` (same logit filters)."""
+        history = tokens[0].tolist()
+        fed = self._draft_fed
+        n = 0
+        limit = min(len(fed), len(history) - 1)   # need logits after the last token
+        while n < limit and fed[n] == history[n]:
+            n += 1
+        if n < len(fed):
+            _truncate_cache(self._draft_cache, self._draft_kv_modules, n)
+            del fed[n:]
+
+        feed = history[n:]
+        proposal = []
+        for _ in range(k):
+            logits = _decoder_forward(self._draft_model, self._draft_cache,
+                                      tokens.new_tensor([feed]), draft_features)[:, -1]
+            fed.extend(feed)
+            for logit_filter in self.logit_filters:
+                logit_filter.apply(logits, tokens)
+            drafted = int(logits.argmax(dim=-1))
+            proposal.append(drafted)
+            if drafted == self.tokenizer.eot:
+                break
+            tokens = torch.cat([tokens, tokens.new_tensor([[drafted]])], dim=-1)
+            feed = [drafted]
+        return proposal
+
+
+def _cache_length(cache: dict, model) -> int:
+    """Number of positions held in a decoder's self-attention KV cache."""
+    key = model.decoder.blocks[0].attn.key
+    return cache[key].shape[1] if key in cache else 0
+
+
+def _truncate_cache(cache: dict, modules, length: int) -> None:
+    for module in modules:
+        if module in cache:
+            cache[module] = cache[module][:, :length]
+
+
+def _decoder_forward(model, cache: dict, tokens: torch.Tensor,
+                     audio_features: torch.Tensor) -> torch.Tensor:
+    """
+    TextDecoder.forward for several new tokens on top of a non-empty KV cache.
+
+    Whisper's own forward slices its causal mask as if the new tokens started at
+    position 0, which is only correct for the first pass or a single token; here
+    the mask is offset by the cached length. Keys/values still go through the
+    projection modules, so install_kv_cache_hooks() grows `cache` as usual.
+    """
+    decoder = model.decoder
+    offset = _cache_length(cache, model)
+    n_new = tokens.shape[-1]
+    x = decoder.token_embedding(tokens) + decoder.positional_embedding[offset:offset + n_new]
+    x = x.to(audio_features.dtype)
+    mask = None
+    if n_new > 1:
+        mask = torch.full((n_new, offset + n_new), float("-inf"),
+                          dtype=x.dtype, device=x.device).triu_(offset + 1)
+
+    for block in decoder.blocks:
+        attn = block.attn
+        h = block.attn_ln(x)
+        q = attn.query(h)
+        attn.key(h)     # hooks append to cache
+        attn.value(h)
+        k, v = cache[attn.key], cache[attn.value]
+        q, k, v = (t.view(*t.shape[:2], attn.n_head, -1).permute(0, 2, 1, 3) for t in (q, k, v))
+        a = F.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+        x = x + attn.out(a.permute(0, 2, 1, 3).flatten(start_dim=2))
+        x = x + block.cross_attn(block.cross_attn_ln(x), audio_features, kv_cache=cache)[0]
+        x = x + block.mlp(block.mlp_ln(x))
+
+    x = decoder.ln(x)
+    return (x @ torch.transpose(decoder.token_embedding.weight.to(x.dtype), 0, 1)).float()
+
+
+def load_draft_model(target, name: str = "auto"):
+    """
+    Draft model for speculative decoding with `target`, or None if there is no
+    compatible one. "auto" picks tiny.en for English-only targets and tiny for
+    multilingual ones; the draft must share the vocabulary and Mel bins (so
+    large-v3 and turbo, with 128 Mel bins, have no draft).
+    """
+    import model_cache
+
+    if name == "auto":
+        name = "tiny" if target.is_multilingual else "tiny.en"
+    draft = model_cache.load_model(name, device=target.device)
+    if (draft.dims.n_vocab != target.dims.n_vocab
+            or draft.dims.n_mels != target.dims.n_mels):
+        logging.warning("Draft model %s is incompatible with the target model; "
+                        "speculative decoding disabled", name)
+        return None
+    if draft.dims == target.dims:
+        logging.info("Target model is as small as the draft; speculative decoding disabled")
+        return None
+    logging.info("Speculative decoding with draft model %s", name)
+    return draft
+
+
+class _EncodeRequest:
+    def __init__(self, mel: torch.Tensor, fp16: bool) -> None:
+        self.mel = mel
+        self.fp16 = fp16
+        self.features: Optional[torch.Tensor] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def done(self) -> bool:
+        return self.features is not None or self.error is not None
+
+
+class EncoderBatcher:
+    """
+    Coalesces encoder passes of concurrent transcribe() calls on one model.
+
+    The first window to arrive leads: if other transcriptions are in flight
+    (session() counts them) it waits up to `wait` seconds for their windows,
+    then encodes everything pending as one batch inside its own gate, so the
+    batch is scheduled like one of its windows. The others take their slice of
+    the output. With a single transcription in flight nothing waits.
+    """
+
+    def __init__(self, model, wait: float = BATCH_WAIT, max_batch: int = MAX_BATCH) -> None:
+        self.model = model
+        self.wait = wait
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._active = 0
+        self._pending: list[_EncodeRequest] = []
+        self._leading = False
+        self.batches = 0
+        self.windows = 0
+
+    @contextlib.contextmanager
+    def session(self):
+        """Mark one transcribe() call in flight for the duration of the block."""
+        with self._cond:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def encode(self, mel: torch.Tensor, fp16: bool = False, gate=None,
+               timer=None) -> torch.Tensor:
+        """Encoder output for `mel` (1, n_mels, n_frames), possibly batched."""
+        request = _EncodeRequest(mel, fp16)
+        with self._cond:
+            self._pending.append(request)
+            self._cond.notify_all()
+            while self._leading and not request.done:
+                self._cond.wait()
+            if not request.done:
+                self._leading = True
+                deadline = time.monotonic() + self.wait
+                while len(self._pending) < min(self._active, self.max_batch):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._pending.remove(request)
+                others = [r for r in self._pending if r.fp16 == fp16][:self.max_batch - 1]
+                for other in others:
+                    self._pending.remove(other)
+                batch = [request] + others
+        if not request.done:
+            try:
+                self._run(batch, gate, timer)
+            finally:
+                with self._cond:
+                    self._leading = False
+                    self._cond.notify_all()
+        if request.error is not None:
+            raise request.error
+        return request.features
+
+    def _run(self, batch: list[_EncodeRequest], gate, timer) -> None:
+        mel = torch.cat([r.mel for r in batch])
+        if batch[0].fp16:
+            mel = mel.half()
+        try:
+            with gate() if gate is not None else contextlib.nullcontext(), \
+                    timer.span("encoder", batch=len(batch)) if timer is not None \
+                    else contextlib.nullcontext():
+                features = self.model.encoder(mel)
+        except BaseException as exc:
+            for r in batch:
+                r.error = exc
+            raise
+        self.batches += 1
+        self.windows += len(batch)
+        for i, r in enumerate(batch):
+            r.features = features[i:i + 1]
+
+
+class _HookedModel:
+    """
+    Delegating proxy handed to whisper.transcribe() in place of the model.
+
+    Every attribute resolves to the wrapped model except decode(), which runs a
+    StreamingDecodingTask and stitches finished windows together so the
+    callback always receives the full text decoded so far.
+    """
+
+    def __init__(self, model, on_text: Optional[TextCallback],
+                 abort_hallucinations: bool, timer=None, draft_model=None,
+                 gate=None, batcher: Optional[EncoderBatcher] = None) -> None:
+        self._model = model
+        self._draft_model = draft_model
+        self._gate = gate
+        self._batcher = batcher
+        self._features: Optional[torch.Tensor] = None
+        self._on_text = on_text
+        self._abort_hallucinations = abort_hallucinations
+        self._timer = timer
+        # transcribe() loads audio and computes the log-Mel spectrogram before
+        # the first decode(); that interval is the "features" span.
+        self._created = time.perf_counter()
+        self._finished: list[str] = []
+        self._last_segment: Optional[torch.Tensor] = None
+        self._last_text = ""
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def _publish(self, window_text: str) -> None:
+        parts = self._finished + [window_text] if window_text else self._finished
+        self._on_text(" ".join(parts))
+
+    @torch.no_grad()
+    def decode(self, mel: torch.Tensor, options: DecodingOptions = DecodingOptions(),
+               **kwargs):
+        # transcribe() re-decodes the same segment tensor when it falls back to
+        # a higher temperature; only a new segment freezes the previous text.
+        if self._created is not None:
+            if self._timer is not None:
+                self._timer.record("features", time.perf_counter() - self._created)
+            self._created = None
+        if mel is not self._last_segment:
+            if self._last_text:
+                self._finished.append(self._last_text)
+            self._last_segment = mel
+            self._last_text = ""
+            self._features = None
+
+        # Same contract as whisper.decoding.decode().
+        if single := mel.ndim == 2:
+            mel = mel.unsqueeze(0)
+        if kwargs:
+            options = replace(options, **kwargs)
+        if self._batcher is not None and single and self._features is None:
+            self._features = self._batcher.encode(mel, options.fp16, self._gate, self._timer)
+
+        on_text = self._publish if self._on_text is not None else None
+        task = StreamingDecodingTask(
+            self._model, options,
+            on_text=on_text,
+            abort_hallucinations=self._abort_hallucinations,
+            timer=self._timer,
+            draft_model=self._draft_model,
+            audio_features=self._features if single else None,
+        )
+        if self._gate is None:
+            result = task.run(mel)
+        else:
+            with self._gate():
+                result = task.run(mel)
+        if single:
+            self._last_text = result[0].text
+        return result[0] if single else result
+
+
+def transcribe_streaming(model, audio, on_text: Optional[TextCallback] = None,
+                         abort_hallucinations: bool = False, timer=None,
+                         draft_model=None, gate=None,
+                         batcher: Optional[EncoderBatcher] = None,
+                         **transcribe_kwargs) -> dict:
+    """
+    Drop-in replacement for model.transcribe(audio, **kwargs).
+
+    on_text, if given, is called from the calling thread with the text decoded
+    so far each time the decoder samples a new word piece. With
+    abort_hallucinations=True a window that trips one of the early-abort checks
+    is cut short and its hallucinated tail dropped from the result. timer, if
+    given, receives per-window stage timings (see module docstring).
+    draft_model (see load_draft_model) enables speculative greedy decoding.
+    gate, if given, is entered around every window's decode (see
+    inference_scheduler); the model is only touched inside it. batcher (an
+    EncoderBatcher for this model) batches the encoder with other callers.
+    """
+    hooked = _HookedModel(model, on_text, abort_hallucinations, timer, draft_model,
+                          gate, batcher)
+    if batcher is None:
+        return whisper.transcribe(hooked, audio, **transcribe_kwargs)
+    with batcher.session():
+        return whisper.transcribe(hooked, audio, **transcribe_kwargs)
@@ -0,0 +1,247 @@
+"""
+diagnostics.py — In-process profiling for deployed MyTranscribe installs.
+
+SamplingProfiler takes periodic sys._current_frames() snapshots of every
+Python thread (GUI, record thread, pynput listener, inference, capture
+callback) from a daemon thread and aggregates them into collapsed stacks —
+the "frame;frame;frame count" format consumed by flamegraph.pl, speedscope
+and inferno. It needs nothing outside the standard library and its cost is
+bounded by the sampling interval, so it can ship installed in production
+builds and be switched on only when a workstation misbehaves.
+
+StallWatchdog measures Qt event-loop latency from a heartbeat timer and, when
+the GUI thread is blocked past a threshold, logs how long and where (its stack
+as seen from a watchdog thread), keeping a per-session stall histogram.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger("diagnostics")
+
+PROFILE_INTERVAL = 0.005   # seconds between snapshots (~200 Hz)
+PROFILE_MAX_DEPTH = 64     # frames kept per stack (innermost are kept)
+PROFILE_MAX_STACKS = 50_000  # distinct stacks kept; bounds memory on long runs
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def format_stack(frame, max_depth: int = PROFILE_MAX_DEPTH) -> list[str]:
+    """Outermost-first list of 'function (file:line)' labels for `frame`."""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler over all Python threads.
+
+    start()/stop() may be called from any thread; stop() writes the collapsed
+    stacks to a file and returns its path. toggle() flips between the two and
+    is what the signal handler and debug shortcut call.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL,
+                 output_dir: str | None = None) -> None:
+        self.interval = interval
+        self.output_dir = output_dir or tempfile.gettempdir()
+        self._stacks: Counter = Counter()
+        self._dropped = 0
+        self._samples = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stacks = Counter()
+            self._dropped = 0
+            self._samples = 0
+            self._stop_event.clear()
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(
+                target=self._run, name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+        logger.info("Sampling profiler started (%.0f Hz)", 1 / self.interval)
+
+    def stop(self) -> str | None:
+        """Stop sampling and dump collapsed stacks; returns the output path."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return None
+        self._stop_event.set()
+        thread.join()
+        return self.dump()
+
+    def toggle(self) -> str | None:
+        if self.running:
+            return self.stop()
+        self.start()
+        return None
+
+    def dump(self, path: str | None = None) -> str:
+        """Write 'thread;frame;...;frame count' lines, heaviest stacks first."""
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(self.output_dir, f"mytranscribe-profile-{stamp}.collapsed")
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self._stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+        elapsed = time.monotonic() - self._started_at
+        logger.info(
+            "Sampling profiler wrote %d stacks (%d samples over %.1f s, %d dropped) to %s",
+            len(self._stacks), self._samples, elapsed, self._dropped, path,
+        )
+        return path
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                labels = format_stack(frame)
+                labels.insert(0, names.get(ident, f"thread-{ident}"))
+                # Semicolons separate frames in the collapsed format
+                key = ";".join(label.replace(";", ":") for label in labels)
+                if key in self._stacks or len(self._stacks) < PROFILE_MAX_STACKS:
+                    self._stacks[key] += 1
+                else:
+                    self._dropped += 1
+            self._samples += 1
+
+
+# ── GUI stall watchdog ───────────────────────────────────────────────────────
+STALL_THRESHOLD = 0.100     # seconds of event-loop latency that count as a stall
+HEARTBEAT_INTERVAL = 0.050  # seconds between heartbeat QTimer ticks
+HANG_REPORT_AFTER = 2.0     # log an ongoing stall from the watchdog thread after this
+STALL_BUCKETS_MS = (100, 250, 500, 1000, 2000)   # histogram lower bounds
+
+
+class StallWatchdog:
+    """
+    Measures event-loop latency of one thread (the Qt GUI thread).
+
+    The owner calls beat() from a timer on that thread every `interval`
+    seconds. A watchdog thread checks how overdue the next beat is; once it is
+    more than `threshold` late it snapshots the monitored thread's stack, so
+    the logged stack shows what was blocking rather than what ran afterwards.
+    The stall itself is logged and bucketed when the next beat arrives.
+    """
+
+    def __init__(self, thread_ident: int, threshold: float = STALL_THRESHOLD,
+                 interval: float = HEARTBEAT_INTERVAL) -> None:
+        self.thread_ident = thread_ident
+        self.threshold = threshold
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_beat = time.monotonic()
+        self._stall_stack: list[str] | None = None
+        self._hang_reported = False
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.lifetime = self._new_histogram()
+        self.session = self._new_histogram()
+
+    @staticmethod
+    def _new_histogram() -> dict:
+        return {"count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "buckets": {low: 0 for low in STALL_BUCKETS_MS}}
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._last_beat = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="stall-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def begin_session(self) -> None:
+        """Reset the per-session histogram (called when a recording starts)."""
+        with self._lock:
+            self.session = self._new_histogram()
+
+    def beat(self) -> None:
+        """Heartbeat; must be called on the monitored thread."""
+        now = time.monotonic()
+        with self._lock:
+            latency = now - self._last_beat - self.interval
+            self._last_beat = now
+            stack, self._stall_stack = self._stall_stack, None
+            self._hang_reported = False
+        if latency < self.threshold:
+            return
+        latency_ms = latency * 1000
+        with self._lock:
+            for hist in (self.lifetime, self.session):
+                hist["count"] += 1
+                hist["total_ms"] += latency_ms
+                hist["max_ms"] = max(hist["max_ms"], latency_ms)
+                bucket = max((low for low in STALL_BUCKETS_MS if latency_ms >= low),
+                             default=STALL_BUCKETS_MS[0])
+                hist["buckets"][bucket] += 1
+        logger.warning(
+            "GUI thread stalled %.0f ms; blocked in:\n  %s",
+            latency_ms, "\n  ".join(stack) if stack else "(stack not captured)",
+        )
+
+    def summary(self, session: bool = True) -> str:
+        """One-line histogram, e.g. '3 stalls (max 420 ms): 100+:2 250+:1 ...'."""
+        with self._lock:
+            hist = self.session if session else self.lifetime
+            if not hist["count"]:
+                return "no stalls"
+            buckets = " ".join(f"{low}+:{n}" for low, n in hist["buckets"].items())
+            return (f"{hist['count']} stalls (max {hist['max_ms']:.0f} ms, "
+                    f"total {hist['total_ms']:.0f} ms): {buckets}")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.threshold / 4):
+            with self._lock:
+                overdue = time.monotonic() - self._last_beat - self.interval
+                capture = overdue >= self.threshold and self._stall_stack is None
+                hang = overdue >= HANG_REPORT_AFTER and not self._hang_reported
+            if not (capture or hang):
+                continue
+            frame = sys._current_frames().get(self.thread_ident)
+            stack = format_stack(frame) if frame is not None else []
+            del frame
+            with self._lock:
+                if capture:
+                    self._stall_stack = stack
+                if hang:
+                    self._hang_reported = True
+            if hang:
+                logger.warning(
+                    "GUI thread unresponsive for %.1f s so far; blocked in:\n  %s",
+                    overdue, "\n  ".join(stack),
+                )
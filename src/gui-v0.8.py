@@ -7,8 +7,10 @@ import whisper
 import numpy as np
 import logging
 from transcriber_v12 import RealTimeTranscriber
+from activity_gate import start_mode
 from pynput import keyboard
 from sound_utils import ChimePlayer
+import model_cache
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk, GLib
@@ -75,7 +77,7 @@ class TranscriptionApp:
         # Default "small" matches the original Linux hardware config; override
         # via env var to use a larger model on beefier GPUs (mirrors gui_qt.py).
         model_name = os.environ.get("MYTRANSCRIBE_MODEL", "small")
-        self.model = whisper.load_model(model_name, device=self.device)
+        self.model = model_cache.load_model(model_name, device=self.device)
         self.transcriber = RealTimeTranscriber(self.model)
         
         # Initialize chime player for audio feedback
@@ -256,7 +258,7 @@ class TranscriptionApp:
         self.transcriber.transcriptions = []
         self.update_button_states()
         
-        self.transcriber.start_recording(mode="normal")
+        self.transcriber.start_recording(mode=start_mode())
         # Very frequent updates (30ms) for smoother audio level visualization
         self.update_timeout_id = GLib.timeout_add(30, self.update_transcription_callback)
     
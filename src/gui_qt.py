@@ -9,6 +9,8 @@ Architecture:
   - Single QMainWindow (TranscriptionWindow).
   - Whisper inference runs in a plain threading.Thread (owned by RealTimeTranscriber).
   - Audio indicator and text area are polled every 30 ms by a QTimer on the GUI thread.
+  - Stop flushes the final chunk on a worker thread (AppState.STOPPING) so the poll
+    timer keeps showing decoder output token by token until the result is ready.
   - All widget access happens on the GUI thread (no QThread, no lock-free writes to Qt).
   - HotkeyBridge owns the pynput Listener; it emits hotkey_pressed via pyqtSignal
     using QueuedConnection so the slot always runs on the GUI thread (Risk R08, R23).
@@ -16,9 +18,11 @@ Architecture:
 
 import sys
 import os
+import gc
 import signal
 import logging
 import threading
+import time
 from pathlib import Path
 from enum import Enum, auto
 
@@ -42,8 +46,12 @@ from pynput import keyboard as pynput_keyboard
 # Resolve via __file__ so the import works regardless of cwd (Risk R15).
 _SRC_DIR = Path(__file__).parent
 sys.path.insert(0, str(_SRC_DIR))
-from transcriber_v12 import RealTimeTranscriber   # noqa: E402
+from transcriber_v12 import RealTimeTranscriber, TIMINGS, TorchBackend, load_backend   # noqa: E402
+from activity_gate import start_mode              # noqa: E402
+from audio_capture import InputCapture            # noqa: E402
+from multi_source import EXTRA_SOURCES_ENV, MultiSourceTranscriber, parse_sources   # noqa: E402
 from sound_utils import ChimePlayer               # noqa: E402
+from diagnostics import SamplingProfiler, StallWatchdog   # noqa: E402
 
 # ── Logging ──────────────────────────────────────────────────────────────────
 # Set stdout to UTF-8 so non-ASCII transcripts don't crash the log (Risk R26).
@@ -68,7 +76,15 @@ POLL_INTERVAL_MS         = 30       # §6.2 — do not change to "save CPU"
 HOTKEY_CLIPBOARD_DELAY_MS = 150     # Risk R09 / R-arch-B: delay clipboard write
                                     # when triggered by hotkey (modifiers still held)
 WHISPER_MODEL            = "large-v3"   # override with $MYTRANSCRIBE_MODEL
+WARM_MIC_ENV             = "MYTRANSCRIBE_WARM_MIC"  # "1" keeps the mic open for pre-roll
 LONG_MODE_PLACEHOLDER    = "Recording in long mode..."
+IDLE_UNLOAD_ENV          = "MYTRANSCRIBE_IDLE_UNLOAD_S"  # "0" keeps the model resident
+IDLE_UNLOAD_S            = 900      # release the model after 15 min without recording
+PROFILE_DIR_ENV          = "MYTRANSCRIBE_PROFILE_DIR"  # where profiler dumps go
+PROFILE_SHORTCUT         = "Ctrl+Shift+P"   # debug toggle for the sampling profiler
+STALL_MS_ENV             = "MYTRANSCRIBE_STALL_MS"  # stall threshold; "0" disables
+STALL_THRESHOLD_MS       = 100
+HEARTBEAT_INTERVAL_MS    = 50       # watchdog heartbeat; also runs Python signal handlers
 
 # ── QSS Stylesheet ───────────────────────────────────────────────────────────
 APP_QSS = """
@@ -146,9 +162,10 @@ class AppState(Enum):
     IDLE             = auto()
     NORMAL_RECORDING = auto()
     LONG_RECORDING   = auto()
-    # STOPPING is transient (milliseconds); widget state = IDLE during it.
-    # No dedicated enum value needed — widgets are set to IDLE enablement
-    # before stop_recording() is called.
+    # STOPPING lasts while the final chunk is decoded on a worker thread. All
+    # buttons are disabled and the poll timer streams partial text; the end
+    # chime plays on entry so the user hears Stop immediately.
+    STOPPING         = auto()
 
 
 # ── HotkeyBridge ─────────────────────────────────────────────────────────────
@@ -177,6 +194,9 @@ class HotkeyBridge(QObject):
     def __init__(self, parent: QObject | None = None) -> None:
         super().__init__(parent)
         self._listener: pynput_keyboard.GlobalHotKeys | None = None
+        # perf_counter() of the most recent activation, stamped on the pynput
+        # thread so start latency includes the queued hop to the GUI thread.
+        self.last_activation: float | None = None
 
     def start(self) -> None:
         """Create and start the GlobalHotKeys listener (daemon thread)."""
@@ -203,6 +223,7 @@ class HotkeyBridge(QObject):
         Ctrl+Alt+Q combination is pressed. MUST NOT touch any Qt widget directly.
         Emitting the signal with a QueuedConnection hops to the GUI thread.
         """
+        self.last_activation = time.perf_counter()
         logger.info("Global hotkey Ctrl+Alt+Q detected")
         self.hotkey_pressed.emit()
 
@@ -223,9 +244,15 @@ class TranscriptionWindow(QMainWindow):
         staleness is acceptable per UX contract §6.3).
       - HotkeyBridge owns the pynput Listener (OS thread); its hotkey_pressed
         signal uses QueuedConnection so on_hotkey always runs on the GUI thread.
+      - The Stop flush runs on a short-lived worker thread; it hands the final
+        text back through stop_finished (QueuedConnection) to _on_stop_finished.
     """
 
-    def __init__(self) -> None:
+    # Emitted by the stop worker thread: (final_text, from_hotkey).
+    stop_finished = pyqtSignal(str, bool)
+
+    def __init__(self, profiler: SamplingProfiler | None = None,
+                 watchdog: StallWatchdog | None = None) -> None:
         super().__init__()
 
         # ── Window chrome ───────────────────────────────────────────────────
@@ -249,10 +276,24 @@ class TranscriptionWindow(QMainWindow):
         # Whisper model and transcriber are created lazily on first recording
         # start to keep the window-show fast (model load can take several seconds).
         self._device      = None   # set in _ensure_model_loaded()
-        self._model       = None   # set in _ensure_model_loaded()
+        self._model       = None   # set in _ensure_model_loaded(); None while unloaded
+        self._model_name  = None
+        self._reload_thread: threading.Thread | None = None
         self._transcriber = None   # set in _ensure_model_loaded()
         self._chime       = ChimePlayer()
 
+        # Optional warm microphone: opened now and kept open for the window's
+        # lifetime so Start is instant and includes ~500 ms of pre-roll audio.
+        self._capture = None
+        if os.environ.get(WARM_MIC_ENV, "0") == "1":
+            try:
+                self._capture = InputCapture()
+                self._capture.open()
+                logger.info("Warm microphone capture enabled (pre-roll active)")
+            except Exception as exc:
+                logger.warning("Warm microphone unavailable, using per-session stream: %s", exc)
+                self._capture = None
+
         # ── State machine ────────────────────────────────────────────────────
         self._state = AppState.IDLE
 
@@ -269,12 +310,28 @@ class TranscriptionWindow(QMainWindow):
         )
         self._hotkey_bridge.start()
 
+        # ── Stop worker → GUI thread hand-off ───────────────────────────────
+        self.stop_finished.connect(
+            self._on_stop_finished,
+            Qt.ConnectionType.QueuedConnection
+        )
+
         # ── Poll timer (started only when recording is active) ───────────────
         self._poll_timer = QTimer(self)
         self._poll_timer.setInterval(POLL_INTERVAL_MS)
         self._poll_timer.timeout.connect(self._poll_tick)
         # Do NOT call start() here; started in _start_normal() / _start_long()
 
+        # ── Idle unload timer (restarted on every return to IDLE) ────────────
+        try:
+            self._idle_unload_s = int(os.environ.get(IDLE_UNLOAD_ENV, IDLE_UNLOAD_S))
+        except ValueError:
+            logger.warning("Ignoring invalid %s", IDLE_UNLOAD_ENV)
+            self._idle_unload_s = IDLE_UNLOAD_S
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._unload_idle_model)
+
         # ── Spacebar shortcut (window-scoped, focus-independent) ─────────────
         # keyPressEvent alone doesn't fire reliably because QTextEdit (read-only)
         # still grabs keyboard focus and consumes Space. A window-scoped QShortcut
@@ -283,6 +340,14 @@ class TranscriptionWindow(QMainWindow):
         self._space_shortcut.setContext(Qt.ShortcutContext.WindowShortcut)
         self._space_shortcut.activated.connect(self._on_space_pressed)
 
+        # ── Diagnostics (owned by main()) ────────────────────────────────────
+        self._watchdog = watchdog
+        self._profiler = profiler
+        if profiler is not None:
+            self._profile_shortcut = QShortcut(QKeySequence(PROFILE_SHORTCUT), self)
+            self._profile_shortcut.setContext(Qt.ShortcutContext.WindowShortcut)
+            self._profile_shortcut.activated.connect(self._on_profile_toggle)
+
     # ── Lazy model loader ──────────────────────────────────────────────────────
     def _ensure_model_loaded(self) -> None:
         """
@@ -296,12 +361,21 @@ class TranscriptionWindow(QMainWindow):
         Available models from the installed openai-whisper are logged at startup.
         """
         if self._transcriber is not None:
+            if not self._transcriber.model_loaded:
+                self._reload_model_async()
             return
         model_name = os.environ.get("MYTRANSCRIBE_MODEL", WHISPER_MODEL)
+        self._model_name = model_name
         logger.info("Loading Whisper model '%s' ...", model_name)
-        self._device = "cuda" if torch.cuda.is_available() else "cpu"
-        self._model = whisper.load_model(model_name, device=self._device)
-        self._transcriber = RealTimeTranscriber(self._model)
+        self._model = self._load_model()
+        extra_sources = parse_sources(os.environ.get(EXTRA_SOURCES_ENV, ""))
+        if extra_sources:
+            # Microphone plus loopback/second devices, one shared model
+            self._transcriber = MultiSourceTranscriber(
+                self._model, extra_sources, capture=self._capture
+            )
+        else:
+            self._transcriber = RealTimeTranscriber(self._model, capture=self._capture)
         logger.info("Whisper model loaded on %s", self._device)
 
         # CUDA warmup — run one dummy inference on silence so kernel compilation
@@ -312,11 +386,65 @@ class TranscriptionWindow(QMainWindow):
             try:
                 import numpy as _np
                 _silent = _np.zeros(16000, dtype=_np.float32)  # 1 s of silence
-                self._model.transcribe(_silent, fp16=True, language="en", task="transcribe")
+                self._model.transcribe(_silent, language="en", task="transcribe")
                 logger.info("CUDA warmup complete")
             except Exception as exc:
                 logger.warning("CUDA warmup skipped: %s", exc)
 
+    def _load_model(self):
+        """
+        Load self._model_name through transcriber_v12.load_backend(), as the
+        server does: $MYTRANSCRIBE_BACKEND selects ONNX Runtime on CPU or the
+        memory-mapped weight cache with this machine's tuning (GPU, compiled or
+        bf16 encoder, draft model). Sets self._device to where it runs.
+        """
+        backend = load_backend(self._model_name)
+        on_gpu = (isinstance(backend, TorchBackend)
+                  and next(backend.model.parameters()).is_cuda)
+        self._device = "cuda" if on_gpu else "cpu"
+        return backend
+
+    def _reload_model_async(self) -> None:
+        """
+        Reload an idle-unloaded model on a worker thread. Recording starts
+        immediately; the transcriber buffers audio and its first chunk waits
+        until set_model() (or model_load_failed()) is called.
+        """
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return
+        self._transcriber.begin_model_reload()
+        self._reload_thread = threading.Thread(
+            target=self._reload_worker, name="model-reload", daemon=True
+        )
+        self._reload_thread.start()
+
+    def _reload_worker(self) -> None:
+        """Worker thread: load from the model cache, then hand to the transcriber."""
+        started = time.perf_counter()
+        try:
+            model = self._load_model()
+        except Exception as exc:
+            logger.error("Model reload failed", exc_info=True)
+            self._transcriber.model_load_failed(exc)
+            return
+        self._model = model
+        self._transcriber.set_model(model)
+        logger.info("Whisper model reloaded in %.2f s", time.perf_counter() - started)
+
+    def _unload_idle_model(self) -> None:
+        """Idle timer slot: release the model until the next recording."""
+        if (self._state != AppState.IDLE or self._transcriber is None
+                or not self._transcriber.model_loaded):
+            return
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return
+        self._transcriber.unload_model()
+        self._model = None
+        gc.collect()
+        if self._device == "cuda":
+            torch.cuda.empty_cache()
+        logger.info("Whisper model unloaded after %d s idle", self._idle_unload_s)
+
     # ── UI construction ────────────────────────────────────────────────────────
     def _build_ui(self) -> None:
         """Constructs all widgets, sets objectNames, wires click signals, assembles layouts."""
@@ -405,60 +533,105 @@ class TranscriptionWindow(QMainWindow):
 
         recording = new_state in (AppState.NORMAL_RECORDING, AppState.LONG_RECORDING)
 
-        # Widget enablement (UX §3.4)
-        self._start_btn.setEnabled(not recording)
-        self._long_btn.setEnabled(not recording)
+        # Widget enablement (UX §3.4); nothing is clickable while STOPPING.
+        idle = new_state == AppState.IDLE
+        self._start_btn.setEnabled(idle)
+        self._long_btn.setEnabled(idle)
         self._stop_btn.setEnabled(recording)
 
-        # Audio indicator: hide immediately when going idle
-        if new_state == AppState.IDLE:
+        # Idle unload countdown runs only while IDLE with a model resident
+        if idle and self._idle_unload_s > 0 and self._transcriber is not None:
+            self._idle_timer.start(self._idle_unload_s * 1000)
+        else:
+            self._idle_timer.stop()
+
+        # Audio indicator: hide immediately once capture ends
+        if not recording:
             self._audio_indicator.setVisible(False)
 
         # Chimes on state entry (UX §3.5)
-        if new_state in (AppState.NORMAL_RECORDING, AppState.LONG_RECORDING):
+        if recording:
             if old_state == AppState.IDLE:
                 self._chime.play_start()
-        elif new_state == AppState.IDLE:
-            if old_state in (AppState.NORMAL_RECORDING, AppState.LONG_RECORDING):
-                self._chime.play_end()
+        elif old_state in (AppState.NORMAL_RECORDING, AppState.LONG_RECORDING):
+            self._chime.play_end()
 
     # ── Action methods ────────────────────────────────────────────────────────
-    def _start_normal(self) -> None:
-        """Transition Idle → NormalRecording."""
+    def _start_normal(self, requested_at: float | None = None) -> None:
+        """
+        Transition Idle → NormalRecording.
+        requested_at is the perf_counter() of the triggering input (for latency logs).
+        """
         if self._state != AppState.IDLE:
             return   # guard against double-fire
+        if self._watchdog is not None:
+            self._watchdog.begin_session()   # model load counts toward this session
+        if requested_at is None:
+            requested_at = time.perf_counter()
         self._ensure_model_loaded()
         self._text_area.setPlainText("")
         self._transcriber.transcriptions = []
         self._set_state(AppState.NORMAL_RECORDING)   # plays start chime
-        self._transcriber.start_recording(mode="normal")
+        self._transcriber.start_recording(mode=start_mode(), requested_at=requested_at)
         self._poll_timer.start()
 
     def _start_long(self) -> None:
         """Transition Idle → LongRecording."""
         if self._state != AppState.IDLE:
             return
+        requested_at = time.perf_counter()
+        if self._watchdog is not None:
+            self._watchdog.begin_session()   # model load counts toward this session
         self._ensure_model_loaded()
         self._text_area.setPlainText("")
         self._transcriber.transcriptions = []
         self._set_state(AppState.LONG_RECORDING)   # plays start chime
-        self._transcriber.start_recording(mode="long")
+        self._transcriber.start_recording(mode="long", requested_at=requested_at)
         self._poll_timer.start()
 
     def _stop_recording(self, from_hotkey: bool = False) -> None:
         """
-        Transition any recording state → Idle.
+        Transition any recording state → Stopping.
+
+        The final flush (force_process_partial_frames + stop_recording) decodes
+        the last chunk, which takes seconds on CPU. It runs on a worker thread
+        so the poll timer keeps streaming partial text; _on_stop_finished
+        completes the transition to Idle.
+        """
+        if self._state not in (AppState.NORMAL_RECORDING, AppState.LONG_RECORDING):
+            return   # guard (also ignores repeat Stop while STOPPING)
+        self._set_state(AppState.STOPPING)   # plays end chime, hides indicator
+        self._stop_requested_at = time.perf_counter()
+        threading.Thread(
+            target=self._stop_worker,
+            args=(from_hotkey,),
+            name="stop-flush",
+            daemon=True,
+        ).start()
+
+    def _stop_worker(self, from_hotkey: bool) -> None:
+        """Worker thread: flush and stop the transcriber, then hand back the text."""
+        try:
+            self._transcriber.force_process_partial_frames()
+            self._transcriber.stop_recording()
+        except Exception:
+            logger.error("Error while stopping transcription", exc_info=True)
+        final_text = "\n".join(self._transcriber.transcriptions)
+        self.stop_finished.emit(final_text, from_hotkey)
+
+    def _on_stop_finished(self, final_text: str, from_hotkey: bool) -> None:
+        """
+        Transition Stopping → Idle. GUI thread (queued from _stop_worker).
         from_hotkey=True defers the clipboard write by HOTKEY_CLIPBOARD_DELAY_MS
         to avoid the modifier-release race (Risk R-arch-B).
         """
-        if self._state == AppState.IDLE:
-            return   # guard
+        if self._state != AppState.STOPPING:
+            return   # window closed mid-flush
+        TIMINGS.record("stop_flush", time.perf_counter() - self._stop_requested_at)
+        if self._watchdog is not None:
+            logger.info("GUI stalls this session: %s", self._watchdog.summary())
         self._poll_timer.stop()
-        self._set_state(AppState.IDLE)   # plays end chime, hides indicator
-        self._transcriber.force_process_partial_frames()
-        self._transcriber.stop_recording()
-
-        final_text = "\n".join(self._transcriber.transcriptions)
+        self._set_state(AppState.IDLE)
         # Defer clipboard write when triggered by hotkey to avoid modifier-release race.
         # Button-driven stop writes immediately; hotkey-driven stop waits 150 ms.
         if from_hotkey:
@@ -496,20 +669,30 @@ class TranscriptionWindow(QMainWindow):
 
     # ── Poll timer callback ───────────────────────────────────────────────────
     def _poll_tick(self) -> None:
-        """Called every 30 ms while recording. Runs on GUI thread."""
-        if self._state == AppState.LONG_RECORDING:
+        """Called every 30 ms while recording or stopping. Runs on GUI thread."""
+        partial = self._transcriber.partial_text
+        if self._state == AppState.LONG_RECORDING or (
+            self._state == AppState.STOPPING
+            and self._transcriber.long_mode and not partial
+        ):
             self._text_area.setPlainText(LONG_MODE_PLACEHOLDER)
-        elif self._state == AppState.NORMAL_RECORDING:
-            current = "\n".join(self._transcriber.transcriptions)
-            self._text_area.setPlainText(current)
+        elif self._state in (AppState.NORMAL_RECORDING, AppState.STOPPING):
+            lines = list(self._transcriber.transcriptions)
+            if partial:
+                lines.append(partial)
+            text = "\n".join(lines)
+            if text != self._text_area.toPlainText():
+                with TIMINGS.span("gui_publish", chars=len(text)):
+                    self._text_area.setPlainText(text)
         else:
             # State became IDLE between timer fire and this call — stop the timer.
             self._poll_timer.stop()
             return
 
         # Audio indicator: show/hide based on backend flag
-        self._audio_indicator.setVisible(self._transcriber.audio_detected)
-        self._reposition_indicator()
+        if self._state != AppState.STOPPING:
+            self._audio_indicator.setVisible(self._transcriber.audio_detected)
+            self._reposition_indicator()
 
     # ── Keyboard handling ─────────────────────────────────────────────────────
     def _on_space_pressed(self) -> None:
@@ -527,6 +710,12 @@ class TranscriptionWindow(QMainWindow):
             self._stop_recording(from_hotkey=False)
         # LongRecording: intentional no-op per UX §4.1 / §3.3
 
+    def _on_profile_toggle(self) -> None:
+        """Start/stop the sampling profiler (PROFILE_SHORTCUT); logs the dump path."""
+        path = self._profiler.toggle()
+        if path is not None:
+            logger.info("Profile saved: %s", path)
+
     # ── Global hotkey slot ────────────────────────────────────────────────────
     def on_hotkey(self) -> None:
         """
@@ -542,7 +731,7 @@ class TranscriptionWindow(QMainWindow):
             # Bring window forward (UX §1.10)
             self.raise_()
             self.activateWindow()
-            self._start_normal()
+            self._start_normal(requested_at=self._hotkey_bridge.last_activation)
         elif self._state == AppState.NORMAL_RECORDING:
             self._stop_recording(from_hotkey=True)
         # LongRecording: intentional no-op (UX §3.3, §4.2)
@@ -556,9 +745,13 @@ class TranscriptionWindow(QMainWindow):
 
         # 2. Stop poll timer
         self._poll_timer.stop()
+        if TIMINGS.enabled:
+            TIMINGS.log_summary()
 
-        # 3. Stop recording if active — do NOT copy to clipboard on shutdown (UX §6.4)
-        if self._state != AppState.IDLE and self._transcriber is not None:
+        # 3. Stop recording if active — do NOT copy to clipboard on shutdown (UX §6.4).
+        #    A STOPPING flush is left to its daemon worker thread.
+        if (self._state in (AppState.NORMAL_RECORDING, AppState.LONG_RECORDING)
+                and self._transcriber is not None):
             try:
                 self._transcriber.force_process_partial_frames()
             except Exception:
@@ -567,7 +760,7 @@ class TranscriptionWindow(QMainWindow):
                 self._transcriber.stop_recording()
             except Exception:
                 pass
-            self._state = AppState.IDLE
+        self._state = AppState.IDLE
 
         # 4. Cleanup chime player (releases PyAudio stream)
         if hasattr(self, "_chime") and self._chime is not None:
@@ -576,13 +769,20 @@ class TranscriptionWindow(QMainWindow):
             except Exception:
                 pass
 
-        # 5. Release GPU memory (Risk R30)
+        # 5. Close the warm microphone stream, if any
+        if self._capture is not None:
+            try:
+                self._capture.terminate()
+            except Exception:
+                pass
+
+        # 6. Release GPU memory (Risk R30)
         try:
             torch.cuda.empty_cache()
         except Exception:
             pass
 
-        # 6. Accept the close event → Qt destroys the window and exits event loop
+        # 7. Accept the close event → Qt destroys the window and exits event loop
         event.accept()
         QApplication.quit()
 
@@ -621,10 +821,45 @@ def main() -> None:
     except Exception as exc:
         logger.warning("Could not list whisper models: %s", exc)
 
-    window = TranscriptionWindow()
+    # GUI stall watchdog: a heartbeat QTimer on this thread; a watchdog thread
+    # logs the duration and stack of any event-loop stall past the threshold.
+    watchdog = None
+    try:
+        stall_ms = float(os.environ.get(STALL_MS_ENV, STALL_THRESHOLD_MS))
+    except ValueError:
+        logger.warning("Ignoring invalid %s", STALL_MS_ENV)
+        stall_ms = STALL_THRESHOLD_MS
+    if stall_ms > 0:
+        watchdog = StallWatchdog(
+            threading.get_ident(),
+            threshold=stall_ms / 1000,
+            interval=HEARTBEAT_INTERVAL_MS / 1000,
+        )
+    # The heartbeat also matters without the watchdog: Python only runs signal
+    # handlers between bytecodes, and while Qt sits in exec() none execute.
+    heartbeat = QTimer()
+    heartbeat.timeout.connect(watchdog.beat if watchdog is not None else (lambda: None))
+    heartbeat.start(HEARTBEAT_INTERVAL_MS)
+    if watchdog is not None:
+        watchdog.start()
+
+    # Built-in sampling profiler: SIGUSR2 (POSIX) or PROFILE_SHORTCUT toggles
+    # it; collapsed stacks go to $MYTRANSCRIBE_PROFILE_DIR or the temp dir.
+    profiler = SamplingProfiler(output_dir=os.environ.get(PROFILE_DIR_ENV))
+    if hasattr(signal, "SIGUSR2"):
+        signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.toggle())
+        logger.info("Sampling profiler: send SIGUSR2 to pid %d or press %s",
+                    os.getpid(), PROFILE_SHORTCUT)
+
+    window = TranscriptionWindow(profiler=profiler, watchdog=watchdog)
     window.show()
 
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    profiler.stop()   # dump a profile left running at exit
+    if watchdog is not None:
+        watchdog.stop()
+        logger.info("GUI stalls (whole run): %s", watchdog.summary(session=False))
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""
+inference_scheduler.py — Priority scheduling of Whisper windows for MyTranscribe.
+
+Every transcription job (a chunk from process_audio_chunk, a server stream
+window, a whole uploaded file) runs on its caller's thread, but each 30 s
+window it decodes must first be granted the model by the scheduler:
+
+    with SCHEDULER.job(FINAL) as gate:
+        backend.transcribe(audio, gate=gate, ...)
+
+Backends enter `gate()` around every window, so a long background job gives
+the model up between windows and a waiting higher-priority window runs next
+(preemption at window boundaries; a window in progress is never interrupted).
+Waiting windows are granted by class, then arrival order:
+
+  FINAL       interactive final — the user is waiting (flush after Stop)
+  PARTIAL     live partial — audio transcribed while recording continues
+  BACKGROUND  batch work (files, re-transcription); at most
+              DEFAULT_LIMITS[BACKGROUND] such jobs admitted at once
+
+`capacity` windows run at once across all classes (1: one model, and the
+CPU/GPU is saturated by one window anyway). Queue waits are recorded on the
+timer as "wait_<class>" stages and summarised by stats().
+"""
+
+import concurrent.futures
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+FINAL, PARTIAL, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {FINAL: "final", PARTIAL: "partial", BACKGROUND: "background"}
+# Jobs admitted per class at once (None = unlimited); the rest wait in job().
+DEFAULT_LIMITS = {FINAL: None, PARTIAL: None, BACKGROUND: 1}
+
+
+class InferenceScheduler:
+    """Grants model windows by priority class; see the module docstring."""
+
+    def __init__(self, capacity: int = 1, limits: dict | None = None, timer=None) -> None:
+        self._cond = threading.Condition()
+        self._free = capacity
+        self._limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._jobs = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._waiting = []                   # heap of (priority, arrival)
+        self._arrivals = itertools.count()
+        self._granted = dict.fromkeys(PRIORITY_NAMES, 0)
+        self.timer = timer
+        self._stats = {p: {"jobs": 0, "windows": 0, "preempted": 0,
+                           "wait_total": 0.0, "wait_max": 0.0} for p in PRIORITY_NAMES}
+
+    @contextlib.contextmanager
+    def job(self, priority: int):
+        """
+        Admit one job of `priority` (blocking while its class is at its limit)
+        and yield its window gate: a callable returning a context manager.
+        """
+        with self._cond:
+            limit = self._limits.get(priority)
+            while limit is not None and self._jobs[priority] >= limit:
+                self._cond.wait()
+            self._jobs[priority] += 1
+            self._stats[priority]["jobs"] += 1
+        state = {"after": None}   # higher-class grant counts when our last window ended
+        try:
+            yield lambda: self._window(priority, state)
+        finally:
+            with self._cond:
+                self._jobs[priority] -= 1
+                self._cond.notify_all()
+
+    def submit(self, priority: int, fn, *args, **kwargs) -> concurrent.futures.Future:
+        """Run fn(gate, *args, **kwargs) as a job on a new thread; returns its Future."""
+        future = concurrent.futures.Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                with self.job(priority) as gate:
+                    result = fn(gate, *args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=run, name=f"job-{PRIORITY_NAMES[priority]}",
+                         daemon=True).start()
+        return future
+
+    @contextlib.contextmanager
+    def _window(self, priority: int, state: dict):
+        ticket = (priority, next(self._arrivals))
+        start = time.perf_counter()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while self._free == 0 or self._waiting[0] != ticket:
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._free -= 1
+            self._granted[priority] += 1
+            stats = self._stats[priority]
+            if state["after"] is not None and state["after"] != self._higher_grants(priority):
+                stats["preempted"] += 1   # a higher class ran between our windows
+            # Under the lock, like stats() reads them
+            wait = time.perf_counter() - start
+            stats["windows"] += 1
+            stats["wait_total"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+        if self.timer is not None:
+            self.timer.record(f"wait_{PRIORITY_NAMES[priority]}", wait)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._free += 1
+                state["after"] = self._higher_grants(priority)
+                self._cond.notify_all()
+
+    def _higher_grants(self, priority: int) -> int:
+        return sum(n for p, n in self._granted.items() if p < priority)
+
+    def stats(self) -> dict:
+        """Per class: jobs, windows, preempted, mean/max queue wait (ms), waiting now."""
+        with self._cond:
+            waiting = [p for p, _ in self._waiting]
+            return {
+                name: {
+                    "jobs": s["jobs"],
+                    "windows": s["windows"],
+                    "preempted": s["preempted"],
+                    "wait_mean_ms": round(s["wait_total"] / s["windows"] * 1000, 1)
+                                    if s["windows"] else 0.0,
+                    "wait_max_ms": round(s["wait_max"] * 1000, 1),
+                    "waiting": waiting.count(p),
+                }
+                for p, name in PRIORITY_NAMES.items()
+                for s in (self._stats[p],)
+            }
@@ -0,0 +1,301 @@
+"""
+model_cache.py — Memory-mapped Whisper weight cache for MyTranscribe.
+
+whisper.load_model() re-reads and SHA-256 hashes the whole .pt checkpoint on
+every launch (inside whisper._download), then unpickles it with torch.load and
+copies every tensor into a freshly initialised model. For large-v3 that is
+~3 GB of hashing, unpickling and copying before the first dictation.
+
+load_model() here converts each checkpoint once into a flat fp32 weights file
+plus a JSON index (dims, tensor offsets, alignment heads, and the source
+checkpoint's size, mtime and SHA-256). Later loads only stat() the checkpoint,
+np.memmap the weights copy-on-write and hand the tensors to load_state_dict
+with assign=True on a meta-device model, so nothing is read until it is used
+and every process loading the same model shares the same page-cache pages.
+
+Any problem with the cache falls back to whisper.load_model().
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+import torch
+import whisper
+from whisper.model import AudioEncoder, ModelDimensions, TextDecoder, Whisper
+
+logger = logging.getLogger("model_cache")
+
+CACHE_ENV = "MYTRANSCRIBE_MODEL_CACHE"   # cache dir; "0" disables the cache
+CACHE_FORMAT = 1
+WEIGHTS_FILE = "weights.bin"
+INDEX_FILE = "index.json"
+ALIGNMENT = 64             # byte alignment of each tensor inside weights.bin
+HASH_BLOCK = 1 << 20
+
+
+def default_cache_root() -> str | None:
+    """$MYTRANSCRIBE_MODEL_CACHE, else ~/.cache/mytranscribe/models; None if disabled."""
+    configured = os.environ.get(CACHE_ENV)
+    if configured == "0":
+        return None
+    if configured:
+        return configured
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "mytranscribe", "models")
+
+
+def _whisper_root() -> str:
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "whisper")
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(HASH_BLOCK):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_key(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class ModelCache:
+    """One directory per converted checkpoint under `root`."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def _entries(self):
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.listdir(self.root):
+            index_path = os.path.join(self.root, entry, INDEX_FILE)
+            try:
+                with open(index_path, encoding="utf-8") as fh:
+                    index = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            if index.get("format") == CACHE_FORMAT:
+                yield os.path.join(self.root, entry), index
+
+    def find(self, checkpoint: str | None, sha256: str | None) -> str | None:
+        """
+        Cache entry for a checkpoint. An official model is matched by the
+        SHA-256 in its download URL; a local file by its size and mtime, so
+        neither case hashes the checkpoint.
+        """
+        key = _source_key(checkpoint) if checkpoint and os.path.isfile(checkpoint) else None
+        for path, index in self._entries():
+            source = index["source"]
+            if sha256 is not None and source["sha256"] == sha256:
+                return path
+            if (sha256 is None and key is not None
+                    and source["name"] == os.path.basename(checkpoint)
+                    and source["size"] == key["size"]
+                    and source["mtime_ns"] == key["mtime_ns"]):
+                return path
+        return None
+
+    def convert(self, checkpoint: str, sha256: str | None = None,
+                alignment_heads: bytes | None = None) -> str:
+        """Write a cache entry for `checkpoint` (hashes and unpickles it once)."""
+        actual = _sha256(checkpoint)
+        if sha256 is not None and actual != sha256:
+            raise RuntimeError(f"{checkpoint} does not match its SHA-256 checksum")
+        stem = os.path.splitext(os.path.basename(checkpoint))[0]
+        target = os.path.join(self.root, f"{stem}-{actual[:16]}")
+        # Same content under a new mtime (touched, copied): reuse the entry.
+        if self._refresh_source(target, checkpoint, actual):
+            return target
+        with open(checkpoint, "rb") as fh:
+            data = torch.load(fh, map_location="cpu")
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{stem}-", dir=self.root)
+
+        tensors = {}
+        offset = 0
+        with open(os.path.join(staging, WEIGHTS_FILE), "wb") as out:
+            for name, tensor in data["model_state_dict"].items():
+                if tensor.is_floating_point():
+                    tensor = tensor.float()   # Whisper's parameters are fp32
+                array = tensor.contiguous().numpy()
+                pad = -offset % ALIGNMENT
+                out.write(b"\0" * pad)
+                offset += pad
+                tensors[name] = {
+                    "dtype": array.dtype.str,
+                    "shape": list(array.shape),
+                    "offset": offset,
+                }
+                out.write(array.tobytes())
+                offset += array.nbytes
+
+        index = {
+            "format": CACHE_FORMAT,
+            "source": {"name": os.path.basename(checkpoint), "sha256": actual,
+                       **_source_key(checkpoint)},
+            "dims": data["dims"],
+            "alignment_heads": alignment_heads.decode("ascii") if alignment_heads else None,
+            "tensors": tensors,
+        }
+        with open(os.path.join(staging, INDEX_FILE), "w", encoding="utf-8") as fh:
+            json.dump(index, fh)
+
+        try:
+            os.replace(staging, target)
+        except OSError:
+            # Another process converted the same checkpoint first (or an
+            # entry appeared with an unreadable index): keep the existing one.
+            for name in os.listdir(staging):
+                os.remove(os.path.join(staging, name))
+            os.rmdir(staging)
+            self._refresh_source(target, checkpoint, actual)
+        logger.info("Cached %s (%.0f MB) in %s", checkpoint, offset / 1e6, target)
+        return target
+
+    @staticmethod
+    def _refresh_source(entry: str, checkpoint: str, sha256: str) -> bool:
+        """
+        If `entry` holds a conversion of content `sha256`, point its source
+        record at `checkpoint`'s current name, size and mtime, so find()
+        matches it on the next launch without hashing. False if it doesn't.
+        """
+        index_path = os.path.join(entry, INDEX_FILE)
+        try:
+            with open(index_path, encoding="utf-8") as fh:
+                index = json.load(fh)
+        except (OSError, ValueError):
+            return False
+        if index.get("format") != CACHE_FORMAT or index["source"]["sha256"] != sha256:
+            return False
+        source = {"name": os.path.basename(checkpoint), "sha256": sha256,
+                  **_source_key(checkpoint)}
+        if index["source"] != source:
+            index["source"] = source
+            tmp = f"{index_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump(index, fh)
+                os.replace(tmp, index_path)
+            except OSError as exc:
+                logger.warning("Could not update %s: %s", index_path, exc)
+        logger.info("Reusing cached %s for %s", entry, checkpoint)
+        return True
+
+    @staticmethod
+    def load(entry: str, device: str | torch.device = "cpu") -> Whisper:
+        """Build a Whisper model whose parameters are views of the mapped weights."""
+        with open(os.path.join(entry, INDEX_FILE), encoding="utf-8") as fh:
+            index = json.load(fh)
+        # Copy-on-write: pages stay shared with the page cache (and with other
+        # processes) unless something writes to a parameter.
+        mapped = np.memmap(os.path.join(entry, WEIGHTS_FILE), dtype=np.uint8, mode="c")
+        state_dict = {}
+        for name, spec in index["tensors"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            start = spec["offset"]
+            array = mapped[start:start + count * dtype.itemsize].view(dtype)
+            state_dict[name] = torch.from_numpy(array.reshape(spec["shape"]))
+
+        model = _empty_whisper(ModelDimensions(**index["dims"]))
+        model.load_state_dict(state_dict, assign=True)
+        _materialize_buffers(model)
+        if index["alignment_heads"]:
+            model.set_alignment_heads(index["alignment_heads"].encode("ascii"))
+        return model.to(device)
+
+
+def _empty_whisper(dims: ModelDimensions) -> Whisper:
+    """
+    Whisper(dims) with every parameter on the meta device, so no memory is
+    allocated or randomly initialised before load_state_dict(assign=True).
+    Mirrors Whisper.__init__, whose sparse alignment_heads buffer cannot be
+    built on meta.
+    """
+    model = Whisper.__new__(Whisper)
+    torch.nn.Module.__init__(model)
+    model.dims = dims
+    with torch.device("meta"):
+        model.encoder = AudioEncoder(
+            dims.n_mels, dims.n_audio_ctx, dims.n_audio_state,
+            dims.n_audio_head, dims.n_audio_layer,
+        )
+        model.decoder = TextDecoder(
+            dims.n_vocab, dims.n_text_ctx, dims.n_text_state,
+            dims.n_text_head, dims.n_text_layer,
+        )
+    return model
+
+
+def _materialize_buffers(model: Whisper) -> None:
+    """Build the non-persistent buffers that are not in the state dict."""
+    dims = model.dims
+    mask = torch.empty(dims.n_text_ctx, dims.n_text_ctx).fill_(-np.inf).triu_(1)
+    model.decoder.register_buffer("mask", mask, persistent=False)
+    all_heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+    all_heads[dims.n_text_layer // 2:] = True
+    model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+    leftover = [name for name, t in model.state_dict(keep_vars=True).items() if t.is_meta]
+    if leftover:
+        raise RuntimeError(f"Cached model is missing tensors: {', '.join(leftover)}")
+
+
+def source_id(name: str) -> str:
+    """
+    Stable id for a model name or checkpoint path, for caches derived from it
+    (e.g. exported ONNX graphs): '<stem>-<sha256[:16]>' for official models,
+    '<stem>-<size>-<mtime_ns>' for local files. Never hashes the checkpoint.
+    """
+    if name in whisper._MODELS:
+        url = whisper._MODELS[name]
+        return f"{name}-{url.split('/')[-2][:16]}"
+    key = _source_key(name)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f"{stem}-{key['size']}-{key['mtime_ns']}"
+
+
+def load_model(name: str, device: str | torch.device | None = None,
+               cache_root: str | None = None) -> Whisper:
+    """
+    Drop-in replacement for whisper.load_model(name, device) that goes through
+    the weight cache. Official model names are downloaded by whisper on first
+    use; anything the cache cannot handle is loaded by whisper.load_model().
+    """
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    cache_root = cache_root if cache_root is not None else default_cache_root()
+    if cache_root is None:
+        return whisper.load_model(name, device=device)
+
+    try:
+        if name in whisper._MODELS:
+            url = whisper._MODELS[name]
+            sha256 = url.split("/")[-2]
+            checkpoint = os.path.join(_whisper_root(), os.path.basename(url))
+            alignment_heads = whisper._ALIGNMENT_HEADS[name]
+        elif os.path.isfile(name):
+            sha256, checkpoint, alignment_heads = None, name, None
+        else:
+            return whisper.load_model(name, device=device)
+
+        cache = ModelCache(cache_root)
+        entry = cache.find(checkpoint, sha256)
+        if entry is None:
+            if sha256 is not None and not os.path.isfile(checkpoint):
+                # Let whisper download (and verify) the checkpoint first.
+                whisper._download(whisper._MODELS[name], _whisper_root(), False)
+            logger.info("Converting %s into the model cache (one-time)", checkpoint)
+            entry = cache.convert(checkpoint, sha256, alignment_heads)
+        return cache.load(entry, device)
+    except Exception as exc:
+        logger.warning("Model cache unavailable (%s); using whisper.load_model", exc)
+        return whisper.load_model(name, device=device)
@@ -0,0 +1,166 @@
+"""
+multi_source.py — Several capture sessions sharing one Whisper model.
+
+MultiSourceTranscriber records the default microphone plus extra input
+devices at the same time, e.g. a PulseAudio/PipeWire "Monitor of ..." or a
+WASAPI loopback/virtual-cable source for the other side of a call. Each
+source is a full RealTimeTranscriber with its own capture, chunking and
+transcript; all of them share one backend, so the model is loaded once.
+
+Sources are cut into MULTI_SOURCE_CHUNK_DURATION chunks on their own sample
+clocks, sized so that a chunk plus the OVERLAP_DURATION that
+RealTimeTranscriber prepends fills exactly one 30 s Whisper window (a longer
+chunk would cost a second, mostly padded encoder pass that batches with
+nothing). Since the sources start together, their chunks become ready
+together and the backend's EncoderBatcher (decode_hooks) runs them through
+the encoder as one batch. The decoder passes are scheduled one
+window at a time by the shared InferenceScheduler.
+
+It exposes the subset of RealTimeTranscriber the GUI uses, so gui_qt can use
+it in place of a single transcriber; transcriptions and partial_text are
+labelled with the source name, in the order the text was committed.
+"""
+
+import logging
+import time
+
+from audio_capture import InputCapture, find_input_device
+from transcriber_v12 import OVERLAP_DURATION, RealTimeTranscriber, make_backend
+
+logger = logging.getLogger("multi_source")
+
+EXTRA_SOURCES_ENV = "MYTRANSCRIBE_EXTRA_SOURCES"   # "label=device,device2"
+WHISPER_WINDOW = 30                # seconds of audio per encoder pass
+# New audio per chunk; with the overlap in front, one Whisper window
+MULTI_SOURCE_CHUNK_DURATION = WHISPER_WINDOW - OVERLAP_DURATION
+PRIMARY_LABEL = "mic"
+
+
+def parse_sources(spec: str) -> list[tuple[str, str]]:
+    """'call=Monitor of Built-in,2' -> [('call', 'Monitor of Built-in'), ('2', '2')]."""
+    sources = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        label, sep, device = item.partition("=")
+        sources.append((label.strip(), device.strip()) if sep else (item, item))
+    return sources
+
+
+class _CommitLog(list):
+    """A session's transcriptions list that also logs commits to its owner."""
+
+    def __init__(self, owner, label: str) -> None:
+        super().__init__()
+        self._owner = owner
+        self._label = label
+
+    def append(self, text) -> None:
+        super().append(text)
+        self._owner._committed.append((time.monotonic(), self._label, text))
+
+
+class MultiSourceTranscriber:
+    """The primary microphone session plus one session per extra source."""
+
+    def __init__(self, model, extra_sources: list[tuple[str, str]], capture=None) -> None:
+        backend = make_backend(model)
+        primary = RealTimeTranscriber(backend, capture=capture,
+                                      chunk_duration=MULTI_SOURCE_CHUNK_DURATION)
+        self.sessions = {PRIMARY_LABEL: primary}
+        # Captures created here are opened per recording and closed after it.
+        self._extra_captures = []
+        for label, device in extra_sources:
+            try:
+                index = find_input_device(primary.audio_interface, device)
+            except ValueError as exc:
+                logger.warning("Skipping source %r: %s", label, exc)
+                continue
+            source_capture = InputCapture(primary.audio_interface, device_index=index)
+            self._extra_captures.append(source_capture)
+            self.sessions[label] = RealTimeTranscriber(
+                backend, capture=source_capture, chunk_duration=MULTI_SOURCE_CHUNK_DURATION,
+            )
+            logger.info("Extra capture source %r: device index %d", label, index)
+        for label, session in self.sessions.items():
+            session.archive_label = label     # one archive per source
+        self._primary = primary
+        self._recording = []
+        self.transcriptions = []   # also installs each session's _CommitLog
+
+    # ── Model lifecycle (same as RealTimeTranscriber) ────────────────────────
+    @property
+    def model_loaded(self) -> bool:
+        return self._primary.model_loaded
+
+    def set_model(self, model) -> None:
+        backend = make_backend(model)
+        for session in self.sessions.values():
+            session.set_model(backend)
+
+    def unload_model(self) -> None:
+        for session in self.sessions.values():
+            session.unload_model()
+
+    def begin_model_reload(self) -> None:
+        for session in self.sessions.values():
+            session.begin_model_reload()
+
+    def model_load_failed(self, error) -> None:
+        for session in self.sessions.values():
+            session.model_load_failed(error)
+
+    # ── Recording ────────────────────────────────────────────────────────────
+    @property
+    def long_mode(self) -> bool:
+        return self._primary.long_mode
+
+    @property
+    def audio_detected(self) -> bool:
+        return any(s.audio_detected for s in self._recording)
+
+    @property
+    def transcriptions(self) -> list[str]:
+        """Committed text of every source, labelled, in commit order."""
+        return [f"[{label}] {text}" for _, label, text in sorted(self._committed)]
+
+    @transcriptions.setter
+    def transcriptions(self, value) -> None:
+        # The GUI resets the transcript with `transcriptions = []`.
+        self._committed = [(time.monotonic(), PRIMARY_LABEL, text) for text in value]
+        for label, session in self.sessions.items():
+            session.transcriptions = _CommitLog(self, label)
+
+    @property
+    def partial_text(self) -> str:
+        return "\n".join(f"[{label}] {s.partial_text}"
+                         for label, s in self.sessions.items() if s.partial_text)
+
+    def start_recording(self, mode="normal", requested_at=None) -> None:
+        self._recording = []
+        for label, session in self.sessions.items():
+            try:
+                session.start_recording(mode=mode, requested_at=requested_at)
+            except Exception:
+                if session is self._primary:
+                    raise
+                logger.warning("Could not start source %r", label, exc_info=True)
+                continue
+            self._recording.append(session)
+
+    def force_process_partial_frames(self) -> None:
+        for session in self._recording:
+            session.force_process_partial_frames()
+
+    def stop_recording(self) -> None:
+        # End every session before joining any, so their last chunks are
+        # transcribed concurrently (and batched) rather than one after another.
+        for session in self._recording:
+            session.running = False
+            session.capture.ring.wake_waiters()
+        for session in self._recording:
+            session.stop_recording()
+        for source_capture in self._extra_captures:
+            source_capture.close()
+        self._recording = []
@@ -0,0 +1,435 @@
+"""
+onnx_backend.py — ONNX Runtime inference backend for MyTranscribe (CPU).
+
+OnnxBackend implements the same transcribe(audio, on_text=..., **options)
+contract as transcriber_v12.TorchBackend, so RealTimeTranscriber can use
+either. Selected with MYTRANSCRIBE_BACKEND=onnx.
+
+Each model is exported once (this step needs torch) into three graphs under
+~/.cache/mytranscribe/onnx/<model id>/:
+
+  encoder.onnx   mel (1, n_mels, 3000)          -> audio_features
+  cross_kv.onnx  audio_features                  -> cross_k, cross_v  (per layer)
+  decoder.onnx   tokens, self_k, self_v, cross_* -> logits, new_self_k, new_self_v
+
+The decoder step takes and returns the self-attention KV cache explicitly. At
+runtime the cache and the per-window cross-attention K/V stay in ORT-owned
+OrtValues bound through IOBinding, so nothing is copied back to numpy between
+steps except the logits. MYTRANSCRIBE_ONNX_INT8=1 additionally produces and
+uses dynamically quantised (int8 MatMul weights) copies of the graphs.
+
+Decoding mirrors whisper.transcribe() as RealTimeTranscriber calls it: the
+same initial_prompt / condition_on_previous_text prompt handling, language
+and task tokens, suppressed tokens, temperature fallback thresholds and
+no-speech skip. Windows are decoded without timestamp tokens, so each 30 s
+window is one segment. Audio loading and the log-Mel front end still come
+from whisper (CPU torch); onnxruntime is imported lazily so the default torch
+backend never needs it.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import time
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger("onnx_backend")
+
+INT8_ENV = "MYTRANSCRIBE_ONNX_INT8"    # "1" uses int8-quantised graphs
+OPSET = 17
+GRAPHS = ("encoder", "cross_kv", "decoder")
+CONFIG_FILE = "config.json"
+
+# whisper.audio constants, duplicated to avoid importing torch for them
+N_FRAMES = 3000
+N_SAMPLES = 480000
+HOP_LENGTH = 160
+SAMPLE_RATE = 16000
+
+
+def default_cache_dir() -> str:
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "mytranscribe", "onnx")
+
+
+def _compression_ratio(text: str) -> float:
+    # Same as whisper.utils.compression_ratio
+    text_bytes = text.encode("utf-8")
+    return len(text_bytes) / len(zlib.compress(text_bytes))
+
+
+def _log_softmax(x: np.ndarray) -> np.ndarray:
+    x = x - x.max()
+    return x - np.log(np.exp(x).sum())
+
+
+# ── Export (requires torch + whisper) ───────────────────────────────────────
+def _attend(n_head: int, q, k, v, mask=None):
+    """Whisper's qkv_attention (non-SDPA path) on explicit K/V."""
+    import torch.nn.functional as F
+
+    n_state = q.shape[-1]
+    scale = (n_state // n_head) ** -0.25
+    q = q.view(q.shape[0], q.shape[1], n_head, -1).permute(0, 2, 1, 3) * scale
+    k = k.view(k.shape[0], k.shape[1], n_head, -1).permute(0, 2, 3, 1) * scale
+    v = v.view(v.shape[0], v.shape[1], n_head, -1).permute(0, 2, 1, 3)
+    qk = q @ k
+    if mask is not None:
+        qk = qk + mask
+    w = F.softmax(qk.float(), dim=-1).to(q.dtype)
+    return (w @ v).permute(0, 2, 1, 3).flatten(start_dim=2)
+
+
+def _export_modules(model):
+    import torch
+    from torch import nn
+
+    class CrossKV(nn.Module):
+        def __init__(self, decoder):
+            super().__init__()
+            self.decoder = decoder
+
+        def forward(self, audio_features):
+            blocks = self.decoder.blocks
+            k = torch.stack([b.cross_attn.key(audio_features) for b in blocks])
+            v = torch.stack([b.cross_attn.value(audio_features) for b in blocks])
+            return k, v
+
+    class DecoderStep(nn.Module):
+        def __init__(self, decoder):
+            super().__init__()
+            self.decoder = decoder
+
+        def forward(self, tokens, self_k, self_v, cross_k, cross_v):
+            d = self.decoder
+            n_past = self_k.shape[2]
+            n_new = tokens.shape[1]
+            positions = torch.arange(n_new) + n_past
+            x = d.token_embedding(tokens) + d.positional_embedding[positions]
+            # New token i sits at absolute position n_past + i and may attend
+            # to every cached key plus the new keys up to itself.
+            cols = torch.arange(n_past + n_new)
+            mask = torch.zeros(n_new, n_past + n_new).masked_fill(
+                cols[None, :] > positions[:, None], float("-inf")
+            )
+            new_k, new_v = [], []
+            for i, block in enumerate(d.blocks):
+                h = block.attn_ln(x)
+                k = torch.cat([self_k[i], block.attn.key(h)], dim=1)
+                v = torch.cat([self_v[i], block.attn.value(h)], dim=1)
+                new_k.append(k)
+                new_v.append(v)
+                x = x + block.attn.out(_attend(block.attn.n_head, block.attn.query(h), k, v, mask))
+                h = block.cross_attn_ln(x)
+                q = block.cross_attn.query(h)
+                x = x + block.cross_attn.out(
+                    _attend(block.cross_attn.n_head, q, cross_k[i], cross_v[i])
+                )
+                x = x + block.mlp(block.mlp_ln(x))
+            x = d.ln(x)
+            logits = (x @ d.token_embedding.weight.T).float()
+            return logits, torch.stack(new_k), torch.stack(new_v)
+
+    return model.encoder, CrossKV(model.decoder), DecoderStep(model.decoder)
+
+
+def export_model(model, out_dir: str, int8: bool = False) -> None:
+    """Export a whisper (torch) model's graphs into out_dir."""
+    import torch
+    from whisper.model import disable_sdpa
+
+    dims = model.dims
+    model = model.float().cpu().eval()
+    encoder, cross_kv, decoder = _export_modules(model)
+    n_layer, n_state = dims.n_text_layer, dims.n_text_state
+    os.makedirs(out_dir, exist_ok=True)
+
+    mel = torch.zeros(1, dims.n_mels, N_FRAMES)
+    features = torch.zeros(1, dims.n_audio_ctx, dims.n_audio_state)
+    cross = torch.zeros(n_layer, 1, dims.n_audio_ctx, n_state)
+    past = torch.zeros(n_layer, 1, 3, n_state)
+    tokens = torch.zeros(1, 2, dtype=torch.long)
+    kv_axes = {2: "n_past"}
+
+    with torch.no_grad(), disable_sdpa():
+        torch.onnx.export(
+            encoder, (mel,), os.path.join(out_dir, "encoder.onnx"),
+            input_names=["mel"], output_names=["audio_features"], opset_version=OPSET,
+        )
+        torch.onnx.export(
+            cross_kv, (features,), os.path.join(out_dir, "cross_kv.onnx"),
+            input_names=["audio_features"], output_names=["cross_k", "cross_v"],
+            opset_version=OPSET,
+        )
+        torch.onnx.export(
+            decoder, (tokens, past, past, cross, cross), os.path.join(out_dir, "decoder.onnx"),
+            input_names=["tokens", "self_k", "self_v", "cross_k", "cross_v"],
+            output_names=["logits", "new_self_k", "new_self_v"],
+            dynamic_axes={"tokens": {1: "n_new"}, "self_k": kv_axes, "self_v": kv_axes,
+                          "logits": {1: "n_new"}, "new_self_k": {2: "n_total"},
+                          "new_self_v": {2: "n_total"}},
+            opset_version=OPSET,
+        )
+    with open(os.path.join(out_dir, CONFIG_FILE), "w", encoding="utf-8") as fh:
+        json.dump({"dims": vars(dims), "torch": torch.__version__}, fh)
+    if int8:
+        quantize_graphs(out_dir)
+    logger.info("Exported ONNX graphs to %s", out_dir)
+
+
+def quantize_graphs(out_dir: str) -> None:
+    """Write <graph>.int8.onnx next to each graph (dynamic int8 MatMul weights)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    for graph in GRAPHS:
+        src = os.path.join(out_dir, f"{graph}.onnx")
+        dst = os.path.join(out_dir, f"{graph}.int8.onnx")
+        if not os.path.isfile(dst):
+            quantize_dynamic(src, dst, op_types_to_quantize=["MatMul"],
+                             weight_type=QuantType.QInt8)
+
+
+# ── Runtime (onnxruntime + numpy; whisper only for tokenizer and log-Mel) ───
+class OnnxBackend:
+    """Greedy/sampling Whisper decoding on ONNX Runtime sessions."""
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str, int8: bool = False) -> None:
+        import onnxruntime as ort
+
+        self._ort = ort
+        with open(os.path.join(model_dir, CONFIG_FILE), encoding="utf-8") as fh:
+            self.dims = json.load(fh)["dims"]
+        suffix = ".int8.onnx" if int8 else ".onnx"
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ["CPUExecutionProvider"]
+        self.encoder, self.cross_kv, self.decoder = (
+            ort.InferenceSession(os.path.join(model_dir, graph + suffix), options,
+                                 providers=providers)
+            for graph in GRAPHS
+        )
+        self.n_text_ctx = self.dims["n_text_ctx"]
+        self.n_mels = self.dims["n_mels"]
+        self.multilingual = self.dims["n_vocab"] >= 51865
+        self.num_languages = self.dims["n_vocab"] - 51765 - int(self.multilingual)
+        # Identifies the weights and precision for result_cache keys
+        self.model_id = f"onnx-{os.path.basename(model_dir)}-{'int8' if int8 else 'fp32'}"
+        logger.info("ONNX backend ready (%s, %s)", model_dir, "int8" if int8 else "fp32")
+
+    @classmethod
+    def load(cls, name: str, int8: bool | None = None, cache_dir: str | None = None):
+        """
+        Backend for a whisper model name or checkpoint path, exporting it into
+        the cache first if needed.
+        """
+        import model_cache
+
+        if int8 is None:
+            int8 = os.environ.get(INT8_ENV, "0") == "1"
+        model_dir = os.path.join(cache_dir or default_cache_dir(), model_cache.source_id(name))
+        if not all(os.path.isfile(os.path.join(model_dir, f"{g}.onnx")) for g in GRAPHS):
+            logger.info("Exporting '%s' to ONNX (one-time)", name)
+            export_model(model_cache.load_model(name, device="cpu"), model_dir, int8=int8)
+        elif int8:
+            quantize_graphs(model_dir)
+        return cls(model_dir, int8=int8)
+
+    # -- one window ---------------------------------------------------------
+    def _decode_window(self, mel: np.ndarray, initial_tokens: list[int], sot_index: int,
+                       temperature: float, tok, suppress: list[int], suppress_blank: list[int],
+                       on_window_text=None, timer=None) -> dict:
+        """
+        Decode one 30 s window. The tokenizer and suppress lists are the
+        calling transcribe()'s, passed in rather than kept on the backend, so
+        concurrent calls (with or without a scheduler gate) never mix them.
+        """
+        ort = self._ort
+        with timer.span("encoder") if timer is not None else contextlib.nullcontext():
+            features = self.encoder.run_with_ort_values(
+                ["audio_features"], {"mel": ort.OrtValue.ortvalue_from_numpy(mel[None])}
+            )[0]
+        cross_k, cross_v = self.cross_kv.run_with_ort_values(
+            ["cross_k", "cross_v"], {"audio_features": features}
+        )
+
+        n_layer, n_state = self.dims["n_text_layer"], self.dims["n_text_state"]
+        empty = np.zeros((n_layer, 1, 0, n_state), dtype=np.float32)
+        self_k = self_v = ort.OrtValue.ortvalue_from_numpy(empty)
+        binding = self.decoder.io_binding()
+        binding.bind_ortvalue_input("cross_k", cross_k)
+        binding.bind_ortvalue_input("cross_v", cross_v)
+
+        tokens = list(initial_tokens)
+        sample_begin = len(tokens)
+        feed = tokens
+        sum_logprob = 0.0
+        no_speech_prob = 0.0
+        rng = np.random.default_rng()
+        sample_len = self.n_text_ctx // 2
+        decode_start = time.perf_counter()
+        for step in range(sample_len):
+            binding.bind_cpu_input("tokens", np.array([feed], dtype=np.int64))
+            binding.bind_ortvalue_input("self_k", self_k)
+            binding.bind_ortvalue_input("self_v", self_v)
+            for name in ("logits", "new_self_k", "new_self_v"):
+                binding.bind_output(name, "cpu")
+            self.decoder.run_with_iobinding(binding)
+            logits_value, self_k, self_v = binding.get_outputs()
+            logits = logits_value.numpy()[0]
+
+            if step == 0 and tok.no_speech is not None:
+                no_speech_prob = float(np.exp(_log_softmax(logits[sot_index]))[tok.no_speech])
+            last = logits[-1].astype(np.float64)
+            last[suppress] = -np.inf
+            if step == 0:
+                last[suppress_blank] = -np.inf
+
+            logprobs = _log_softmax(last)
+            if temperature == 0:
+                token = int(np.argmax(last))
+            else:
+                probs = np.exp(_log_softmax(last / temperature))
+                token = int(rng.choice(len(probs), p=probs / probs.sum()))
+            sum_logprob += float(logprobs[token])
+            if token == tok.eot:
+                break
+            tokens.append(token)
+            feed = [token]
+            if on_window_text is not None and token < tok.eot:
+                text = tok.decode([t for t in tokens[sample_begin:] if t < tok.eot])
+                if not text.endswith("\ufffd"):
+                    on_window_text(text.strip())
+            if len(tokens) > self.n_text_ctx:
+                break
+
+        text_tokens = tokens[sample_begin:]
+        if timer is not None:
+            timer.record("decoder", time.perf_counter() - decode_start,
+                         tokens=len(text_tokens))
+        text = tok.decode(text_tokens)
+        return {
+            "tokens": text_tokens,
+            "text": text,
+            "temperature": temperature,
+            "avg_logprob": sum_logprob / (len(text_tokens) + 1),
+            "compression_ratio": _compression_ratio(text),
+            "no_speech_prob": no_speech_prob,
+        }
+
+    # -- transcribe() -------------------------------------------------------
+    def transcribe(self, audio, on_text=None, timer=None, gate=None, *,
+                   language: str | None = "en",
+                   task: str = "transcribe",
+                   initial_prompt: str | None = None,
+                   temperature=0.0,
+                   condition_on_previous_text: bool = True,
+                   compression_ratio_threshold: float | None = 2.4,
+                   logprob_threshold: float | None = -1.0,
+                   no_speech_threshold: float | None = 0.6,
+                   **_ignored) -> dict:
+        """
+        Same arguments and result shape as whisper.transcribe() (without
+        timestamps). on_text receives the text decoded so far, like
+        decode_hooks.transcribe_streaming(); timer receives encoder/decoder spans;
+        gate, if given, is entered around each window (see inference_scheduler).
+        """
+        from whisper.audio import log_mel_spectrogram
+        from whisper.tokenizer import get_tokenizer
+
+        tok = get_tokenizer(self.multilingual, num_languages=self.num_languages,
+                            language=language, task=task)
+        suppress = set(tok.non_speech_tokens)
+        suppress.update([tok.transcribe, tok.translate, tok.sot, tok.sot_prev, tok.sot_lm])
+        if tok.no_speech is not None:
+            suppress.add(tok.no_speech)
+        suppress = sorted(suppress)
+        suppress_blank = tok.encode(" ") + [tok.eot]
+        temperatures = (temperature,) if isinstance(temperature, (int, float)) else tuple(temperature)
+
+        start = time.perf_counter()
+        mel = log_mel_spectrogram(audio, self.n_mels, padding=N_SAMPLES).numpy()
+        if timer is not None:
+            timer.record("features", time.perf_counter() - start)
+        content_frames = mel.shape[-1] - N_FRAMES
+
+        all_tokens: list[int] = []
+        prompt_reset_since = 0
+        initial_prompt_tokens = (
+            tok.encode(" " + initial_prompt.strip()) if initial_prompt is not None else []
+        )
+        all_tokens.extend(initial_prompt_tokens)
+        segments = []
+        finished: list[str] = []
+
+        def publish(window_text):
+            if on_text is not None:
+                on_text(" ".join(finished + [window_text] if window_text else finished))
+
+        seek = 0
+        while seek < content_frames:
+            segment_size = min(N_FRAMES, content_frames - seek)
+            segment = mel[:, seek:seek + segment_size]
+            if segment_size < N_FRAMES:
+                segment = np.pad(segment, ((0, 0), (0, N_FRAMES - segment_size)))
+
+            prompt = all_tokens[prompt_reset_since:]
+            initial = list(tok.sot_sequence_including_notimestamps)
+            sot_index = 0
+            if prompt:
+                initial = [tok.sot_prev] + prompt[-(self.n_text_ctx // 2 - 1):] + initial
+                sot_index = initial.index(tok.sot)
+
+            with gate() if gate is not None else contextlib.nullcontext():
+                # Temperature fallback, as in whisper.transcribe.decode_with_fallback
+                for t in temperatures:
+                    result = self._decode_window(segment.astype(np.float32), initial,
+                                                 sot_index, t, tok, suppress, suppress_blank,
+                                                 publish, timer)
+                    needs_fallback = (
+                        (compression_ratio_threshold is not None
+                         and result["compression_ratio"] > compression_ratio_threshold)
+                        or (logprob_threshold is not None
+                            and result["avg_logprob"] < logprob_threshold)
+                    )
+                    if (no_speech_threshold is not None
+                            and result["no_speech_prob"] > no_speech_threshold):
+                        needs_fallback = False
+                    if not needs_fallback:
+                        break
+
+            should_skip = (no_speech_threshold is not None
+                           and result["no_speech_prob"] > no_speech_threshold)
+            if should_skip and logprob_threshold is not None \
+                    and result["avg_logprob"] > logprob_threshold:
+                should_skip = False
+            if not should_skip:
+                # Segment text excludes special tokens; a segment without any
+                # text tokens contributes nothing (as in whisper.transcribe).
+                text = tok.decode([t for t in result["tokens"] if t < tok.eot])
+                seg_tokens = result["tokens"] if text.strip() else []
+                segments.append({
+                    "id": len(segments),
+                    "seek": seek,
+                    "start": seek * HOP_LENGTH / SAMPLE_RATE,
+                    "end": (seek + segment_size) * HOP_LENGTH / SAMPLE_RATE,
+                    **result,
+                    "text": text if text.strip() else "",
+                    "tokens": seg_tokens,
+                })
+                all_tokens.extend(seg_tokens)
+                if text.strip():
+                    finished.append(text.strip())
+            seek += segment_size
+            if not condition_on_previous_text or result["temperature"] > 0.5:
+                prompt_reset_since = len(all_tokens)
+
+        return {
+            "text": tok.decode(all_tokens[len(initial_prompt_tokens):]),
+            "segments": segments,
+            "language": language,
+        }
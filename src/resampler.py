@@ -0,0 +1,89 @@
+"""
+resampler.py — Streaming polyphase resampler for native-rate capture.
+
+USB headsets and many built-in codecs only run at 44.1 or 48 kHz. Rather than
+asking PortAudio/the host API for 16 kHz (unknown resampling quality, or the
+open simply fails), InputCapture records at the device's native rate and
+converts each callback block with StreamingResampler.
+
+The rate change is L/M in lowest terms (48 kHz: 1/3, 44.1 kHz: 160/441). One
+windowed-sinc low-pass is designed at the virtual L·rate and split into L
+phases of `taps` coefficients; output sample n is the dot product of phase
+(n·M mod L) with the `taps` input samples ending at floor(n·M / L). Each block
+is one gather plus one row-wise dot product in NumPy (for integer ratios such
+as 48 -> 16 kHz, a strided window view and one matrix-vector product), so its
+cost is proportional to the block length (≈ taps multiply-adds per output
+sample) and there is no per-sample Python work. The last taps-1 input samples
+are carried between blocks, so block boundaries are seamless.
+
+The passband runs to PASSBAND_HZ (Whisper's mel filters stop at 8 kHz), with
+at least STOPBAND_DB attenuation from the output Nyquist frequency up.
+"""
+
+import math
+
+import numpy as np
+
+PASSBAND_HZ = 7000
+STOPBAND_DB = 80
+
+
+class StreamingResampler:
+    """int16 mono in at `in_rate`, int16 mono out at `out_rate`, block by block."""
+
+    def __init__(self, in_rate: int, out_rate: int = 16000) -> None:
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.in_rate, self.out_rate = int(in_rate), int(out_rate)
+        self.up, self.down = self.out_rate // g, self.in_rate // g
+        nyquist = min(self.in_rate, self.out_rate) / 2
+        transition = nyquist - min(PASSBAND_HZ, 0.9 * nyquist)
+        cutoff = nyquist - transition / 2
+        # Kaiser estimate of the filter length, in input samples per phase
+        width = 2 * math.pi * transition / self.in_rate
+        self.taps = max(8, math.ceil((STOPBAND_DB - 8) / (2.285 * width)))
+        beta = 0.1102 * (STOPBAND_DB - 8.7)
+
+        n = self.taps * self.up
+        virtual_rate = self.in_rate * self.up
+        t = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff / virtual_rate * np.sinc(2 * cutoff / virtual_rate * t)
+        h *= np.kaiser(n, beta) * self.up          # gain L restores zero-stuffed level
+        # phases[p, k] = h[p + k·L]: the coefficient for input sample floor(n·M/L) - k
+        self.phases = h.reshape(self.taps, self.up).T.astype(np.float32).copy()
+
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0      # input samples seen so far
+        self._produced = 0      # output samples emitted so far
+        self._lags = np.arange(self.taps)
+        self._reversed = self.phases[:, ::-1].copy()   # oldest input first
+
+    @property
+    def delay(self) -> float:
+        """Group delay of the filter, in seconds."""
+        return (self.taps * self.up - 1) / 2 / (self.in_rate * self.up)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Resample the next block of int16 input; returns the int16 output it completes."""
+        if self.up == self.down:
+            return block
+        buf = np.concatenate([self._history, block.astype(np.float32)])
+        base = self._consumed - len(self._history)    # input index of buf[0]
+        self._consumed += len(block)
+        # Outputs whose newest input sample floor(n·M/L) has now arrived
+        end = -(-self._consumed * self.up // self.down)
+        n = np.arange(self._produced, end, dtype=np.int64)
+        self._produced = end
+        self._history = buf[len(buf) - (self.taps - 1):]
+        if not len(n):
+            return np.zeros(0, dtype=np.int16)
+        position = n * self.down
+        newest = position // self.up - base
+        if self.up == 1:
+            # Integer decimation: one phase, and the windows are a strided view.
+            windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+            first = newest[0] - self.taps + 1
+            out = windows[first:first + len(n) * self.down:self.down] @ self._reversed[0]
+        else:
+            frames = buf[newest[:, None] - self._lags]
+            out = np.einsum("ij,ij->i", frames, self.phases[position % self.up])
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
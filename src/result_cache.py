@@ -0,0 +1,191 @@
+"""
+result_cache.py — Content-addressed cache of transcription results.
+
+Re-transcribing the same audio with the same model and settings (re-running a
+batch job, retrying after a crash, replaying an archived session) gives the
+same result, so CachedBackend keys each transcribe() call by
+
+    sha256(16 kHz float32 PCM) + backend model_id + the decoding options
+
+(prompt, temperature, language, task, thresholds ...) and stores the result —
+text, per-segment text/timestamps/tokens and language — in a SQLite file under
+~/.cache/mytranscribe/results. Audio passed as a path is decoded once here and
+handed to the backend as samples, so hashing the PCM costs no extra ffmpeg run.
+
+Entries are zlib-compressed JSON. The table is bounded by total payload size:
+when it grows past the limit, the least recently used entries are evicted.
+Lookups touch a single row through the primary key, so opening and querying a
+cache with many thousands of entries stays in the millisecond range.
+
+MYTRANSCRIBE_RESULT_CACHE sets the directory ("0" disables the cache) and
+MYTRANSCRIBE_RESULT_CACHE_MB its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger("result_cache")
+
+CACHE_ENV = "MYTRANSCRIBE_RESULT_CACHE"        # cache dir; "0" disables
+SIZE_ENV = "MYTRANSCRIBE_RESULT_CACHE_MB"
+DEFAULT_MAX_MB = 256
+DB_FILE = "results.sqlite3"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key       TEXT PRIMARY KEY,
+    payload   BLOB NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_lru ON results (last_used);
+"""
+
+
+def default_cache_dir() -> str | None:
+    """$MYTRANSCRIBE_RESULT_CACHE, else ~/.cache/mytranscribe/results; None if disabled."""
+    configured = os.environ.get(CACHE_ENV)
+    if configured == "0":
+        return None
+    if configured:
+        return configured
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "mytranscribe", "results")
+
+
+def audio_digest(audio: np.ndarray) -> str:
+    """SHA-256 of the samples as contiguous float32."""
+    samples = np.ascontiguousarray(audio, dtype=np.float32)
+    return hashlib.sha256(memoryview(samples).cast("B")).hexdigest()
+
+
+def result_key(digest: str, model_id: str, options: dict) -> str:
+    settings = json.dumps(options, sort_keys=True, default=str)
+    return hashlib.sha256(f"{digest}\0{model_id}\0{settings}".encode()).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU map from result_key() to transcribe() results."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_MB << 20) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, DB_FILE)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """The default cache, or None if it is disabled or cannot be opened."""
+        directory = default_cache_dir()
+        if directory is None:
+            return None
+        try:
+            max_mb = float(os.environ.get(SIZE_ENV, DEFAULT_MAX_MB))
+        except ValueError:
+            logger.warning("Ignoring invalid %s", SIZE_ENV)
+            max_mb = DEFAULT_MAX_MB
+        try:
+            return cls(directory, int(max_mb * (1 << 20)))
+        except (OSError, sqlite3.Error) as exc:
+            logger.warning("Result cache unavailable (%s)", exc)
+            return None
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, result: dict) -> None:
+        payload = zlib.compress(json.dumps(result).encode("utf-8"))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, payload, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()),
+            )
+            self._total += len(payload) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until 90% of the limit (lock held)."""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in self._db.execute(
+                "SELECT key, size FROM results ORDER BY last_used").fetchall():
+            if self._total <= target:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._total -= size
+            evicted += 1
+        logger.info("Result cache: evicted %d entries (%.1f MB kept)", evicted, self._total / 1e6)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"entries": entries, "bytes": self._total, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class CachedBackend:
+    """
+    Backend wrapper that answers repeated transcribe() calls from a
+    ResultCache. A hit sends the whole text to on_text once; a miss runs the
+    wrapped backend and stores its result.
+    """
+
+    def __init__(self, backend, cache: ResultCache) -> None:
+        self.backend = backend
+        self.cache = cache
+        self.name = f"{getattr(backend, 'name', 'backend')}+cache"
+
+    def transcribe(self, audio, on_text=None, timer=None, gate=None, **options):
+        if isinstance(audio, str):
+            import whisper
+            audio = whisper.load_audio(audio)
+        key = result_key(audio_digest(audio), self.backend.model_id, options)
+        cached = self.cache.get(key)
+        if cached is not None:
+            if on_text is not None and cached.get("text"):
+                on_text(cached["text"].strip())
+            return cached
+        result = self.backend.transcribe(audio, on_text=on_text, timer=timer, gate=gate,
+                                         **options)
+        self.cache.put(key, _storable(result))
+        return result
+
+
+def _storable(result: dict) -> dict:
+    """JSON-safe copy of a whisper.transcribe() result (tensors/arrays to lists)."""
+    def plain(value):
+        if isinstance(value, dict):
+            return {k: plain(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [plain(v) for v in value]
+        if hasattr(value, "tolist"):
+            return value.tolist()
+        return value
+
+    return plain(result)
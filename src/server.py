@@ -0,0 +1,435 @@
+"""
+server.py — Headless local transcription service for MyTranscribe.
+
+Serves the dictation pipeline (the tuned backend, technical prompt, silence
+check and hallucination filter from transcriber_v12) to other local programs
+such as editor plugins, so they don't each load Whisper:
+
+    python src/server.py [--host 127.0.0.1] [--port 8765] [--model large-v3]
+
+Endpoints:
+  GET  /health      JSON: backend, open streams, scheduler stats per class
+  POST /transcribe  body = an audio file in any format ffmpeg reads;
+                    returns {"text": ..., "segments": [{start, end, text}]};
+                    repeated audio is answered from result_cache
+  GET  /stream      WebSocket. Send binary messages of 16 kHz mono 16-bit
+                    little-endian PCM and a text message {"type": "stop"}
+                    when done. The server sends JSON text messages:
+                      {"type": "partial", "text": ...}  window being decoded
+                      {"type": "final", "text": ..., "start": s, "end": s}
+                      {"type": "error", "message": ...}
+                      {"type": "done"}                  after "stop"
+
+All connections share one loaded model: every window goes through the
+process-wide InferenceScheduler, so concurrent streams interleave per window
+instead of loading more models. Stream windows run as live partials, the
+remainder after "stop" as interactive finals and uploaded files as
+background work, so a long upload never holds up a client's final text. The WebSocket
+and HTTP handling is a small stdlib (asyncio) implementation; only the
+subset of RFC 6455 that local clients need is supported (no extensions).
+"""
+
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+# Windows cmd/PowerShell may default to cp1252; reconfigure to UTF-8 so
+# any Unicode in transcripts prints without crashing.
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+
+from audio_capture import SAMPLE_RATE
+from inference_scheduler import BACKGROUND, FINAL, PARTIAL
+from result_cache import CachedBackend, ResultCache
+from transcriber_v12 import (
+    OVERLAP_DURATION, SCHEDULER, TIMINGS, TRANSCRIBE_OPTIONS, RealTimeTranscriber,
+    load_backend,
+)
+
+logger = logging.getLogger("server")
+
+DEFAULT_HOST = "127.0.0.1"   # loopback only; there is no authentication
+DEFAULT_PORT = 8765
+WINDOW_DURATION = 30         # seconds of streamed audio per transcription window
+MAX_BODY = 512 * 1024 * 1024         # largest accepted POST /transcribe body
+MAX_MESSAGE = 16 * 1024 * 1024       # largest accepted WebSocket message
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class InferenceQueue:
+    """
+    The loaded backend behind the process-wide SCHEDULER. Each submitted job
+    runs on its own thread and takes the model window by window, by priority.
+    """
+
+    def __init__(self, backend, scheduler=SCHEDULER, cache: ResultCache | None = None) -> None:
+        self.backend = backend
+        self.scheduler = scheduler
+        self.cached = CachedBackend(backend, cache) if cache is not None else None
+
+    def submit(self, audio, on_text=None, priority=PARTIAL,
+               cached: bool = False) -> concurrent.futures.Future:
+        """
+        Future with the backend's transcribe() result for `audio`; cached=True
+        answers repeated audio from the result cache (if enabled).
+        """
+        backend = self.cached if cached and self.cached is not None else self.backend
+        return self.scheduler.submit(priority, self._transcribe, backend, audio, on_text)
+
+    def _transcribe(self, gate, backend, audio, on_text):
+        TIMINGS.begin_chunk()
+        try:
+            return backend.transcribe(
+                audio, on_text=on_text, timer=TIMINGS, gate=gate, **TRANSCRIBE_OPTIONS,
+            )
+        except Exception:
+            logger.error("Transcription error", exc_info=True)
+            raise
+
+
+def _pcm_to_float(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _clean(text: str) -> str:
+    return RealTimeTranscriber.filter_hallucinated_phrases(text.strip())
+
+
+class WebSocket:
+    """Server side of an upgraded connection: message-level recv()/send()."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self._send_lock = asyncio.Lock()
+        self.closed = False
+
+    async def _frame(self):
+        head = await self.reader.readexactly(2)
+        fin, opcode = head[0] & 0x80, head[0] & 0x0F
+        if not head[1] & 0x80:
+            raise ConnectionError("unmasked client frame")
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+        if length > MAX_MESSAGE:
+            raise ConnectionError("frame too large")
+        mask = await self.reader.readexactly(4)
+        payload = await self.reader.readexactly(length)
+        if length:
+            key = np.frombuffer(mask * (length // 4 + 1), dtype=np.uint8)[:length]
+            payload = (np.frombuffer(payload, dtype=np.uint8) ^ key).tobytes()
+        return bool(fin), opcode, payload
+
+    async def recv(self):
+        """Next text (str) or binary (bytes) message; None once the peer closes."""
+        parts, kind = [], None
+        while True:
+            try:
+                fin, opcode, payload = await self._frame()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.closed = True
+                return None
+            if opcode == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                await self.close()
+                return None
+            if opcode != OP_CONT:
+                kind = opcode
+            parts.append(payload)
+            if sum(map(len, parts)) > MAX_MESSAGE:
+                await self.close(1009)
+                return None
+            if fin:
+                data = b"".join(parts)
+                if kind != OP_TEXT:
+                    return data
+                try:
+                    return data.decode("utf-8")
+                except UnicodeDecodeError:
+                    await self.send({"type": "error", "message": "text message is not UTF-8"})
+                    await self.close(1007)   # invalid frame payload data
+                    return None
+
+    async def send(self, message: dict) -> None:
+        await self._send_frame(OP_TEXT, json.dumps(message).encode("utf-8"))
+
+    async def close(self, code: int = 1000) -> None:
+        if not self.closed:
+            await self._send_frame(OP_CLOSE, struct.pack("!H", code))
+            self.closed = True
+
+    async def _send_frame(self, opcode: int, payload: bytes) -> None:
+        if self.closed:
+            return
+        length = len(payload)
+        if length < 126:
+            head = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            head = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        async with self._send_lock:
+            try:
+                self.writer.write(head + payload)
+                await self.writer.drain()
+            except ConnectionError:
+                self.closed = True
+
+
+class StreamSession:
+    """
+    One WebSocket client. Audio is cut into WINDOW_DURATION windows that
+    overlap by OVERLAP_DURATION, like normal-mode recording; a session has at
+    most one window in the inference queue, so its finals arrive in order.
+    """
+
+    def __init__(self, ws: WebSocket, inference: InferenceQueue) -> None:
+        self.ws = ws
+        self.inference = inference
+        self.loop = asyncio.get_running_loop()
+        self.pending = bytearray()
+        self.position = 0          # sample index of pending[0] in the stream
+        self.stopping = False
+        self._wake = asyncio.Event()
+
+    async def run(self) -> None:
+        worker = asyncio.create_task(self._transcribe_windows())
+        try:
+            while (message := await self.ws.recv()) is not None:
+                if isinstance(message, bytes):
+                    self.pending += message
+                    self._wake.set()
+                    continue
+                try:
+                    command = json.loads(message)
+                except ValueError:
+                    command = None
+                if isinstance(command, dict) and command.get("type") == "stop":
+                    break
+                await self.ws.send({"type": "error", "message": "expected {\"type\": \"stop\"}"})
+        finally:
+            if self.ws.closed:
+                self.pending.clear()   # client went away; nobody to send to
+            self.stopping = True
+            self._wake.set()
+        await worker
+        await self.ws.send({"type": "done"})
+        await self.ws.close()
+
+    async def _transcribe_windows(self) -> None:
+        window = WINDOW_DURATION * SAMPLE_RATE * 2
+        overlap = int(OVERLAP_DURATION * SAMPLE_RATE) * 2
+        retained = 0   # bytes at the head of pending already transcribed (overlap)
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            while len(self.pending) >= window or (self.stopping and len(self.pending) > retained):
+                take = min(len(self.pending), window)
+                await self._transcribe(bytes(self.pending[:take]), self.position / SAMPLE_RATE)
+                # Keep the overlap so words cut at the boundary are heard whole.
+                retained = overlap if take == window else 0
+                del self.pending[:take - retained]
+                self.position += (take - retained) // 2
+            if self.stopping:
+                return
+
+    async def _transcribe(self, pcm: bytes, start: float) -> None:
+        if RealTimeTranscriber.is_silent([pcm]):
+            return
+        partials = asyncio.Queue()
+
+        def on_text(text):
+            self.loop.call_soon_threadsafe(partials.put_nowait, text)
+
+        # After "stop" the client is waiting for the rest of its text.
+        priority = FINAL if self.stopping else PARTIAL
+        future = asyncio.wrap_future(
+            self.inference.submit(_pcm_to_float(pcm), on_text, priority)
+        )
+        while not future.done():
+            getter = asyncio.ensure_future(partials.get())
+            await asyncio.wait((future, getter), return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                await self.ws.send({"type": "partial", "text": _clean(getter.result())})
+            else:
+                getter.cancel()
+        try:
+            result = future.result()
+        except Exception as exc:
+            await self.ws.send({"type": "error", "message": str(exc)})
+            return
+        text = _clean(result.get("text", ""))
+        if text:
+            await self.ws.send({"type": "final", "text": text, "start": round(start, 3),
+                                "end": round(start + len(pcm) / 2 / SAMPLE_RATE, 3)})
+
+
+class TranscriptionServer:
+    """HTTP/WebSocket front end; every connection shares one InferenceQueue."""
+
+    def __init__(self, inference: InferenceQueue) -> None:
+        self.inference = inference
+        self.streams = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            # Only the request line and headers can be answered with a plain
+            # HTTP 400; once /stream has upgraded, errors go over the WebSocket.
+            try:
+                method, path, headers = await self._read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                await self._respond(writer, 400, {"error": "malformed request"})
+                return
+            if path == "/stream" and headers.get("upgrade", "").lower() == "websocket":
+                await self._stream(reader, writer, headers)
+            elif path == "/transcribe" and method == "POST":
+                await self._transcribe_file(reader, writer, headers)
+            elif path == "/health" and method == "GET":
+                await self._respond(writer, 200, {
+                    "backend": getattr(self.inference.backend, "name", "?"),
+                    "streams": self.streams,
+                    "scheduler": self.inference.scheduler.stats(),
+                    "result_cache": self.inference.cached.cache.stats()
+                                    if self.inference.cached is not None else None,
+                })
+            else:
+                await self._respond(writer, 404, {"error": f"no route for {method} {path}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            logger.error("Request failed", exc_info=True)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        """(method, path without query, lower-cased headers); ValueError if malformed."""
+        request = await reader.readline()
+        method, path, _ = request.decode("latin-1").split(" ", 2)
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method, path.split("?", 1)[0], headers
+
+    async def _respond(self, writer, status: int, body: dict) -> None:
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found",
+                   413: "Payload Too Large", 500: "Internal Server Error"}
+        data = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def _stream(self, reader, writer, headers: dict) -> None:
+        key = headers.get("sec-websocket-key")
+        if not key:
+            await self._respond(writer, 400, {"error": "missing Sec-WebSocket-Key"})
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+        self.streams += 1
+        logger.info("Stream opened (%d open)", self.streams)
+        ws = WebSocket(reader, writer)
+        try:
+            await StreamSession(ws, self.inference).run()
+        except Exception as exc:
+            logger.error("Stream failed", exc_info=True)
+            await ws.send({"type": "error", "message": str(exc)})
+            await ws.close(1011)       # internal error
+        finally:
+            self.streams -= 1
+            logger.info("Stream closed (%d open)", self.streams)
+
+    async def _transcribe_file(self, reader, writer, headers: dict) -> None:
+        import whisper
+
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            length = 0
+        if length <= 0 or length > MAX_BODY:
+            await self._respond(writer, 413 if length else 400,
+                                {"error": "Content-Length required (max %d bytes)" % MAX_BODY})
+            return
+        body = await reader.readexactly(length)
+        # ffmpeg (inside whisper.load_audio) reads from a path, not a pipe we own.
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".audio") as fh:
+            fh.write(body)
+        try:
+            audio = await asyncio.to_thread(whisper.load_audio, fh.name)
+        except Exception as exc:
+            await self._respond(writer, 400, {"error": f"unreadable audio: {exc}"})
+            return
+        finally:
+            try:
+                os.remove(fh.name)
+            except OSError:
+                pass
+        try:
+            result = await asyncio.wrap_future(
+                self.inference.submit(audio, priority=BACKGROUND, cached=True)
+            )
+        except Exception as exc:
+            await self._respond(writer, 500, {"error": str(exc)})
+            return
+        await self._respond(writer, 200, {
+            "text": _clean(result.get("text", "")),
+            "segments": [
+                {"start": round(seg["start"], 3), "end": round(seg["end"], 3),
+                 "text": seg["text"].strip()}
+                for seg in result.get("segments", [])
+            ],
+        })
+
+
+async def serve(host: str, port: int, backend) -> None:
+    inference = InferenceQueue(backend, cache=ResultCache.from_env())
+    server = await asyncio.start_server(TranscriptionServer(inference).handle, host, port)
+    logger.info("Listening on http://%s:%d (WebSocket: /stream)", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--model", default=os.environ.get("MYTRANSCRIBE_MODEL", "large-v3"))
+    args = parser.parse_args()
+
+    backend = load_backend(args.model)
+    try:
+        asyncio.run(serve(args.host, args.port, backend))
+    except KeyboardInterrupt:
+        pass
+    if TIMINGS.enabled:
+        TIMINGS.log_summary()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+session_archive.py — Compressed, indexed archive of recorded session audio.
+
+Opt-in (MYTRANSCRIBE_ARCHIVE). Each recording session is kept as two files:
+
+  <id>.audio   independent Opus (default) or FLAC streams, one per
+               BLOCK_DURATION of audio, appended back to back
+  <id>.index   JSON lines: a header, then one {"block": [start, samples,
+               offset, length]} line per encoded block and one
+               {"segment": [start, end], "text": ...} line per transcript
+               segment, both on the session's sample clock
+
+The capture thread only hands raw PCM to ArchiveWriter.write(); encoding and
+all file I/O happen on the writer's own thread. Because every block is a
+complete stream, SessionArchive.read(start, end) seeks straight to the blocks
+covering a range and decodes only those, so any segment can be replayed or
+re-transcribed without touching the rest of the session. Opus at libsndfile's
+default bitrate (~30 kbit/s for 16 kHz mono) is about a tenth the size of
+16-bit PCM; FLAC is lossless at roughly half.
+
+Session ids are the start time to the millisecond (plus the source label);
+both files are created exclusively, so two sessions never share them. Both
+files are append-only and flushed per block, so a crash loses at most
+the block in progress. Encoding needs the optional `soundfile` package; without
+it (or without Opus support in its libsndfile) archiving is skipped or falls
+back to FLAC, with a warning.
+"""
+
+import bisect
+import io
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger("session_archive")
+
+ARCHIVE_ENV = "MYTRANSCRIBE_ARCHIVE"          # "1" (default dir) or a directory
+FORMAT_ENV = "MYTRANSCRIBE_ARCHIVE_FORMAT"    # "opus" or "flac"
+DEFAULT_FORMAT = "opus"
+FORMATS = {"opus": ("OGG", "OPUS"), "flac": ("FLAC", "PCM_16")}
+SAMPLE_RATE = 16000
+BLOCK_DURATION = 10                           # seconds of audio per encoded block
+BLOCK_SAMPLES = BLOCK_DURATION * SAMPLE_RATE
+AUDIO_SUFFIX = ".audio"
+INDEX_SUFFIX = ".index"
+MAX_ID_ATTEMPTS = 100                         # "-2", "-3", ... suffixes tried on a clash
+
+
+def archive_dir() -> str | None:
+    """Directory sessions are archived to, or None when archiving is off."""
+    configured = os.environ.get(ARCHIVE_ENV, "")
+    if configured in ("", "0"):
+        return None
+    if configured != "1":
+        return configured
+    default = os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(os.getenv("XDG_DATA_HOME", default), "mytranscribe", "sessions")
+
+
+def _encoder_format(requested: str) -> str | None:
+    """`requested` if soundfile can write it, else a fallback (or None)."""
+    try:
+        import soundfile
+    except ImportError:
+        logger.warning("Session archive needs the soundfile package (pip install soundfile)")
+        return None
+    if requested not in FORMATS:
+        logger.warning("Unknown %s=%r, using %s", FORMAT_ENV, requested, DEFAULT_FORMAT)
+        requested = DEFAULT_FORMAT
+    container, subtype = FORMATS[requested]
+    if soundfile.check_format(container, subtype):
+        return requested
+    logger.warning("libsndfile %s cannot write %s; archiving as FLAC",
+                   soundfile.__libsndfile_version__, requested)
+    return "flac"
+
+
+def open_session(origin: int, label: str | None = None):
+    """
+    Start archiving a session whose first sample is capture-ring index
+    `origin`. Returns an ArchiveWriter, or None if archiving is disabled or
+    unavailable.
+    """
+    directory = archive_dir()
+    if directory is None:
+        return None
+    fmt = _encoder_format(os.environ.get(FORMAT_ENV, DEFAULT_FORMAT).lower())
+    if fmt is None:
+        return None
+    now = time.time()
+    base = (time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+            + f"-{int(now * 1000) % 1000:03d}" + (f"-{label}" if label else ""))
+    # Another session (a quick Stop/Start, or a second process) may have
+    # taken the same millisecond: the files are created exclusively, and a
+    # clash moves on to the next suffix rather than appending to its files.
+    for attempt in range(1, MAX_ID_ATTEMPTS + 1):
+        session_id = base if attempt == 1 else f"{base}-{attempt}"
+        try:
+            return ArchiveWriter(directory, session_id, fmt, origin)
+        except FileExistsError:
+            continue
+        except OSError as exc:
+            logger.warning("Cannot archive session to %s (%s)", directory, exc)
+            return None
+    logger.warning("Cannot archive session to %s: no free id for %s", directory, base)
+    return None
+
+
+class ArchiveWriter:
+    """
+    Encodes one session in the background. write() and add_segment() take
+    capture-ring sample indices and only enqueue; close() drains the queue,
+    encodes the final partial block and waits for the writer thread.
+    """
+
+    def __init__(self, directory: str, session_id: str, fmt: str, origin: int) -> None:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, session_id)
+        self.session_id = session_id
+        self.format = fmt
+        self.origin = origin
+        self._audio = open(base + AUDIO_SUFFIX, "xb")
+        try:
+            self._index = open(base + INDEX_SUFFIX, "x", encoding="utf-8")
+        except OSError:
+            self._audio.close()
+            os.remove(base + AUDIO_SUFFIX)
+            raise
+        self._emit({"format": fmt, "sample_rate": SAMPLE_RATE,
+                    "started": time.time(), "origin": origin})
+        self._queue = queue.SimpleQueue()
+        self._pending = []          # int16 arrays not yet encoded
+        self._pending_samples = 0
+        self._block_start = 0       # session sample of the first pending sample
+        self._written = 0           # session samples received so far
+        self.encoded_bytes = 0
+        self._thread = threading.Thread(target=self._run, name=f"archive-{session_id}",
+                                        daemon=True)
+        self._thread.start()
+        logger.info("Archiving session %s (%s) to %s", session_id, fmt, directory)
+
+    def write(self, start: int, pcm: bytes) -> None:
+        """Audio beginning at ring index `start` (int16 mono bytes)."""
+        if pcm:
+            self._queue.put(("audio", start - self.origin, pcm))
+
+    def add_segment(self, start: int, end: int, text: str) -> None:
+        """Transcript `text` for ring indices [start, end)."""
+        self._queue.put(("segment", max(start - self.origin, 0), end - self.origin, text))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        logger.info("Archived session %s: %.1f s in %.1f KB",
+                    self.session_id, self._written / SAMPLE_RATE, self.encoded_bytes / 1e3)
+
+    # ── Writer thread ────────────────────────────────────────────────────────
+    def _run(self) -> None:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                if item[0] == "audio":
+                    self._append(item[1], np.frombuffer(item[2], dtype=np.int16))
+                else:
+                    self._emit({"segment": [item[1], item[2]], "text": item[3]})
+            self._encode(self._pending_samples)
+            self._emit({"closed": time.time(), "samples": self._written})
+        except Exception:
+            logger.error("Session archive %s failed", self.session_id, exc_info=True)
+        finally:
+            self._audio.close()
+            self._index.close()
+
+    def _append(self, start: int, samples: np.ndarray) -> None:
+        if start > self._written:
+            # Samples the capture ring lost (overrun): keep the clock exact.
+            self._append(self._written, np.zeros(start - self._written, dtype=np.int16))
+        elif start < self._written:
+            samples = samples[self._written - start:]
+        if not len(samples):
+            return
+        self._pending.append(samples)
+        self._pending_samples += len(samples)
+        self._written += len(samples)
+        while self._pending_samples >= BLOCK_SAMPLES:
+            self._encode(BLOCK_SAMPLES)
+
+    def _encode(self, count: int) -> None:
+        """Encode the first `count` pending samples as one block."""
+        if count == 0:
+            return
+        import soundfile
+        pending = np.concatenate(self._pending)
+        block, rest = pending[:count], pending[count:]
+        self._pending = [rest] if len(rest) else []
+        self._pending_samples = len(rest)
+        container, subtype = FORMATS[self.format]
+        buf = io.BytesIO()
+        soundfile.write(buf, block, SAMPLE_RATE, format=container, subtype=subtype)
+        data = buf.getvalue()
+        offset = self._audio.tell()
+        self._audio.write(data)
+        self._audio.flush()
+        self._emit({"block": [self._block_start, count, offset, len(data)]})
+        self._block_start += count
+        self.encoded_bytes += len(data)
+
+    def _emit(self, entry: dict) -> None:
+        self._index.write(json.dumps(entry) + "\n")
+        self._index.flush()
+
+
+class SessionArchive:
+    """Read side of an archived session: segments and random access to audio."""
+
+    def __init__(self, directory: str, session_id: str) -> None:
+        self.session_id = session_id
+        self._audio_path = os.path.join(directory, session_id + AUDIO_SUFFIX)
+        self.header = {}
+        self.segments = []          # (start, end, text), session samples
+        self._blocks = []           # (start, samples, offset, length)
+        with open(os.path.join(directory, session_id + INDEX_SUFFIX), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break           # torn last line after a crash
+                if "block" in entry:
+                    self._blocks.append(tuple(entry["block"]))
+                elif "segment" in entry:
+                    self.segments.append((*entry["segment"], entry["text"]))
+                elif "format" in entry:
+                    self.header = entry
+        self._starts = [b[0] for b in self._blocks]
+
+    @staticmethod
+    def sessions(directory: str | None = None) -> list[str]:
+        """Session ids in `directory` (default: the configured archive), oldest first."""
+        directory = directory or archive_dir()
+        if not directory or not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(INDEX_SUFFIX)] for name in os.listdir(directory)
+                      if name.endswith(INDEX_SUFFIX))
+
+    @property
+    def samples(self) -> int:
+        return self._blocks[-1][0] + self._blocks[-1][1] if self._blocks else 0
+
+    def read(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """Session samples [start, end) as int16, decoding only the blocks they span."""
+        import soundfile
+        end = self.samples if end is None else min(end, self.samples)
+        if start >= end:
+            return np.zeros(0, dtype=np.int16)
+        first = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        last = bisect.bisect_left(self._starts, end)
+        parts = []
+        with open(self._audio_path, "rb") as f:
+            for block_start, count, offset, length in self._blocks[first:last]:
+                f.seek(offset)
+                samples, _ = soundfile.read(io.BytesIO(f.read(length)), dtype="int16")
+                parts.append(samples[:count])
+        audio = np.concatenate(parts)
+        base = self._blocks[first][0]
+        return audio[start - base:end - base]
+
+    def segment_audio(self, i: int) -> np.ndarray:
+        """Segment i as float32 in [-1, 1], ready for backend.transcribe()."""
+        start, end, _ = self.segments[i]
+        return self.read(start, end).astype(np.float32) / 32768.0
@@ -1,163 +1,170 @@
 import os
-import math
+import hashlib
 import numpy as np
 import pyaudio
-import wave
-import tempfile
 import threading
+import time
 import logging
 
 # Constants for audio generation
 SAMPLE_RATE = 44100  # Hz
 DURATION = 0.2      # seconds
 VOLUME = 0.3        # amplitude (0.0-1.0)
+# Output buffer size: a cue starts at the next callback, so this bounds the
+# added latency (512 frames = 11.6 ms) on top of the device's own.
+FRAMES_PER_BUFFER = 512
+START_NOTES = [523.25, 659.25, 783.99]  # C5, E5, G5 frequencies
+END_NOTES = [659.25, 523.25, 392.00]    # E5, C5, G4 frequencies (descending)
+END_NOTE_DELAY = 0.04                   # seconds between successive end notes
 
-def generate_start_chime_file():
-    """Generate a pleasant ascending chime for start of transcription."""
-    temp_dir = tempfile.gettempdir()
-    chime_path = os.path.join(temp_dir, "mytranscribe_start_chime.wav")
-    
-    # Force regeneration this one time
-    if os.path.exists(chime_path):
-        try:
-            os.remove(chime_path)
-        except:
-            pass
 
-    # Generate a pleasant chime sound (a simple chord)
+def render_chime(notes, note_delay=0.0):
+    """
+    Render a chord of exponentially decaying sine tones as 16-bit PCM.
+    With note_delay each successive note starts that much later.
+    """
     t = np.linspace(0, DURATION, int(SAMPLE_RATE * DURATION), False)
-    
-    # Generate a chord with multiple harmonics for a pleasant bell-like sound
-    notes = [523.25, 659.25, 783.99]  # C5, E5, G5 frequencies
     signal = np.zeros_like(t)
-    
-    for note in notes:
-        # Add the note with an exponential decay
-        decay = np.exp(-5 * t)
-        tone = np.sin(2 * np.pi * note * t) * decay
-        signal += tone
-    
-    # Normalize to the desired volume
-    signal *= VOLUME / np.max(np.abs(signal))
-    
-    # Convert to 16-bit PCM
-    signal = (signal * 32767).astype(np.int16)
-    
-    # Save as WAV file
-    with wave.open(chime_path, 'wb') as wf:
-        wf.setnchannels(1)  # Mono
-        wf.setsampwidth(2)  # 16-bit
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(signal.tobytes())
-    
-    logging.debug(f"Generated start chime file at {chime_path}")
-    return chime_path
-
-def generate_end_chime_file():
-    """Generate a descending chime for end of transcription."""
-    temp_dir = tempfile.gettempdir()
-    chime_path = os.path.join(temp_dir, "mytranscribe_end_chime.wav")
-    
-    # Force regeneration this one time
-    if os.path.exists(chime_path):
-        try:
-            os.remove(chime_path)
-        except:
-            pass
 
-    # Generate a pleasant descending chime sound
-    t = np.linspace(0, DURATION, int(SAMPLE_RATE * DURATION), False)
-    
-    # Generate a descending chord with lower notes
-    notes = [659.25, 523.25, 392.00]  # E5, C5, G4 frequencies (descending)
-    signal = np.zeros_like(t)
-    
     for i, note in enumerate(notes):
-        # Add a slight delay to each successive note for a descending effect
-        delay = i * 0.04  # Each note starts a bit later
-        # Create time array with delay
-        t_note = np.maximum(t - delay, 0)
-        # Add the note with an exponential decay
+        # Time since this note started (0 before it does)
+        t_note = np.maximum(t - i * note_delay, 0)
         decay = np.exp(-5 * t_note)
-        tone = np.sin(2 * np.pi * note * t_note) * decay
-        signal += tone
-    
+        signal += np.sin(2 * np.pi * note * t_note) * decay
+
     # Normalize to the desired volume
     signal *= VOLUME / np.max(np.abs(signal))
-    
+
     # Convert to 16-bit PCM
-    signal = (signal * 32767).astype(np.int16)
-    
-    # Save as WAV file
-    with wave.open(chime_path, 'wb') as wf:
-        wf.setnchannels(1)  # Mono
-        wf.setsampwidth(2)  # 16-bit
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(signal.tobytes())
-    
-    logging.debug(f"Generated end chime file at {chime_path}")
-    return chime_path
+    return (signal * 32767).astype(np.int16)
+
+
+def _chime_cache_dir():
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "mytranscribe", "chimes")
+
+
+def load_chime(name, notes, note_delay=0.0):
+    """
+    The rendered chime, read from the on-disk cache when present. The cache
+    file name hashes every parameter, so changing a note or the volume
+    renders a new file instead of playing a stale one.
+    """
+    key = repr((notes, note_delay, SAMPLE_RATE, DURATION, VOLUME)).encode()
+    path = os.path.join(_chime_cache_dir(),
+                        f"{name}-{hashlib.sha256(key).hexdigest()[:12]}.pcm")
+    try:
+        return np.fromfile(path, dtype=np.int16)
+    except (OSError, ValueError):
+        pass
+    signal = render_chime(notes, note_delay)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        signal.tofile(tmp)
+        os.replace(tmp, path)
+    except OSError as e:
+        logging.debug(f"Could not cache chime {name}: {e}")
+    return signal
+
 
 class ChimePlayer:
-    """A player for start and end chime sounds."""
+    """
+    A player for start and end chime sounds.
+
+    Both chimes are rendered once into memory and played through one output
+    stream that stays open for the player's lifetime. Its callback mixes the
+    active cues (silence otherwise), so play_start()/play_end() only queue a
+    buffer: no thread, file or stream is created per cue, and a cue starts
+    within one FRAMES_PER_BUFFER of being requested.
+    """
     def __init__(self):
-        self.start_chime_path = generate_start_chime_file()
-        self.end_chime_path = generate_end_chime_file()
+        self.start_chime = load_chime("start", START_NOTES)
+        self.end_chime = load_chime("end", END_NOTES, END_NOTE_DELAY)
         self.p = pyaudio.PyAudio()
-        self.is_playing = False
+        self.stream = None
+        self._silence = bytes(FRAMES_PER_BUFFER * 2)
+        self._cues = []       # [samples, position, requested_at] being played
         self._lock = threading.Lock()
-    
+        # Seconds from the last play_*() call to its first output buffer
+        self.last_latency = None
+        self._open_stream()
+
+    @property
+    def is_playing(self):
+        return bool(self._cues)
+
     def play_start(self):
-        """Play the start chime sound in a separate thread."""
-        if self.is_playing:
-            return
-            
-        # Start a new thread to play the sound
-        threading.Thread(target=self._play_sound_thread, args=(self.start_chime_path,), daemon=True).start()
-    
+        """Play the start chime sound."""
+        self._play(self.start_chime)
+
     def play_end(self):
-        """Play the end chime sound in a separate thread."""
-        if self.is_playing:
-            return
-            
-        # Start a new thread to play the sound
-        threading.Thread(target=self._play_sound_thread, args=(self.end_chime_path,), daemon=True).start()
-    
+        """Play the end chime sound."""
+        self._play(self.end_chime)
+
     def play(self):
         """Legacy method to play the start chime for backward compatibility."""
         self.play_start()
-    
-    def _play_sound_thread(self, sound_path):
-        """Thread function to play the sound."""
-        with self._lock:
-            if self.is_playing:
-                return
-            self.is_playing = True
-        
+
+    def _open_stream(self):
         try:
-            with wave.open(sound_path, 'rb') as wf:
-                stream = self.p.open(
-                    format=self.p.get_format_from_width(wf.getsampwidth()),
-                    channels=wf.getnchannels(),
-                    rate=wf.getframerate(),
-                    output=True
-                )
-                
-                data = wf.readframes(1024)
-                while data:
-                    stream.write(data)
-                    data = wf.readframes(1024)
-                
-                stream.stop_stream()
-                stream.close()
+            self.stream = self.p.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=SAMPLE_RATE,
+                output=True,
+                frames_per_buffer=FRAMES_PER_BUFFER,
+                stream_callback=self._callback,
+            )
         except Exception as e:
-            logging.error(f"Error playing chime sound: {e}")
-        finally:
-            with self._lock:
-                self.is_playing = False
-    
+            logging.error(f"Error opening chime output stream: {e}")
+            self.stream = None
+
+    def _play(self, samples):
+        if self.p is None:
+            return
+        if self.stream is None or not self.stream.is_active():
+            # The device went away (or never opened): try once more now.
+            if self.stream is not None:
+                try:
+                    self.stream.close()
+                except Exception:
+                    pass
+            self._open_stream()
+            if self.stream is None:
+                return
+        with self._lock:
+            # Restarting a cue that is still sounding replaces it rather
+            # than stacking a second copy on top.
+            self._cues = [cue for cue in self._cues if cue[0] is not samples]
+            self._cues.append([samples, 0, time.perf_counter()])
+
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        """PortAudio thread: mix the active cues into one buffer."""
+        with self._lock:
+            if not self._cues:
+                return (self._silence if frame_count == FRAMES_PER_BUFFER
+                        else bytes(frame_count * 2)), pyaudio.paContinue
+            mix = np.zeros(frame_count, dtype=np.int32)
+            for cue in self._cues:
+                samples, pos, requested_at = cue
+                part = samples[pos:pos + frame_count]
+                mix[:len(part)] += part
+                if pos == 0:
+                    self.last_latency = time.perf_counter() - requested_at
+                cue[1] = pos + frame_count
+            self._cues = [cue for cue in self._cues if cue[1] < len(cue[0])]
+        return np.clip(mix, -32768, 32767).astype(np.int16).tobytes(), pyaudio.paContinue
+
     def cleanup(self):
         """Clean up resources."""
+        if self.stream is not None:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                logging.debug(f"Error closing chime stream: {e}")
+            self.stream = None
         if self.p:
             self.p.terminate()
-            self.p = None
\ No newline at end of file
+            self.p = None
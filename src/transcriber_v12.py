@@ -4,17 +4,42 @@ import wave
 import time
 import tempfile
 import os
+import json
 import logging
+from collections import deque
 import whisper
 import torch
 import numpy as np
 
+from activity_gate import FRAME, UtteranceGate, wake_phrase
+from audio_capture import (
+    CHUNK, FORMAT, CHANNELS, SAMPLE_RATE, InputCapture, format_capture_summary,
+)
+from decode_hooks import EncoderBatcher, load_draft_model, transcribe_streaming
+from compiled_encoder import compile_enabled, install_compiled_encoder, model_fingerprint
+from cpu_features import Bf16Encoder, install_bf16_encoder
+from cpu_placement import apply_placement
+from inference_scheduler import FINAL, PARTIAL, InferenceScheduler
+from session_archive import open_session
+from transcript_history import default_history
+
 # Audio configuration
-CHUNK = 1024
-FORMAT = pyaudio.paInt16
-CHANNELS = 1
 DEFAULT_CHUNK_DURATION = 300  # seconds for normal mode processing
 OVERLAP_DURATION = 1 # 1 second overlap
+PREROLL_DURATION = 0.5  # seconds of pre-Start audio included from a warm capture
+LONG_MODE_MAX_DURATION = 180  # seconds; long mode auto-stops after this much audio
+# record_loop sleeps on the capture ring and moves audio out in batches of this
+# many seconds (well under audio_capture.RING_DURATION), not block by block.
+DRAIN_INTERVAL = 1.0
+# Seconds between activity-gate checks in hands-free mode
+HANDS_FREE_POLL = 0.1
+BYTES_PER_SAMPLE = 2  # paInt16
+# Per-stage timing: unset = off, a path = append JSON lines there (and keep
+# histograms), "1" = histograms only. See StageTimer below.
+TIMINGS_ENV = "MYTRANSCRIBE_TIMINGS"
+TIMINGS_HISTORY = 2048  # durations kept per stage for percentile queries
+# Speculative decoding draft model: "auto", a model name or a checkpoint path
+DRAFT_MODEL_ENV = "MYTRANSCRIBE_DRAFT_MODEL"
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -32,82 +57,463 @@ TECHNICAL_PROMPT = (
     "clearly spoken in the audio. Only transcribe what is actually said."
 )
 
-class RealTimeTranscriber:
-    def __init__(self, model):
+class _NullSpan:
+    """Shared no-op context manager returned by StageTimer.span() when disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, timer, stage, fields):
+        self._timer = timer
+        self._stage = stage
+        self._fields = fields
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._timer.record(self._stage, time.perf_counter() - self._start, **self._fields)
+        return False
+
+
+class StageTimer:
+    """
+    Lightweight per-stage timing spans for the transcription pipeline.
+
+    Usage: `with TIMINGS.span("encoder"): ...` or TIMINGS.record(stage, seconds).
+    Every span is tagged with the chunk id set by begin_chunk() on the calling
+    thread, appended to an optional JSON-lines file and folded into an
+    in-process history queried with histogram() / summary().
+
+    When disabled, span() returns a shared no-op object, so instrumented code
+    pays one attribute check per span.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._file = None
+        self._lock = threading.Lock()
+        self._history = {}
+        self._chunk_ids = 0
+        self._local = threading.local()
+
+    def configure(self, path=None, enabled=True):
+        """Enable timing; `path` (optional) receives one JSON object per span."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if enabled and path:
+                self._file = open(path, "a", encoding="utf-8", buffering=1)
+            self.enabled = enabled
+        if enabled:
+            logging.info("Stage timing enabled%s", f" -> {path}" if path else "")
+
+    def configure_from_env(self):
+        value = os.environ.get(TIMINGS_ENV, "")
+        if value and value != "0":
+            self.configure(path=None if value == "1" else value)
+
+    def begin_chunk(self):
+        """Allocate a chunk id and tag this thread's subsequent spans with it."""
+        with self._lock:
+            self._chunk_ids += 1
+            chunk_id = self._chunk_ids
+        self._local.chunk = chunk_id
+        return chunk_id
+
+    def span(self, stage, **fields):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, fields)
+
+    def record(self, stage, seconds, **fields):
+        if not self.enabled:
+            return
+        ms = seconds * 1000.0
+        entry = {
+            "ts": round(time.time(), 6),
+            "stage": stage,
+            "ms": round(ms, 3),
+            "chunk": fields.pop("chunk", getattr(self._local, "chunk", None)),
+            "thread": threading.current_thread().name,
+        }
+        entry.update(fields)
+        with self._lock:
+            history = self._history.get(stage)
+            if history is None:
+                history = self._history[stage] = deque(maxlen=TIMINGS_HISTORY)
+            history.append(ms)
+            if self._file is not None:
+                self._file.write(json.dumps(entry) + "\n")
+
+    def histogram(self, stage):
+        """count/mean/p50/p95/p99/max in ms for one stage, or None if unseen."""
+        with self._lock:
+            values = list(self._history.get(stage, ()))
+        if not values:
+            return None
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            "count": len(values),
+            "mean_ms": float(np.mean(values)),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(max(values)),
+        }
+
+    def summary(self):
+        """histogram() for every stage seen so far, keyed by stage name."""
+        with self._lock:
+            stages = list(self._history)
+        return {stage: self.histogram(stage) for stage in stages}
+
+    def log_summary(self):
+        for stage, h in self.summary().items():
+            logging.info(
+                "timing %-14s n=%-5d p50=%8.1f ms  p95=%8.1f ms  max=%8.1f ms",
+                stage, h["count"], h["p50_ms"], h["p95_ms"], h["max_ms"],
+            )
+
+
+# Process-wide timer shared by the transcriber, decode hooks and GUI.
+TIMINGS = StageTimer()
+TIMINGS.configure_from_env()
+
+# Process-wide scheduler: every window any caller decodes is granted the model
+# here, interactive work first (see inference_scheduler).
+SCHEDULER = InferenceScheduler(timer=TIMINGS)
+
+# Optional core reservation for capture ($MYTRANSCRIBE_CAPTURE_CPU); must run
+# before torch creates its thread pool so the pool inherits the confinement.
+apply_placement()
+
+
+# Options process_audio_chunk passes to every backend's transcribe().
+TRANSCRIBE_OPTIONS = dict(
+    language="en",
+    task="transcribe",
+    initial_prompt=TECHNICAL_PROMPT,
+    # Added temperature parameter to reduce hallucinations
+    temperature=0.0,
+    # Added condition_on_previous_text=False to prevent the model from
+    # generating content based on what it "expects" to hear
+    condition_on_previous_text=False,
+)
+
+
+class TorchBackend:
+    """
+    Default inference backend: openai-whisper on PyTorch.
+
+    A backend is anything with transcribe(audio, on_text=None, timer=None,
+    gate=None, **options) -> dict taking whisper.transcribe()'s options and
+    returning its result shape (see onnx_backend.OnnxBackend for the
+    alternative). It must enter gate() around each window that uses the model.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model, draft_model=None):
         self.model = model
+        self.draft_model = draft_model
+        # Shared by every caller of this backend (e.g. several capture sessions)
+        self.batcher = EncoderBatcher(model)
+        # Decoding installs KV-cache hooks on the shared model, so windows of
+        # callers that pass no scheduler gate are serialised by this lock.
+        self._lock = threading.Lock()
+        self._model_id = None
+
+    @property
+    def model_id(self):
+        """Identifies the weights and encoder precision (result_cache keys)."""
+        if self._model_id is None:
+            encoder = self.model.encoder
+            precision = "bf16" if isinstance(encoder, Bf16Encoder) else (
+                "fp16" if next(self.model.parameters()).is_cuda else "fp32")
+            self._model_id = f"whisper-{model_fingerprint(self.model)}-{precision}"
+        return self._model_id
+
+    def transcribe(self, audio, on_text=None, timer=None, gate=None, **options):
+        return transcribe_streaming(
+            self.model,
+            audio,
+            on_text=on_text,
+            gate=gate if gate is not None else (lambda: self._lock),
+            batcher=self.batcher,
+            # Stop repetition loops / no-speech windows inside the decoder
+            # rather than decoding to the token limit and filtering later
+            abort_hallucinations=True,
+            timer=timer,
+            draft_model=self.draft_model,
+            fp16=next(self.model.parameters()).is_cuda,
+            **options,
+        )
+
+
+def make_backend(model):
+    """
+    Wrap a loaded whisper model in a TorchBackend with this machine's tuning
+    (GPU, compiled or bf16 encoder, draft model); any other object is taken to
+    be a backend already and returned as is.
+    """
+    if isinstance(model, torch.nn.Module):
         # Move model to GPU if available
         if torch.cuda.is_available():
-            self.model.to("cuda")
-        if next(self.model.parameters()).is_cuda:
+            model.to("cuda")
+        if next(model.parameters()).is_cuda:
             logging.info("GPU acceleration is enabled.")
         else:
             logging.info("GPU acceleration is NOT enabled.")
+        # Opt-in TorchScript encoder (MYTRANSCRIBE_COMPILE=1); eager on failure
+        if compile_enabled():
+            install_compiled_encoder(model)
+        else:
+            # bf16 encoder on CPUs with native bf16 (MYTRANSCRIBE_BF16)
+            install_bf16_encoder(model)
+        draft = None
+        if os.environ.get(DRAFT_MODEL_ENV):
+            try:
+                draft = load_draft_model(model, os.environ[DRAFT_MODEL_ENV])
+            except Exception as e:
+                logging.warning("Speculative decoding disabled: %s", e)
+        backend = TorchBackend(model, draft_model=draft)
+    else:
+        backend = model
+    logging.info("Inference backend: %s", getattr(backend, "name", type(backend).__name__))
+    return backend
+
+
+def load_backend(name):
+    """
+    Load model `name` with the backend selected by $MYTRANSCRIBE_BACKEND, as
+    the GUI does: ONNX Runtime on CPU ("onnx"), else the memory-mapped weight
+    cache wrapped by make_backend().
+    """
+    if os.environ.get("MYTRANSCRIBE_BACKEND", "whisper") == "onnx":
+        from onnx_backend import OnnxBackend
+        return OnnxBackend.load(name)
+    import model_cache
+    return make_backend(model_cache.load_model(name))
+
+
+class RealTimeTranscriber:
+    def __init__(self, model, capture=None, chunk_duration=DEFAULT_CHUNK_DURATION):
+        """
+        model:   a whisper model (wrapped in TorchBackend) or any other backend
+                 object, e.g. onnx_backend.OnnxBackend.
+        capture: an already-open InputCapture kept warm by the caller across
+                 sessions (enables pre-roll); None opens a fresh input stream
+                 at every start_recording() and closes it at stop_recording().
+        chunk_duration: seconds of audio per normal-mode chunk.
+        """
+        # The model can be released while idle (unload_model) and handed back
+        # later (set_model); chunks wait on _model_ready meanwhile, so capture
+        # keeps buffering while a reload runs in the background.
+        self.model = None
+        self.backend = None
+        self._model_ready = threading.Event()
+        self._model_error = None
+        self.set_model(model)
         
         self.transcriptions = []
+        # Text of the window currently being decoded, updated token by token.
+        # Read lock-free by the GUI poll timer alongside self.transcriptions.
+        self.partial_text = ""
         self.running = False
         self.partial_frames = []
         self.overlap_frames = []
         self.audio_interface = pyaudio.PyAudio()
-        self.num_overlap_buffers = int((OVERLAP_DURATION * 16000) / CHUNK)
-        self.chunk_duration = DEFAULT_CHUNK_DURATION  # for normal mode
+        self.warm_capture = capture is not None
+        self.capture = capture or InputCapture(self.audio_interface)
+        # Session read position in the capture ring (absolute sample index).
+        # Shared by record_loop and force_process_partial_frames; the lock also
+        # orders appends so both threads' frames stay in capture order.
+        self._cursor = 0
+        self._cursor_lock = threading.Lock()
+        self._session_end = 0
+        self._requested_at = None
+        # Seconds from the Start request to the first audio block of the session
+        self.last_start_latency = None
+        # CaptureStats.summary() for the most recent finished session
+        self.last_capture_summary = None
+        self._stats_mark = None
+        # Optional compressed recording of the session (MYTRANSCRIBE_ARCHIVE);
+        # archive_label tells sources apart when several record at once.
+        self.archive = None
+        self.archive_label = None
+        # Committed text is also saved to the searchable transcript history.
+        self.history_session = None
+        self.num_overlap_buffers = int((OVERLAP_DURATION * SAMPLE_RATE) / CHUNK)
+        self.session_chunk_duration = chunk_duration
+        self.chunk_duration = chunk_duration  # for normal mode
 
         # For long record mode
         self.long_mode = False
         self.long_frames = []
+
+        # Hands-free mode: only utterances found by the activity gate are
+        # transcribed; _wake optionally requires a wake phrase.
+        self.hands_free = False
+        self._wake = None
+        self.last_gate_summary = None
         
         # For audio detection - simplified to a boolean flag
         self.audio_detected = False
         # Counter to maintain the indicator visible for a short period
         self.audio_detection_counter = 0
 
-    def start_recording(self, mode="normal"):
+    @property
+    def model_loaded(self):
+        return self.model is not None
+
+    def set_model(self, model):
+        """Install a (re)loaded model or backend and release any chunk waiting for it."""
+        backend = make_backend(model)
+        self.model = model
+        self.backend = backend
+        self._model_error = None
+        self._model_ready.set()
+
+    def unload_model(self):
+        """
+        Drop the transcriber's reference to the model. Call only between
+        sessions; the caller must also drop its own references for the memory
+        to be released.
+        """
+        self._model_ready.clear()
+        self.model = None
+        self.backend = None
+
+    def begin_model_reload(self):
+        """
+        A background reload is starting: chunks wait for it again, even if a
+        previous reload failed (its error would otherwise fail them at once).
+        """
+        self._model_error = None
+        self._model_ready.clear()
+
+    def model_load_failed(self, error):
+        """Fail chunks waiting on a background reload instead of blocking forever."""
+        self._model_error = error
+        self._model_ready.set()
+
+    def start_recording(self, mode="normal", requested_at=None):
         """
         mode: "normal" for normal incremental transcription,
               "long" for accumulating audio until session end (max 180 seconds auto-stop)
+              "handsfree" for listening continuously and transcribing only
+              the utterances the activity gate detects
+        requested_at: time.perf_counter() of the hotkey/click that asked for the
+              start; used to log start latency.
         """
         self.long_mode = (mode == "long")
-        self.chunk_duration = DEFAULT_CHUNK_DURATION  # used in normal mode
+        self.hands_free = (mode == "handsfree")
+        self._wake = wake_phrase() if self.hands_free else None
+        self.chunk_duration = self.session_chunk_duration  # used in normal mode
         self.running = True
         self.overlap_frames = []
         self.partial_frames = []
         
         if self.long_mode:
             self.long_frames = []
-            self.long_start_time = time.time()
-        # Log which input device PyAudio will use (helps diagnose wrong-device capture)
-        try:
-            default_info = self.audio_interface.get_default_input_device_info()
-            logging.info(
-                "Opening input stream on device [%s] index=%s rate=%s channels=%s",
-                default_info.get("name"),
-                default_info.get("index"),
-                default_info.get("defaultSampleRate"),
-                default_info.get("maxInputChannels"),
+
+        # No-op for a warm capture, which is already open
+        self.capture.open()
+        ring = self.capture.ring
+        start = ring.written
+        if self.warm_capture:
+            # Reach back into the ring for pre-roll, but never past the end of
+            # the previous session (a quick Stop→Start would duplicate words).
+            preroll = int(PREROLL_DURATION * SAMPLE_RATE)
+            start = max(start - preroll, ring.oldest, self._session_end)
+        self._cursor = start
+        self.archive = open_session(start, self.archive_label)
+        history = default_history()
+        if history is not None:
+            self.history_session = history.begin_session(
+                self.archive_label, self.archive.session_id if self.archive else None,
             )
-        except Exception as exc:
-            logging.warning("Could not query default input device: %s", exc)
-
-        # Open audio stream
-        self.stream = self.audio_interface.open(
-            format=FORMAT,
-            channels=CHANNELS,
-            rate=16000,
-            input=True,
-            frames_per_buffer=CHUNK
-        )
+        self._requested_at = requested_at
+        self.last_start_latency = None
+        # Audio level is computed per block on the capture callback thread
+        self.capture.on_block = self.calculate_audio_level
+        self._stats_mark = self.capture.stats.snapshot()
+
         self.record_thread = threading.Thread(target=self.record_loop, daemon=True)
         self.record_thread.start()
 
     def stop_recording(self):
         self.running = False
+        self.capture.ring.wake_waiters()
         if self.record_thread.is_alive():
             self.record_thread.join()
-        self.stream.stop_stream()
-        self.stream.close()
+        self.capture.on_block = None
+        self._session_end = self._cursor
+        self.last_capture_summary = self.capture.stats.summary(self._stats_mark)
+        logging.info("Capture session: %s", format_capture_summary(self.last_capture_summary))
+        if not self.warm_capture:
+            self.capture.close()
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        if self.history_session is not None:
+            self.history_session.end()
         # Reset audio detection when stopped
         self.audio_detected = False
         self.audio_detection_counter = 0
 
+    def _drain_into(self, frames, limit=None):
+        """
+        Move session audio from the capture ring into `frames` as CHUNK-sized
+        byte strings, up to sample index `limit` (default: everything captured).
+        Returns the number of samples moved.
+        """
+        ring = self.capture.ring
+        with self._cursor_lock:
+            end = ring.written if limit is None else min(ring.written, limit)
+            data = ring.read(self._cursor, end)
+            self._cursor = max(self._cursor, end)
+            if self.archive is not None:
+                self.archive.write(end - len(data) // BYTES_PER_SAMPLE, data)
+            step = CHUNK * BYTES_PER_SAMPLE
+            frames.extend(data[i:i + step] for i in range(0, len(data), step))
+        if data and self._requested_at is not None:
+            self.last_start_latency = time.perf_counter() - self._requested_at
+            self._requested_at = None
+            logging.info(
+                "Start latency: %.0f ms from request to first audio block (warm=%s)",
+                self.last_start_latency * 1000, self.warm_capture,
+            )
+        return len(data) // BYTES_PER_SAMPLE
+
+    def _capture_until(self, frames, limit):
+        """
+        Block until the cursor reaches sample index `limit` or the session is
+        stopped, draining the ring into `frames` every DRAIN_INTERVAL seconds.
+        Waits on the ring's sample clock, so GIL stalls can't shorten a chunk.
+        """
+        ring = self.capture.ring
+        drain = int(DRAIN_INTERVAL * SAMPLE_RATE)
+        while self.running and self._cursor < limit:
+            target = min(limit, self._cursor + drain)
+            # Short first wait so the first block (and start latency) shows promptly
+            if self._requested_at is not None:
+                target = min(target, self._cursor + CHUNK)
+            with TIMINGS.span("capture_wait"):
+                ring.wait_until(target, timeout=DRAIN_INTERVAL * 2)
+            self._drain_into(frames, limit)
+
     def calculate_audio_level(self, audio_data):
         """Detect if audio data contains speech above threshold."""
         # Convert bytes to int16 array
@@ -138,87 +544,154 @@ class RealTimeTranscriber:
     def record_loop(self):
         if self.long_mode:
             # In long mode, simply accumulate all audio frames.
-            while self.running:
-                try:
-                    data = self.stream.read(CHUNK, exception_on_overflow=False)
-                    # Calculate audio level
-                    self.calculate_audio_level(data)
-                except Exception as e:
-                    logging.error("Error reading audio stream", exc_info=True)
-                    continue
-                self.long_frames.append(data)
-                # Auto-stop after 180 seconds if not interrupted
-                if time.time() - self.long_start_time >= 180:
-                    self.running = False
+            # Auto-stop after LONG_MODE_MAX_DURATION seconds if not interrupted.
+            long_end = self._cursor + LONG_MODE_MAX_DURATION * SAMPLE_RATE
+            self._capture_until(self.long_frames, long_end)
+            if self.running:
+                self.running = False
+            else:
+                self._drain_into(self.long_frames, long_end)
             # Once stopped, process the entire accumulated audio as one chunk.
             if self.long_frames:
-                self.process_audio_chunk(self.long_frames)
+                self.process_audio_chunk(self.long_frames, end_sample=self._cursor)
+        elif self.hands_free:
+            self._hands_free_loop()
         else:
             # Normal mode: process audio in DEFAULT_CHUNK_DURATION-second chunks.
+            # The chunk in progress accumulates in self.partial_frames so that
+            # force_process_partial_frames() can append to it in order.
             while self.running:
-                frames = []
-                chunk_start = time.time()
-                while time.time() - chunk_start < self.chunk_duration:
-                    if not self.running:
-                        break
-                    try:
-                        data = self.stream.read(CHUNK, exception_on_overflow=False)
-                        # Calculate audio level
-                        self.calculate_audio_level(data)
-                    except Exception as e:
-                        logging.error("Error reading audio stream", exc_info=True)
-                        continue
-                    frames.append(data)
+                chunk_end = self._cursor + self.chunk_duration * SAMPLE_RATE
+                self._capture_until(self.partial_frames, chunk_end)
+                if not self.running:
+                    # Session over: include anything captured since the last drain
+                    self._drain_into(self.partial_frames)
+                with self._cursor_lock:
+                    frames = self.partial_frames
+                    self.partial_frames = []
+                    end = self._cursor
                 if not frames:
                     continue
                 all_frames = self.overlap_frames + frames
                 if all_frames:
-                    self.process_audio_chunk(all_frames)
+                    self.process_audio_chunk(all_frames, end_sample=end)
                 if len(all_frames) >= self.num_overlap_buffers:
                     self.overlap_frames = all_frames[-self.num_overlap_buffers:]
                 else:
                     self.overlap_frames = all_frames
 
-    def process_audio_chunk(self, frames):
+    def _hands_free_loop(self):
+        """
+        Listen until Stop, running only the activity gate on the live stream
+        every HANDS_FREE_POLL seconds; each utterance it closes is read back
+        from the ring and transcribed. An open utterance is flushed at Stop.
+        """
+        gate = UtteranceGate()
+        ring = self.capture.ring
+        poll = int(HANDS_FREE_POLL * SAMPLE_RATE)
+        frames = []
+        listened = 0
+        gate_cpu = 0.0
+        while True:
+            self._capture_until(frames, self._cursor + poll)
+            stopping = not self.running
+            if stopping:
+                self._drain_into(frames)
+            data = b"".join(frames)
+            frames.clear()
+            samples = np.frombuffer(data, dtype=np.int16)
+            listened += len(samples)
+            began = time.thread_time()
+            utterances = gate.feed(samples, self._cursor - len(samples))
+            if stopping:
+                utterances += gate.flush(self._cursor)
+            gate_cpu += time.thread_time() - began
+            for start, end in utterances:
+                data = ring.read(start, end)
+                step = CHUNK * BYTES_PER_SAMPLE
+                self.process_audio_chunk([data[i:i + step] for i in range(0, len(data), step)],
+                                         end_sample=end)
+            if stopping:
+                break
+        seconds = listened / SAMPLE_RATE
+        self.last_gate_summary = {
+            "listened_s": seconds,
+            "utterances": gate.utterances,
+            "speech_s": gate.detector.speech_frames * FRAME / SAMPLE_RATE,
+            "gate_cpu_pct": 100 * gate_cpu / seconds if seconds else 0.0,
+        }
+        logging.info(
+            "Hands-free session: %.1f s listened, %d utterances (%.1f s speech), "
+            "activity gate %.2f%% CPU",
+            seconds, gate.utterances, self.last_gate_summary["speech_s"],
+            self.last_gate_summary["gate_cpu_pct"],
+        )
+
+    def process_audio_chunk(self, frames, end_sample=None):
+        """
+        Transcribe `frames` and append the text to self.transcriptions.
+        end_sample is the capture-ring index just past the last frame; with it
+        the text is also indexed in the session archive.
+        """
         if not frames:
             return
+        TIMINGS.begin_chunk()
         wav_filename = None
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_wav:
-                wav_filename = temp_wav.name
-            with wave.open(wav_filename, 'wb') as wf:
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(self.audio_interface.get_sample_size(FORMAT))
-                wf.setframerate(16000)
-                wf.writeframes(b''.join(frames))
+            with TIMINGS.span("buffer_join", frames=len(frames)):
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_wav:
+                    wav_filename = temp_wav.name
+                with wave.open(wav_filename, 'wb') as wf:
+                    wf.setnchannels(CHANNELS)
+                    wf.setsampwidth(self.audio_interface.get_sample_size(FORMAT))
+                    wf.setframerate(SAMPLE_RATE)
+                    wf.writeframes(b''.join(frames))
             
             # Check if the audio contains actual speech
-            if self.is_silent(frames):
+            with TIMINGS.span("silence_check"):
+                silent = self.is_silent(frames)
+            if silent:
                 logging.info("Chunk contains mostly silence, skipping transcription")
                 return
                 
-            use_fp16 = next(self.model.parameters()).is_cuda
-            result = self.model.transcribe(
-                wav_filename,
-                fp16=use_fp16,
-                language="en",
-                task="transcribe",
-                initial_prompt=TECHNICAL_PROMPT,
-                # Added temperature parameter to reduce hallucinations
-                temperature=0.0,
-                # Added condition_on_previous_text=False to prevent the model from
-                # generating content based on what it "expects" to hear
-                condition_on_previous_text=False
-            )
+            if not self._model_ready.is_set():
+                logging.info("Waiting for the Whisper model to finish loading")
+                with TIMINGS.span("model_wait"):
+                    self._model_ready.wait()
+            backend = self.backend
+            if backend is None:
+                raise RuntimeError(f"Whisper model failed to load: {self._model_error}")
+
+            # Once the session is stopped the user is waiting for this text;
+            # chunks cut while recording continues can yield to that.
+            priority = PARTIAL if self.running else FINAL
+            with SCHEDULER.job(priority) as gate:
+                result = backend.transcribe(
+                    wav_filename,
+                    # With a wake phrase, text is shown only once accept() has
+                    # kept it, so ignored speech never appears while decoding.
+                    on_text=self._set_partial_text if self._wake is None else None,
+                    timer=TIMINGS,
+                    gate=gate,
+                    **TRANSCRIBE_OPTIONS,
+                )
             
             new_text = result.get("text", "").strip()
             
             # Additional filter to catch remaining hallucinated greetings/closings
-            filtered_text = self.filter_hallucinated_phrases(new_text)
+            with TIMINGS.span("filtering"):
+                filtered_text = self.filter_hallucinated_phrases(new_text)
+                if self._wake is not None:
+                    filtered_text = self._wake.accept(filtered_text)
             
             # Only add non-empty transcriptions
             if filtered_text:
                 self.transcriptions.append(filtered_text)
+                if self.history_session is not None:
+                    self.history_session.add(filtered_text)
+                archive = self.archive
+                if archive is not None and end_sample is not None:
+                    self._archive_segments(archive, result, filtered_text, frames, end_sample)
         except RuntimeError as e:
             if "Expected key.size(1) == value.size(1)" in str(e):
                 msg = "[Transcription Error: shape mismatch, skipping this chunk]"
@@ -231,6 +704,7 @@ class RealTimeTranscriber:
             logging.error("Transcription error", exc_info=True)
             self.transcriptions.append(f"[Transcription Error: {e}]")
         finally:
+            self.partial_text = ""
             if wav_filename and os.path.exists(wav_filename):
                 try:
                     os.remove(wav_filename)
@@ -239,24 +713,52 @@ class RealTimeTranscriber:
                     # still has the file open; silently skip — the OS will remove
                     # it when the last handle is closed.
                     pass
-        self.partial_frames = []
+
+    @staticmethod
+    def _archive_segments(archive, result, text, frames, end_sample):
+        """Index the chunk's Whisper segments (or the whole chunk) by sample range."""
+        start = end_sample - sum(len(f) for f in frames) // BYTES_PER_SAMPLE
+        segments = [s for s in result.get("segments", []) if s.get("text", "").strip()]
+        if not segments:
+            archive.add_segment(start, end_sample, text)
+        for segment in segments:
+            archive.add_segment(
+                start + int(segment["start"] * SAMPLE_RATE),
+                min(start + int(segment["end"] * SAMPLE_RATE), end_sample),
+                segment["text"].strip(),
+            )
+
+    def _set_partial_text(self, text):
+        """Decoder callback: publish the in-progress text of the current chunk."""
+        self.partial_text = self.filter_hallucinated_phrases(text)
 
     def force_process_partial_frames(self):
+        """
+        Pull everything captured so far into the session ahead of Stop.
+
+        Long mode appends it to long_frames; normal mode to partial_frames, the
+        chunk in progress, which record_loop transcribes when the session ends.
+        If the record thread has already exited, leftovers are transcribed here.
+        Hands-free mode needs neither: its loop flushes the open utterance.
+        """
+        if self.hands_free:
+            return
         try:
-            if self.running and self.stream.is_active():
-                data = self.stream.read(self.stream.get_read_available(), exception_on_overflow=False)
-                if self.long_mode:
-                    self.long_frames.append(data)
-                else:
-                    self.partial_frames.append(data)
+            if self.running and self.capture.is_open:
+                target = self.long_frames if self.long_mode else self.partial_frames
+                self._drain_into(target)
         except Exception:
             pass
-        if not self.long_mode:
-            final_frames = self.overlap_frames + self.partial_frames
+        if not self.long_mode and not self.record_thread.is_alive():
+            with self._cursor_lock:
+                final_frames = self.overlap_frames + self.partial_frames
+                self.partial_frames = []
+                end = self._cursor
             if final_frames:
-                self.process_audio_chunk(final_frames)
+                self.process_audio_chunk(final_frames, end_sample=end)
                 
-    def is_silent(self, frames):
+    @staticmethod
+    def is_silent(frames):
         """Detect if audio frames contain mostly silence."""
         if not frames:
             return True
@@ -285,7 +787,8 @@ class RealTimeTranscriber:
         )
         return silent
         
-    def filter_hallucinated_phrases(self, text):
+    @staticmethod
+    def filter_hallucinated_phrases(text):
         """Remove common hallucinated phrases from the transcription."""
         if not text:
             return text
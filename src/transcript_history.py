@@ -0,0 +1,232 @@
+"""
+transcript_history.py — Persistent, searchable history of dictated text.
+
+Every segment a session commits to its transcript is also written to a SQLite
+database (WAL mode) at ~/.local/share/mytranscribe/history.sqlite3:
+
+  sessions      id (start time in µs), started, ended, source, archive
+  segments      id, session_id, ts, text
+  segments_fts  FTS5 index over segments.text, kept in sync by triggers
+
+The recording threads only enqueue; one writer thread batches whatever
+arrived within FLUSH_INTERVAL into a single transaction, so neither the GUI
+nor the capture path ever waits on disk. Session ids are allocated
+client-side from the clock, so begin_session() never round-trips either.
+
+search() answers "what did I dictate last Tuesday about X" through the FTS
+index plus a time-range index on segments, newest first; scripts/history.py
+is the command-line front end. Searching works from any process while the
+app is writing (WAL readers never block the writer).
+
+MYTRANSCRIBE_HISTORY sets the database path; "0" turns history off.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("transcript_history")
+
+HISTORY_ENV = "MYTRANSCRIBE_HISTORY"   # database path; "0" disables
+DB_FILE = "history.sqlite3"
+FLUSH_INTERVAL = 0.5                   # seconds a batch may wait for more writes
+MAX_BATCH = 256
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id      INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended   REAL,
+    source  TEXT,
+    archive TEXT
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id         INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    ts         REAL NOT NULL,
+    text       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_ts ON segments (ts);
+CREATE INDEX IF NOT EXISTS segments_session ON segments (session_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5 (
+    text, content='segments', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def default_history_path() -> str | None:
+    """$MYTRANSCRIBE_HISTORY, else ~/.local/share/mytranscribe/history.sqlite3; None if off."""
+    configured = os.environ.get(HISTORY_ENV)
+    if configured == "0":
+        return None
+    if configured:
+        return configured
+    default = os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(os.getenv("XDG_DATA_HOME", default), "mytranscribe", DB_FILE)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open (creating if needed) a history database in WAL mode."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def fts_query(text: str) -> str:
+    """Plain words to an FTS5 query: every word must match, as a prefix."""
+    words = text.split()
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def search(db: sqlite3.Connection, text: str = "", since: float | None = None,
+           until: float | None = None, limit: int = 50, raw: bool = False) -> list[dict]:
+    """
+    Segments matching `text` (all words, prefix match; raw=True passes FTS5
+    syntax through) committed in [since, until), newest first. Empty text
+    lists everything in the range.
+    """
+    # Segment ids increase in commit order, so "newest first" is rowid order,
+    # which FTS5 walks backwards and stops after `limit` hits; the time range
+    # becomes a rowid range via two seeks on segments_ts.
+    low, high = 0, None
+    if since is not None:
+        row = db.execute("SELECT id FROM segments WHERE ts >= ? ORDER BY ts LIMIT 1",
+                         (since,)).fetchone()
+        if row is None:
+            return []
+        low = row[0]
+    if until is not None:
+        row = db.execute("SELECT id FROM segments WHERE ts < ? ORDER BY ts DESC LIMIT 1",
+                         (until,)).fetchone()
+        if row is None:
+            return []
+        high = row[0]
+    if high is None:
+        high = db.execute("SELECT COALESCE(MAX(id), 0) FROM segments").fetchone()[0]
+    query = text if raw else fts_query(text)
+    columns = "s.id, s.session_id, s.ts, s.text, x.source, x.archive"
+    if query:
+        rows = db.execute(
+            f"SELECT {columns} FROM segments_fts f"
+            " JOIN segments s ON s.id = f.rowid JOIN sessions x ON x.id = s.session_id"
+            " WHERE segments_fts MATCH ? AND f.rowid BETWEEN ? AND ?"
+            " ORDER BY f.rowid DESC LIMIT ?",
+            (query, low, high, limit),
+        ).fetchall()
+    else:
+        rows = db.execute(
+            f"SELECT {columns} FROM segments s JOIN sessions x ON x.id = s.session_id"
+            " WHERE s.id BETWEEN ? AND ? ORDER BY s.id DESC LIMIT ?",
+            (low, high, limit),
+        ).fetchall()
+    keys = ("id", "session", "ts", "text", "source", "archive")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class HistorySession:
+    """Handle for one recording session; add() and end() only enqueue."""
+
+    def __init__(self, history, session_id: int) -> None:
+        self._history = history
+        self.id = session_id
+
+    def add(self, text: str) -> None:
+        self._history._queue.put(("segment", self.id, time.time(), text))
+
+    def end(self) -> None:
+        self._history._queue.put(("end", self.id, time.time()))
+
+
+class TranscriptHistory:
+    """Background writer for one history database."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._db = connect(path)        # opened here so errors surface to the caller
+        self._queue = queue.SimpleQueue()
+        self._id_lock = threading.Lock()
+        self._last_id = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0]
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def begin_session(self, source: str | None = None,
+                      archive: str | None = None) -> HistorySession:
+        with self._id_lock:
+            # Start time in µs, bumped if two sessions start in the same µs.
+            self._last_id = max(time.time_ns() // 1000, self._last_id + 1)
+            session_id = self._last_id
+        self._queue.put(("session", session_id, session_id / 1e6, source, archive))
+        return HistorySession(self, session_id)
+
+    def close(self) -> None:
+        """Write everything queued so far and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        db = self._db
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while batch[-1] is not None and len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                with db:
+                    for item in batch:
+                        if item is not None:
+                            self._apply(db, item)
+            except sqlite3.Error:
+                logger.error("Could not write %d history entries", len(batch), exc_info=True)
+            if batch[-1] is None:
+                break
+        db.close()
+
+    @staticmethod
+    def _apply(db: sqlite3.Connection, item: tuple) -> None:
+        kind, session_id, *values = item
+        if kind == "session":
+            db.execute("INSERT INTO sessions (id, started, source, archive) VALUES (?, ?, ?, ?)",
+                       (session_id, *values))
+        elif kind == "segment":
+            db.execute("INSERT INTO segments (session_id, ts, text) VALUES (?, ?, ?)",
+                       (session_id, *values))
+        else:
+            db.execute("UPDATE sessions SET ended = ? WHERE id = ?", (values[0], session_id))
+
+
+_default = None          # TranscriptHistory, or False once opening it failed
+_default_lock = threading.Lock()
+
+
+def default_history() -> TranscriptHistory | None:
+    """The process-wide history writer, opened on first use; None if unavailable."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            path = default_history_path()
+            try:
+                _default = TranscriptHistory(path) if path else False
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("Transcript history unavailable (%s)", exc)
+                _default = False
+        return _default or None